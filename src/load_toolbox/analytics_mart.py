@@ -0,0 +1,314 @@
+"""
+Note:
+    Precomputed aggregates for reports, so dashboards read small summary tables instead of joining and scanning the
+    fact tables:
+        - mart_course_week_score: the six behaviour scores of academy_performance averaged per course and week, with
+          the course's trainer
+        - mart_cohort_pass_rate: pass rate and average test scores of trainees per cohort (month of the Sparta Day
+          invitation) and course interest
+    Means are stored with the number of rows they are computed from, so groups can be rolled up (e.g. per trainer).
+    Rows without a course or trainees without an invitation are left out.
+
+    A full run computes the mart from the related dataframes. An incremental run recomputes only the groups touched
+    by the batch (courses, cohort months), reading their rows back from the database, and replaces them.
+
+Example use:
+    mart = build_mart(tables)
+    with engine.begin() as con:
+        load_mart(con, mart)
+
+    # incremental run
+    with engine.begin() as con:
+        groups = affected_groups(con, metadata, tables)
+        incremental_load(...)
+        groups = merge_groups(groups, affected_groups(con, metadata, tables))
+        load_mart(con, build_mart(read_sources(con, metadata, *groups)), *groups)
+"""
+from typing import Optional
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, Index, Integer, Float, String, select, and_, or_, false, delete
+from .bulk_loader import bulk_load
+
+
+score_columns = ["analytic", "independent", "determined", "professional", "studious", "imaginative"]
+
+
+def mart_metadata() -> MetaData:
+    metadata = MetaData()
+    course_week = Table(
+        "mart_course_week_score", metadata,
+        Column("course_id", Integer),
+        Column("week", String(8)),
+        Column("course_name", String(64)),
+        Column("trainer_id", Integer),
+        Column("trainer_name", String(64)),
+        Column("row_count", Integer, nullable=False),
+        *[Column(col, Float) for col in score_columns]
+    )
+    Index("ix_mart_course_week_score_course_week", course_week.c.course_id, course_week.c.week)
+    Index("ix_mart_course_week_score_trainer", course_week.c.trainer_id)
+    cohort = Table(
+        "mart_cohort_pass_rate", metadata,
+        Column("cohort_month", String(7)),
+        Column("course_interest", String(64)),
+        Column("trainees", Integer, nullable=False),
+        Column("assessed", Integer, nullable=False),
+        Column("passed", Integer, nullable=False),
+        Column("pass_rate", Float),
+        Column("psychometrics", Float),
+        Column("presentation", Float)
+    )
+    Index("ix_mart_cohort_pass_rate_cohort", cohort.c.cohort_month, cohort.c.course_interest)
+    return metadata
+
+
+def _month(dates: pd.Series) -> pd.Series:
+    """
+    Format dates (datetime.date, timestamps or strings) as months e.g. 2019-08-12 -> '2019-08'.
+    """
+    return pd.to_datetime(dates).dt.strftime("%Y-%m")
+
+
+def _key(ids: pd.Series) -> pd.Series:
+    """
+    Keys as floats: nullable integer keys (Int64, e.g. ids of the key registry) with missing values do not merge.
+    """
+    return ids.astype(float)
+
+
+def _ratio(scores: pd.Series, max_scores: pd.Series) -> pd.Series:
+    """
+    Divide scores by the maximum scores e.g. 19 and 32 -> 0.59375.
+    """
+    max_scores = max_scores.astype(float)
+    return scores.astype(float) / max_scores.where(max_scores > 0)
+
+
+def _passed(results: pd.Series) -> pd.Series:
+    """
+    Read the result of a trainee as 1/0, whether it is a boolean (pandas) or the text it is loaded as ('1', 'True').
+    """
+    return results.map(lambda value: None if pd.isna(value) else float(str(value) in ("1", "True", "true")))
+
+
+def course_week_scores(academy_performance: pd.DataFrame, course: pd.DataFrame, trainer: pd.DataFrame) -> pd.DataFrame:
+    """
+    Average the behaviour scores per course and week.
+
+    :param academy_performance: rows with course_id, week and the score columns
+    :param course: course table (index, course_name, trainer_id)
+    :param trainer: trainer table (index, trainer_name)
+    :return: one row per course and week, in the columns of mart_course_week_score
+    """
+    academy_performance = academy_performance[academy_performance["course_id"].notna()]
+    grouped = academy_performance.groupby(["course_id", "week"], dropna=False, observed=True)
+    scores = grouped[score_columns].mean()
+    scores.insert(0, "row_count", grouped.size())
+    scores = scores.reset_index()
+    courses = course[["index", "course_name", "trainer_id"]].rename(columns={"index": "course_id"})
+    courses["course_id"], courses["trainer_id"] = _key(courses["course_id"]), _key(courses["trainer_id"])
+    trainers = trainer[["index", "trainer_name"]].rename(columns={"index": "trainer_id"})
+    trainers["trainer_id"] = _key(trainers["trainer_id"])
+    scores["course_id"] = _key(scores["course_id"])
+    scores = scores.merge(courses, on="course_id", how="left").merge(trainers, on="trainer_id", how="left")
+    return scores[[col.name for col in mart_metadata().tables["mart_course_week_score"].columns]]
+
+
+def cohort_pass_rates(
+        student_information: pd.DataFrame,
+        invitation: pd.DataFrame,
+        test_score: pd.DataFrame,
+        trainee_performance: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Count trainees who passed and average their test scores per cohort month and course interest.
+
+    :param student_information: student table (index, invitation_id)
+    :param invitation: invitation table (index, invited_date)
+    :param test_score: test scores (student_information_id, psychometrics_score/_max, presentation_score/_max)
+    :param trainee_performance: results (student_information_id, result, course_interest)
+    :return: one row per cohort month and course interest, in the columns of mart_cohort_pass_rate
+    """
+    invitations = invitation[["index", "invited_date"]].rename(columns={"index": "invitation_id"})
+    invitations["invitation_id"] = _key(invitations["invitation_id"])
+    students = pd.DataFrame({"index": _key(student_information["index"]),
+                             "invitation_id": _key(student_information["invitation_id"])})
+    students = students.merge(invitations, on="invitation_id", how="left")
+    students["cohort_month"] = _month(students["invited_date"])
+    scores = pd.DataFrame({
+        "student_information_id": _key(test_score["student_information_id"]),
+        "psychometrics": _ratio(test_score["psychometrics_score"], test_score["psychometrics_max"]),
+        "presentation": _ratio(test_score["presentation_score"], test_score["presentation_max"])
+    }).drop_duplicates("student_information_id")
+
+    trainees = pd.DataFrame({
+        "student_information_id": _key(trainee_performance["student_information_id"]),
+        "course_interest": trainee_performance["course_interest"],
+        "passed": _passed(trainee_performance["result"])
+    })
+    trainees = trainees.merge(
+        students[["index", "cohort_month"]], left_on="student_information_id", right_on="index", how="left"
+    ).merge(scores, on="student_information_id", how="left")
+    trainees = trainees[trainees["cohort_month"].notna()]
+
+    grouped = trainees.groupby(["cohort_month", "course_interest"], dropna=False, observed=True)
+    rates = grouped.agg(
+        trainees=("passed", "size"),
+        assessed=("passed", "count"),
+        passed=("passed", "sum"),
+        psychometrics=("psychometrics", "mean"),
+        presentation=("presentation", "mean")
+    ).reset_index()
+    rates["passed"] = rates["passed"].astype(int)
+    rates["pass_rate"] = rates["passed"] / rates["assessed"].where(rates["assessed"] > 0)
+    return rates[[col.name for col in mart_metadata().tables["mart_cohort_pass_rate"].columns]]
+
+
+def build_mart(tables: dict[str, pd.DataFrame]) -> dict[str, pd.DataFrame]:
+    """
+    Compute every summary table.
+
+    :param tables: related dataframes keyed by table name (output of the relationship plan or of read_sources)
+    :return: summary dataframes keyed by mart table name
+    """
+    return {
+        "mart_course_week_score": course_week_scores(
+            tables["academy_performance"], tables["course"], tables["trainer"]
+        ),
+        "mart_cohort_pass_rate": cohort_pass_rates(
+            tables["student_information"], tables["invitation"], tables["test_score"], tables["trainee_performance"]
+        )
+    }
+
+
+def _month_range(month: str):
+    start = pd.Timestamp(f"{month}-01")
+    return start.date(), (start + pd.offsets.MonthBegin(1)).date()
+
+
+def _read(con, table: Table, condition=None) -> pd.DataFrame:
+    query = select(table) if condition is None else select(table).where(condition)
+    return pd.DataFrame(con.execute(query).fetchall(), columns=[col.name for col in table.columns])
+
+
+def read_sources(
+        con,
+        metadata: MetaData,
+        course_ids: Optional[list[int]] = None,
+        cohort_months: Optional[list[str]] = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Read the rows the given groups are computed from back from the database. None reads every row.
+
+    :param con: SQLAlchemy connection
+    :param metadata: metadata of the final tables
+    :param course_ids: courses whose weekly scores are refreshed
+    :param cohort_months: cohort months ('2019-08') whose pass rates are refreshed
+    :return: dataframes keyed by table name, as expected by build_mart
+    """
+    tables = metadata.tables
+    sources = {}
+
+    course_condition = None if course_ids is None else tables["course"].c["index"].in_(course_ids)
+    sources["course"] = _read(con, tables["course"], course_condition)
+    sources["trainer"] = _read(con, tables["trainer"], tables["trainer"].c["index"].in_(
+        sources["course"]["trainer_id"].dropna().astype(int).tolist()
+    ))
+    sources["academy_performance"] = _read(con, tables["academy_performance"], None if course_ids is None else
+                                           tables["academy_performance"].c.course_id.in_(course_ids))
+
+    invitation_condition = None
+    if cohort_months is not None:
+        invited_date = tables["invitation"].c.invited_date
+        invitation_condition = or_(false(), *[
+            and_(invited_date >= start, invited_date < end) for start, end in map(_month_range, cohort_months)
+        ])
+    sources["invitation"] = _read(con, tables["invitation"], invitation_condition)
+    student_condition = None if cohort_months is None else tables["student_information"].c.invitation_id.in_(
+        sources["invitation"]["index"].tolist()
+    )
+    sources["student_information"] = _read(con, tables["student_information"], student_condition)
+    student_ids = sources["student_information"]["index"].tolist()
+    for table_name in ["test_score", "trainee_performance"]:
+        sources[table_name] = _read(con, tables[table_name], None if cohort_months is None else
+                                    tables[table_name].c.student_information_id.in_(student_ids))
+    return sources
+
+
+def _ids(tables: dict[str, pd.DataFrame], table_name: str, col: str) -> set[int]:
+    """
+    Ids found in a column of a batch, none if the batch does not have the table (or its stand-in lacks the column).
+    """
+    if table_name not in tables or col not in tables[table_name]:
+        return set()
+    return {int(value) for value in tables[table_name][col].dropna()}
+
+
+def affected_groups(con, metadata: MetaData, tables: dict[str, pd.DataFrame]) -> tuple[list[int], list[str]]:
+    """
+    Find the groups of the mart a batch of rows belongs to, as they are stored in the database. Called before and
+    after loading the batch, so groups that rows moved out of are refreshed too.
+
+    :param con: SQLAlchemy connection
+    :param metadata: metadata of the final tables
+    :param tables: related dataframes of the batch keyed by table name
+    :return: course ids and cohort months
+    """
+    final = metadata.tables
+    course_ids = _ids(tables, "academy_performance", "course_id") | _ids(tables, "course", "index")
+    trainer_ids = list(_ids(tables, "trainer", "index"))
+    course_ids |= set(_read(con, final["course"], final["course"].c.trainer_id.in_(trainer_ids))["index"])
+
+    student_ids = _ids(tables, "student_information", "index")
+    for table_name in ["test_score", "trainee_performance"]:
+        student_ids |= _ids(tables, table_name, "student_information_id")
+    students = _read(con, final["student_information"],
+                     final["student_information"].c["index"].in_(list(student_ids)))
+    invitation_ids = set(students["invitation_id"].dropna().astype(int)) | _ids(tables, "invitation", "index")
+    invitations = _read(con, final["invitation"], final["invitation"].c["index"].in_(list(invitation_ids)))
+    cohort_months = set(_month(invitations["invited_date"]).dropna())
+    return sorted(int(course_id) for course_id in course_ids), sorted(cohort_months)
+
+
+def merge_groups(*groups: tuple[list[int], list[str]]) -> tuple[list[int], list[str]]:
+    course_ids = sorted({course_id for ids, _ in groups for course_id in ids})
+    cohort_months = sorted({month for _, months in groups for month in months})
+    return course_ids, cohort_months
+
+
+def load_mart(
+        con,
+        mart: dict[str, pd.DataFrame],
+        course_ids: Optional[list[int]] = None,
+        cohort_months: Optional[list[str]] = None,
+        *, chunksize: int = 5000
+) -> dict[str, int]:
+    """
+    Create the summary tables if needed and replace the given groups (every row if None) with the computed ones.
+
+    :param con: SQLAlchemy connection
+    :param mart: output of build_mart
+    :param course_ids: courses being replaced
+    :param cohort_months: cohort months being replaced
+    :param chunksize: rows per INSERT statement when LOAD DATA LOCAL INFILE is not available
+    :return: number of rows written keyed by mart table name
+    """
+    metadata = mart_metadata()
+    metadata.create_all(con)
+    course_week = metadata.tables["mart_course_week_score"]
+    cohort = metadata.tables["mart_cohort_pass_rate"]
+    con.execute(delete(course_week) if course_ids is None else
+                delete(course_week).where(course_week.c.course_id.in_(course_ids)))
+    con.execute(delete(cohort) if cohort_months is None else
+                delete(cohort).where(cohort.c.cohort_month.in_(cohort_months)))
+
+    course_week_df = mart["mart_course_week_score"]
+    cohort_df = mart["mart_cohort_pass_rate"]
+    if course_ids is not None:
+        course_week_df = course_week_df[course_week_df["course_id"].isin(course_ids)]
+    if cohort_months is not None:
+        cohort_df = cohort_df[cohort_df["cohort_month"].isin(cohort_months)]
+    for table_name, df in [("mart_course_week_score", course_week_df), ("mart_cohort_pass_rate", cohort_df)]:
+        if not df.empty:
+            bulk_load(con, table_name, df, chunksize=chunksize)
+    return {"mart_course_week_score": len(course_week_df), "mart_cohort_pass_rate": len(cohort_df)}
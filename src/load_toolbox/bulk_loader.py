@@ -0,0 +1,153 @@
+"""
+Note:
+    Bulk load dataframes into MySQL. Each dataframe is streamed into a temporary tab separated file and loaded with
+    LOAD DATA LOCAL INFILE. Databases other than MySQL, and MySQL servers or clients that do not allow local infile
+    (LOCAL_INFILE_ERRORS), get the rows in chunks of multi-row INSERT statements instead. Any other error of LOAD DATA
+    is raised.
+
+Example use:
+    engine = create_engine(uri, connect_args={"local_infile": 1})
+    with engine.begin() as con:
+        rows, seconds, method = bulk_load(con, "trainer", trainer_df)
+"""
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy.exc import DBAPIError
+
+
+# MySQL errors of LOAD DATA LOCAL INFILE when local infile is disabled: ER_NOT_ALLOWED_COMMAND (server or older
+# clients), CR_LOAD_DATA_LOCAL_INFILE_REJECTED (client), ER_CLIENT_LOCAL_FILES_DISABLED (server)
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+
+
+def _is_bool_column(column: pd.Series) -> bool:
+    """
+    Object column holding nothing but Python (or numpy) booleans and missing values.
+    """
+    if column.dtype != object:
+        return False
+    values = column.dropna()
+    # the first value rules out most columns without looking at the others
+    return not values.empty and isinstance(values.iat[0], (bool, np.bool_)) and \
+        values.map(lambda v: isinstance(v, (bool, np.bool_))).all()
+
+
+def prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert column types to values MySQL accepts in a text file: integer columns with missing values (stored by pandas
+    as floats) back to integers and booleans to 1/0, also nullable booleans and Python booleans in object columns,
+    which would otherwise be written as 'True'/'False' (stored as 0 by LOAD DATA). Categorical and Arrow string
+    columns (see transform_toolbox.compact_dtypes) become object columns again, so they are escaped and hashed the same
+    way.
+
+    :param df: dataframe to load
+    :return: dataframe ready to be written as text
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == bool:
+            df[col] = df[col].astype(int)
+        elif isinstance(df[col].dtype, pd.BooleanDtype) or _is_bool_column(df[col]):
+            df[col] = df[col].astype("boolean").astype("Int64")
+        elif pd.api.types.is_float_dtype(df[col]) and (df[col].dropna() % 1 == 0).all():
+            df[col] = df[col].astype("Int64")
+        elif isinstance(df[col].dtype, (pd.CategoricalDtype, pd.StringDtype)):
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def _escape_column(column: pd.Series) -> pd.Series:
+    """
+    Convert column to text, escaping backslashes, tabs and newlines, and mark missing values with \\N.
+    """
+    text = column.astype(str)
+    if column.dtype == object:
+        for char, escaped in [('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r')]:
+            text = text.str.replace(char, escaped, regex=False)
+    return text.mask(column.isna(), '\\N')
+
+
+def frame_to_tsv(df: pd.DataFrame, path_or_buf) -> None:
+    """
+    Write dataframe in the default LOAD DATA format: tab separated fields, backslash escapes and \\N for NULL.
+
+    :param df: dataframe to write
+    :param path_or_buf: file path or file-like object
+    """
+    df = prepare_frame(df)
+    if df.empty:
+        lines = []
+    else:
+        columns = [_escape_column(df[col]) for col in df.columns]
+        lines = columns[0]
+        for column in columns[1:]:
+            lines = lines + '\t' + column
+    text = ''.join(line + '\n' for line in lines)
+
+    if isinstance(path_or_buf, (str, os.PathLike)):
+        with open(path_or_buf, 'w', encoding="utf-8") as file:
+            file.write(text)
+    else:
+        path_or_buf.write(text)
+
+
+def load_data_infile(con, table_name: str, df: pd.DataFrame) -> None:
+    """
+    Load dataframe with LOAD DATA LOCAL INFILE. Requires local_infile enabled on both the client and the server.
+
+    :param con: SQLAlchemy connection
+    :param table_name: existing table with columns named as in the dataframe
+    :param df: dataframe to load
+    """
+    with tempfile.NamedTemporaryFile('w', suffix=".tsv", encoding="utf-8", delete=False) as file:
+        frame_to_tsv(df, file)
+    try:
+        column_names = ', '.join(f"`{col}`" for col in df.columns)
+        con.exec_driver_sql(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE `{table_name}` CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_names});",
+            (file.name,)
+        )
+    finally:
+        os.remove(file.name)
+
+
+def insert_chunked(con, table_name: str, df: pd.DataFrame, *, chunksize: int = 5000) -> None:
+    """
+    Insert dataframe with multi-row INSERT statements, chunksize rows each.
+    """
+    prepare_frame(df).to_sql(table_name, con=con, index=False, if_exists="append", method="multi", chunksize=chunksize)
+
+
+def _local_infile_refused(error: DBAPIError) -> bool:
+    """
+    Whether LOAD DATA failed only because local infile is disabled (see LOCAL_INFILE_ERRORS).
+    """
+    args = getattr(error.orig, "args", ())
+    return bool(args) and args[0] in LOCAL_INFILE_ERRORS
+
+
+def bulk_load(con, table_name: str, df: pd.DataFrame, *, chunksize: int = 5000) -> tuple[int, float, str]:
+    """
+    Load dataframe into an existing table, using LOAD DATA LOCAL INFILE on MySQL and chunked inserts on other databases
+    or when local infile is disabled.
+
+    :param con: SQLAlchemy connection
+    :param table_name: existing table with columns named as in the dataframe
+    :param df: dataframe to load
+    :param chunksize: number of rows per INSERT statement in the fallback
+    :return: number of rows, time it took and the method used ('infile' | 'insert')
+    """
+    start = time.perf_counter()
+    if con.dialect.name == "mysql":
+        try:
+            load_data_infile(con, table_name, df)
+            return len(df), time.perf_counter() - start, "infile"
+        except DBAPIError as error:
+            if not _local_infile_refused(error):
+                raise
+    insert_chunked(con, table_name, df, chunksize=chunksize)
+    return len(df), time.perf_counter() - start, "insert"
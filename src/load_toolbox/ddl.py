@@ -0,0 +1,96 @@
+"""
+Note:
+    Create the tables from schema.py before any data is loaded: primary keys on `index` and a secondary index on every
+    foreign key column, so no ALTER TABLE has to rebuild a populated table. Foreign keys are either checked with one
+    anti-join per relationship and then added with one ALTER TABLE per table (mode 'validate'), or declared in CREATE
+    TABLE and not checked while loading (mode 'deferred').
+
+Example use:
+    table_dtypes = {name: get_value(name + "_dtypes") for name in tables_list}
+    metadata = build_metadata(table_dtypes, connection_list)
+    metadata.create_all(con)
+    ... load tables ...
+    add_foreign_keys(con, connection_list)
+"""
+from itertools import groupby
+from sqlalchemy import MetaData, Table, Column, Index, ForeignKeyConstraint
+
+
+def is_junction(table_name: str) -> bool:
+    return "junction" in table_name
+
+
+def build_metadata(
+        table_dtypes: dict[str, dict],
+        connection_list: list[tuple[str, str]],
+        *, foreign_keys: bool = False
+) -> MetaData:
+    """
+    Describe the tables from schema.py with their keys and indexes.
+
+    :param table_dtypes: table name -> column dtypes (e.g. schema.trainer_dtypes), in the order of creation
+    :param connection_list: (origin table, target table) pairs, origin holds the `<target>_id` column
+    :param foreign_keys: declare foreign keys in the tables (only for loading with the checks disabled)
+    :return: metadata ready for create_all
+    """
+    metadata = MetaData()
+    for table_name, dtypes in table_dtypes.items():
+        columns = [
+            Column(col, dtype, primary_key=(col == "index" and not is_junction(table_name)), autoincrement=False)
+            for col, dtype in dtypes.items()
+        ]
+        table = Table(table_name, metadata, *columns)
+        for origin_table, target_table in connection_list:
+            if origin_table == table_name:
+                Index(f"ix_{origin_table}_{target_table}_id", table.c[f"{target_table}_id"])
+                if foreign_keys:
+                    table.append_constraint(ForeignKeyConstraint(
+                        [f"{target_table}_id"], [f"{target_table}.index"], name=f"fk_{origin_table}_{target_table}"
+                    ))
+    return metadata
+
+
+def orphan_counts(con, connection_list: list[tuple[str, str]]) -> dict[tuple[str, str], int]:
+    """
+    Count rows whose foreign key points to a row that does not exist. Uses the indexes created by build_metadata.
+
+    :param con: SQLAlchemy connection
+    :param connection_list: (origin table, target table) pairs
+    :return: number of orphaned rows for each pair
+    """
+    counts = {}
+    for origin_table, target_table in connection_list:
+        counts[(origin_table, target_table)] = con.exec_driver_sql(
+            f"SELECT COUNT(*) FROM `{origin_table}` o LEFT JOIN `{target_table}` t "
+            f"ON o.`{target_table}_id` = t.`index` "
+            f"WHERE o.`{target_table}_id` IS NOT NULL AND t.`index` IS NULL;"
+        ).scalar()
+    return counts
+
+
+def add_foreign_keys(con, connection_list: list[tuple[str, str]], *, validate: bool = True) -> None:
+    """
+    Add all foreign keys with a single ALTER TABLE per table. The data is validated up front, so MySQL can add the
+    constraints in place without checking (and copying) every table again.
+
+    :param con: SQLAlchemy connection to MySQL
+    :param connection_list: (origin table, target table) pairs
+    :param validate: check for orphaned rows first
+    :raise ValueError: if any foreign key points to a missing row
+    """
+    if validate:
+        orphans = {pair: n for pair, n in orphan_counts(con, connection_list).items() if n}
+        if orphans:
+            raise ValueError(f"Cannot add foreign keys, orphaned rows found: {orphans}")
+
+    con.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 0;")
+    try:
+        for origin_table, pairs in groupby(sorted(connection_list), key=lambda pair: pair[0]):
+            constraints = ', '.join(
+                f"ADD CONSTRAINT fk_{origin_table}_{target_table} "
+                f"FOREIGN KEY (`{target_table}_id`) REFERENCES `{target_table}`(`index`)"
+                for _, target_table in pairs
+            )
+            con.exec_driver_sql(f"ALTER TABLE `{origin_table}` {constraints};")
+    finally:
+        con.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 1;")
@@ -0,0 +1,246 @@
+"""
+Note:
+    Incremental load into an existing database. Only objects missing from the `ingested_object` table are extracted
+    and transformed, then their rows are upserted:
+        - ids are stable between batches, the relationship plan is run with a key registry (see key_registry)
+        - every row is identified by its natural key (see schema.natural_keys), which the `row_state` table maps to
+          the hash of the row as loaded last time
+        - rows whose hash did not change are skipped, changed rows are updated in place
+
+Example use:
+    with engine.begin() as con:
+        state_metadata().create_all(con)
+        recorded = ingested_objects(con)
+    raw_dfs, new_objects = extract_new_objects(ExtractFiles(bucket_name), recorded)
+    ... transform raw_dfs ...
+    tables = tables_for_batch(tables, relationship_plan)
+    ... run_relationship_plan(tables, relationship_plan, key_registry=KeyRegistry(engine),
+                              natural_keys=natural_keys) ...
+    with engine.begin() as con:
+        counts = incremental_load(con, tables, metadata, natural_keys, connection_list)
+        record_objects(con, new_objects)
+"""
+import datetime
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, String, DateTime, select
+from sqlalchemy.dialects import mysql, sqlite
+from .bulk_loader import bulk_load, prepare_frame
+from .ddl import is_junction
+from .key_registry import natural_key
+
+
+# (prefix, extension, add filename column) of the objects of each source
+sources = {
+    "academy_csv": ("Academy", ".csv", True),
+    "talent_csv": ("Talent", ".csv", True),
+    "talent_json": ("Talent", ".json", False),
+    "talent_txt": ("Talent", ".txt", True),
+}
+
+
+def state_metadata() -> MetaData:
+    """
+    Describe the tables keeping the state of incremental loads.
+    """
+    metadata = MetaData()
+    Table(
+        "ingested_object", metadata,
+        Column("object_key", String(255), primary_key=True),
+        Column("ingested_at", DateTime, nullable=False)
+    )
+    Table(
+        "row_state", metadata,
+        Column("table_name", String(64), primary_key=True),
+        Column("natural_key", String(255), primary_key=True),
+        Column("row_hash", String(16), nullable=False)
+    )
+    return metadata
+
+
+def ingested_objects(con) -> list[str]:
+    """
+    List keys ('<prefix>/<filename>') of the objects loaded by previous runs.
+    """
+    object_table = state_metadata().tables["ingested_object"]
+    return [row.object_key for row in con.execute(select(object_table.c.object_key))]
+
+
+def record_objects(con, object_keys: list[str]) -> None:
+    """
+    Mark objects as ingested. Call in the transaction that loaded their rows.
+    """
+    if object_keys:
+        now = datetime.datetime.now()
+        con.execute(
+            state_metadata().tables["ingested_object"].insert(),
+            [{"object_key": key, "ingested_at": now} for key in object_keys]
+        )
+
+
+def extract_new_objects(extract_files, recorded_objects: list[str]) -> tuple[dict[str, pd.DataFrame], list[str]]:
+    """
+    Extract objects that were not ingested yet.
+
+    :param extract_files: ExtractFiles instance
+    :param recorded_objects: output of ingested_objects
+    :return: raw dataframes keyed by source name (sources without new objects are left out) and keys of the objects
+    """
+    raw_dfs = {}
+    new_objects = []
+    for source, (prefix, ext, filename_in_df) in sources.items():
+        raw_df, filenames_df = extract_files.get_files_as_df(
+            recorded_objects, prefix, ext, filename_in_df=filename_in_df
+        )
+        if raw_df is not None:
+            raw_dfs[source] = raw_df
+            new_objects += (filenames_df["prefix"] + '/' + filenames_df["filename"]).tolist()
+    return raw_dfs, new_objects
+
+
+def tables_for_batch(tables: dict[str, pd.DataFrame], plan: list) -> dict[str, pd.DataFrame]:
+    """
+    Stand in empty dataframes for tables a batch does not include, so that every step of the relationship plan can
+    run. Keys of rows whose parent is missing are then resolved by the key registry.
+
+    :param tables: transformed dataframes of the batch keyed by table name
+    :param plan: relationship plan (see schema.relationship_plan)
+    :return: tables of the batch with the stand-ins added
+    """
+    columns = {}
+    for relationship in plan:
+        columns.setdefault(relationship.parent, []).extend(relationship.on)
+        columns.setdefault(relationship.child, []).extend(relationship.on)
+        if relationship.cardinality == "many-to-many":
+            # composite junction tables also hold the value of the dimension
+            columns[relationship.child].append(relationship.child.removesuffix("_junction"))
+    stand_ins = {
+        table_name: pd.DataFrame(columns=list(dict.fromkeys(table_columns)))
+        for table_name, table_columns in columns.items() if table_name not in tables
+    }
+    return {**tables, **stand_ins}
+
+
+def row_hash(df: pd.DataFrame) -> pd.Series:
+    """
+    Hash the values of each row, as 16 hex digits.
+    """
+    return pd.util.hash_pandas_object(prepare_frame(df).astype(str), index=False).map('{:016x}'.format)
+
+
+def lookup_hashes(con, table_name: str, keys: list[str], *, batch_size: int = 1000) -> dict[str, str]:
+    """
+    Look up hashes of the rows loaded by earlier batches, batch_size keys per query.
+
+    :param con: SQLAlchemy connection
+    :param table_name: name of the table
+    :param keys: natural keys
+    :return: natural key -> row hash, for the keys found
+    """
+    state = state_metadata().tables["row_state"]
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    for i in range(0, len(keys), batch_size):
+        query = select(state.c.natural_key, state.c.row_hash).where(
+            state.c.table_name == table_name, state.c.natural_key.in_(keys[i:i + batch_size])
+        )
+        found.update(con.execute(query).fetchall())
+    return found
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    df = prepare_frame(df).astype(object)
+    return df.where(df.notna(), None).to_dict("records")
+
+
+def upsert_rows(con, table: Table, df: pd.DataFrame, *, chunksize: int = 5000) -> None:
+    """
+    Insert rows, updating those whose primary key exists already (MySQL and SQLite).
+
+    :param con: SQLAlchemy connection
+    :param table: table with a primary key, columns named as in the dataframe
+    :param df: rows to upsert
+    :param chunksize: rows per statement
+    """
+    if df.empty:
+        return
+    primary_key = [col.name for col in table.primary_key.columns]
+    if con.dialect.name == "mysql":
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(
+            {col: statement.inserted[col] for col in df.columns if col not in primary_key}
+        )
+    else:
+        statement = sqlite.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={col: statement.excluded[col] for col in df.columns if col not in primary_key}
+        )
+    records = _records(df)
+    for i in range(0, len(records), chunksize):
+        con.execute(statement, records[i:i + chunksize])
+
+
+def load_order(table_names: list[str], connection_list: list[tuple[str, str]]) -> list[str]:
+    """
+    Sort tables so that every table comes after the tables it references.
+    """
+    ordered = []
+    remaining = list(table_names)
+    while remaining:
+        ready = [
+            table_name for table_name in remaining
+            if all(target not in remaining for origin, target in connection_list if origin == table_name)
+        ]
+        if not ready:
+            raise ValueError(f"Circular references between tables: {remaining}")
+        ordered += ready
+        remaining = [table_name for table_name in remaining if table_name not in ready]
+    return ordered
+
+
+def incremental_load(
+        con,
+        tables: dict[str, pd.DataFrame],
+        metadata: MetaData,
+        natural_keys: dict[str, list[str]],
+        connection_list: list[tuple[str, str]],
+        *, chunksize: int = 5000
+) -> dict[str, tuple[int, int, int]]:
+    """
+    Upsert a batch of related dataframes into existing tables.
+
+    :param con: SQLAlchemy connection, the whole batch should be loaded in one transaction
+    :param tables: related dataframes of the batch keyed by table name, with stable ids (output of
+    run_relationship_plan with a key registry)
+    :param metadata: metadata of the tables (see ddl.build_metadata)
+    :param natural_keys: table name -> columns identifying a row (see schema.natural_keys)
+    :param connection_list: (origin table, target table) pairs
+    :param chunksize: rows per statement
+    :return: number of new, changed and unchanged rows keyed by table name
+    """
+    state = state_metadata().tables["row_state"]
+    counts = {}
+    for table_name in load_order([name for name in metadata.tables if name in tables], connection_list):
+        df = tables[table_name]
+        if df.empty:
+            continue
+        columns = [col.name for col in metadata.tables[table_name].columns]
+        keys = natural_key(df, natural_keys[table_name])
+        hashes = row_hash(df[[col for col in columns if col != "index"]])
+        known_hashes = keys.map(lookup_hashes(con, table_name, keys.tolist()))
+        is_new = known_hashes.isna()
+        # junction rows are identified by their key only, there is nothing to update
+        is_changed = ~is_new & (known_hashes != hashes) & (not is_junction(table_name))
+
+        if is_new.any():
+            bulk_load(con, table_name, df.loc[is_new, columns], chunksize=chunksize)
+        upsert_rows(con, metadata.tables[table_name], df.loc[is_changed, columns], chunksize=chunksize)
+
+        touched = is_new | is_changed
+        upsert_rows(con, state, pd.DataFrame({
+            "table_name": table_name,
+            "natural_key": keys[touched],
+            "row_hash": hashes[touched]
+        }), chunksize=chunksize)
+        counts[table_name] = int(is_new.sum()), int(is_changed.sum()), int((~touched).sum())
+    return counts
@@ -0,0 +1,202 @@
+"""
+Note:
+    Persistent registry of surrogate keys. Natural keys (e.g. student name and intake date) are mapped to integer ids
+    that never change once allocated, so the `index` of a row is the same in every run. The registry is a single
+    indexed table, `surrogate_key`, kept either in the loaded database or in a local SQLite file (which also survives
+    the database being rebuilt). Keys are looked up in batches and new ids are allocated in bulk.
+
+    A natural key names one row: rows sharing it have to be copies of each other (e.g. a record extracted twice), they
+    get the same id. Rows sharing a natural key with different values are rejected, their columns in
+    schema.natural_keys do not tell them apart.
+
+    Besides the ids of the rows themselves, the registry keeps the keys children are matched on in the relationship
+    plan (aliases, e.g. 'student_information(student_name)'), so rows can be related to parents from earlier runs.
+
+Example use:
+    key_registry = KeyRegistry(create_engine("sqlite:///keys.db"))
+    ids = key_registry.get_or_allocate("weakness", ["Impatient", "Chatty"])
+    tables, _, _ = run_relationship_plan(tables, relationship_plan, key_registry=key_registry,
+                                         natural_keys=natural_keys)
+"""
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, String, Integer, select, func
+
+
+def _key_values(column: pd.Series) -> pd.Series:
+    """
+    Normalise the values of a key column, so a row spelled differently only in case or spacing keeps its key
+    e.g. ' John  WICK' -> 'john wick'. Digits and punctuation are kept, 'Data 28' and 'Data 29' are different courses.
+    """
+    return column.astype(str).str.lower().str.split().str.join(' ')
+
+
+def natural_key(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Build the key identifying each row from its normalised values (see _key_values)
+    e.g. student_name = John Wick, date = [5, 10, 2022] -> 'john wick|[5, 10, 2022]'
+    """
+    return _key_values(df[columns[0]]).str.cat([_key_values(df[col]) for col in columns[1:]], sep='|')
+
+
+def check_copies(table_name: str, df: pd.DataFrame, columns: list[str], keys: pd.Series) -> None:
+    """
+    Make sure rows sharing a natural key are copies of each other, their positional `index` aside.
+
+    :param table_name: name of the table, for the error message
+    :param df: dataframe of the table
+    :param columns: columns making up the natural key
+    :param keys: natural key of each row (see natural_key)
+    :raise ValueError: rows with the same natural key have different values
+    """
+    repeated = keys.duplicated(keep=False)
+    if not repeated.any():
+        return
+    values = df.loc[repeated, [col for col in df.columns if col != "index" and col not in columns]].astype(str)
+    variants = values.agg('|'.join, axis=1).groupby(keys[repeated]).nunique()
+    conflicts = variants.index[variants > 1].tolist()
+    if conflicts:
+        raise ValueError(f"{table_name}: {len(conflicts)} natural keys ({', '.join(columns)}) name rows with different "
+                         f"values e.g. '{conflicts[0]}', add a column telling them apart to schema.natural_keys")
+
+
+def match_key(df: pd.DataFrame, on: list[str]) -> pd.Series:
+    """
+    Build the key rows were matched on in the relationship plan, the same way as df_relationship_builder.columns_to_id
+    e.g. student_name = John Wick, date = [5, 10, 2022] -> 'john wick 102022'
+    """
+    key = df[on[0]].str.lower()
+    if len(on) >= 2:
+        key = key + ' ' + df[on[1]].map(lambda date: str(date[1]) + str(date[2]))
+    return key
+
+
+def alias_namespace(table_name: str, on: list[str]) -> str:
+    return f"{table_name}({','.join(on)})"
+
+
+def registry_metadata() -> MetaData:
+    metadata = MetaData()
+    Table(
+        "surrogate_key", metadata,
+        Column("namespace", String(64), primary_key=True),
+        Column("natural_key", String(255), primary_key=True),
+        Column("id", Integer, nullable=False)
+    )
+    return metadata
+
+
+class KeyRegistry:
+    """
+    Example use:
+    key_registry = KeyRegistry(engine)
+    ids = key_registry.assign_ids("student_information", student_information_df, ["student_name", "date"])
+    """
+
+    def __init__(self, engine, *, batch_size: int = 1000) -> None:
+        """
+        Create the registry table if it does not exist.
+
+        :param engine: SQLAlchemy engine of the database keeping the registry
+        :param batch_size: number of keys per lookup query
+        """
+        self.engine = engine
+        self.batch_size = batch_size
+        metadata = registry_metadata()
+        self.table = metadata.tables["surrogate_key"]
+        metadata.create_all(engine)
+
+    def _lookup(self, con, namespace: str, keys: list[str]) -> dict[str, int]:
+        found = {}
+        for i in range(0, len(keys), self.batch_size):
+            query = select(self.table.c.natural_key, self.table.c.id).where(
+                self.table.c.namespace == namespace, self.table.c.natural_key.in_(keys[i:i + self.batch_size])
+            )
+            found.update(con.execute(query).fetchall())
+        return found
+
+    def lookup(self, namespace: str, keys: list[str]) -> dict[str, int]:
+        """
+        Find ids of keys that are registered already.
+
+        :param namespace: table name or alias namespace
+        :param keys: natural keys
+        :return: natural key -> id, for the keys found
+        """
+        with self.engine.begin() as con:
+            return self._lookup(con, namespace, list(dict.fromkeys(keys)))
+
+    def get_or_allocate(self, namespace: str, keys: list[str]) -> list[int]:
+        """
+        Find ids of keys, allocating consecutive new ids (after the highest id of the namespace) to unknown keys.
+
+        :param namespace: table name
+        :param keys: natural keys
+        :return: id of each key, in the order of keys
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        with self.engine.begin() as con:
+            found = self._lookup(con, namespace, unique_keys)
+            new_keys = [key for key in unique_keys if key not in found]
+            if new_keys:
+                max_id = con.execute(
+                    select(func.max(self.table.c.id)).where(self.table.c.namespace == namespace)
+                ).scalar()
+                first_id = 0 if max_id is None else max_id + 1
+                allocated = dict(zip(new_keys, range(first_id, first_id + len(new_keys))))
+                con.execute(self.table.insert(), [
+                    {"namespace": namespace, "natural_key": key, "id": key_id} for key, key_id in allocated.items()
+                ])
+                found.update(allocated)
+        return [found[key] for key in keys]
+
+    def register(self, namespace: str, keys: list[str], ids: list[int]) -> None:
+        """
+        Register ids of keys that are not registered yet. The first id given for a key wins, as in
+        df_relationship_builder, where a child is matched with the first parent sharing its key.
+
+        :param namespace: alias namespace
+        :param keys: natural keys
+        :param ids: id of each key
+        """
+        pairs = {}
+        for key, key_id in zip(keys, ids):
+            pairs.setdefault(key, key_id)
+        with self.engine.begin() as con:
+            found = self._lookup(con, namespace, list(pairs))
+            rows = [
+                {"namespace": namespace, "natural_key": key, "id": int(key_id)}
+                for key, key_id in pairs.items() if key not in found
+            ]
+            if rows:
+                con.execute(self.table.insert(), rows)
+
+    def assign_ids(self, table_name: str, df: pd.DataFrame, columns: list[str]) -> pd.Series:
+        """
+        Get the stable id of every row of a table. Copies of a row get the same id (see check_copies).
+
+        :param table_name: name of the table (namespace of its keys)
+        :param df: dataframe of the table
+        :param columns: columns making up the natural key (see schema.natural_keys)
+        :return: id of each row, aligned with df
+        """
+        keys = natural_key(df, columns)
+        check_copies(table_name, df, columns, keys)
+        return pd.Series(self.get_or_allocate(table_name, keys.tolist()), index=df.index)
+
+    def register_aliases(self, table_name: str, df: pd.DataFrame, on: list[str]) -> None:
+        """
+        Remember the ids of rows under the key children are matched on.
+        """
+        self.register(alias_namespace(table_name, on), match_key(df, on).tolist(), df["index"].tolist())
+
+    def resolve(self, table_name: str, df: pd.DataFrame, on: list[str]) -> pd.Series:
+        """
+        Find ids of the parents of child rows among the aliases registered by register_aliases.
+
+        :param table_name: name of the parent table
+        :param df: child rows with the columns on
+        :param on: columns the child is matched on
+        :return: parent id of each row (missing if not found), aligned with df
+        """
+        keys = match_key(df, on)
+        return keys.map(self.lookup(alias_namespace(table_name, on), keys.tolist())).astype("Int64")
@@ -0,0 +1,58 @@
+"""
+Note:
+    Load tables concurrently, one writer thread per table, each on its own connection from the engine's pool. Tables
+    do not depend on each other until foreign keys are added, so that happens afterwards in a final phase (see
+    ddl.add_foreign_keys). The largest tables are started first, so the total load time approaches the time of the
+    largest table.
+
+Example use:
+    engine = create_engine(uri, pool_size=4, max_overflow=0, connect_args={"local_infile": 1})
+    results = load_tables(engine, {"trainer": trainer_df, "course": course_df}, max_writers=4)
+    rows, seconds, method = results["trainer"]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from .bulk_loader import bulk_load
+
+
+def _load_table(engine, table_name: str, df: pd.DataFrame, chunksize: int, foreign_key_checks: bool) -> tuple:
+    """
+    Load a single table in its own transaction. Runs in a writer thread.
+    """
+    with engine.begin() as con:
+        if not foreign_key_checks:
+            con.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 0;")
+        try:
+            return bulk_load(con, table_name, df, chunksize=chunksize)
+        finally:
+            # the connection goes back to the pool, do not leave the checks disabled for the next user
+            if not foreign_key_checks:
+                con.exec_driver_sql("SET FOREIGN_KEY_CHECKS = 1;")
+
+
+def load_tables(
+        engine,
+        tables: dict[str, pd.DataFrame],
+        *, max_writers: int = 4,
+        chunksize: int = 5000,
+        foreign_key_checks: bool = True
+) -> dict[str, tuple[int, float, str]]:
+    """
+    Load every dataframe into the existing table of the same name, up to max_writers tables at a time.
+
+    :param engine: SQLAlchemy engine, its pool should hold at least max_writers connections
+    :param tables: dataframes keyed by table name, columns named as in the table
+    :param max_writers: number of tables loaded at the same time
+    :param chunksize: number of rows per INSERT statement when LOAD DATA LOCAL INFILE is not available
+    :param foreign_key_checks: set to False when the tables were created with foreign keys (MySQL only)
+    :return: output of bulk_load (rows, seconds, method) keyed by table name, in the order of tables
+    """
+    largest_first = sorted(tables, key=lambda table_name: len(tables[table_name]), reverse=True)
+    with ThreadPoolExecutor(max_workers=max_writers) as pool:
+        futures = {
+            table_name: pool.submit(
+                _load_table, engine, table_name, tables[table_name], chunksize, foreign_key_checks
+            )
+            for table_name in largest_first
+        }
+        return {table_name: futures[table_name].result() for table_name in tables}
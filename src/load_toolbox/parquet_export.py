@@ -0,0 +1,119 @@
+"""
+Note:
+    Export the final tables as Parquet for analytics, so reports do not have to query MySQL. Tables with an intake
+    date are partitioned by intake month (`<table>/intake_month=2019-08/part-0.parquet`), the others (dimension
+    tables, trainer) are written as a single partition. Strings are dictionary encoded and every column chunk
+    carries min/max statistics, so readers can skip files and row groups by date range or course.
+
+    Each table is written into a temporary directory first, which then replaces the directory of the previous export
+    as a whole, so no month partition of an older export is left behind.
+
+    The export reads the same dataframes the sink loads (no second copy is made in pandas) and runs in a thread next
+    to the load; pyarrow releases the GIL while encoding and writing.
+
+Example use:
+    intake_months = {name: intake_month(tables[name]) for name in tables_list if "date" in tables[name]}
+    results = export_tables(load_frames, "parquet", intake_months)
+    rows, files, seconds = results["academy_performance"]
+
+    # read back only one month
+    pd.read_parquet("parquet/academy_performance", filters=[("intake_month", "=", "2019-08")])
+"""
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+partition_column = "intake_month"
+
+
+def intake_month(df: pd.DataFrame) -> pd.Series:
+    """
+    Format the intake date of each row as its month e.g. [1, 8, 2019] -> '2019-08'. Missing dates become None.
+    """
+    return df["date"].map(lambda date: f"{date[2]:04d}-{date[1]:02d}" if date else None)
+
+
+def _to_arrow(df: pd.DataFrame, months: Optional[pd.Series]) -> pa.Table:
+    """
+    Convert dataframe to an Arrow table column by column. Keys stored by pandas as floats (because of missing values)
+    are written as integers.
+    """
+    arrays = []
+    for col in df.columns:
+        column = df[col]
+        if pd.api.types.is_float_dtype(column) and (column.dropna() % 1 == 0).all():
+            arrays.append(pa.array(column, type=pa.int64(), from_pandas=True))
+        else:
+            arrays.append(pa.array(column, from_pandas=True))
+    names = list(df.columns)
+    if months is not None:
+        arrays.append(pa.array(months, type=pa.string(), from_pandas=True))
+        names.append(partition_column)
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def export_table(
+        table_name: str,
+        df: pd.DataFrame,
+        root: Path,
+        months: Optional[pd.Series] = None,
+        *, row_group_size: int = 64 * 1024
+) -> tuple[int, int, float]:
+    """
+    Write one table as a Parquet dataset, replacing everything a previous export wrote.
+
+    :param table_name: name of the table (directory of the dataset)
+    :param df: final dataframe of the table
+    :param root: directory of the export
+    :param months: intake month of each row (aligned with df by position), None to write the table unpartitioned
+    :param row_group_size: maximum rows per row group
+    :return: number of rows, number of files written and time it took
+    """
+    start = time.perf_counter()
+    files = []
+    path = Path(root) / table_name
+    partial = path.with_name(f"{table_name}.partial")
+    shutil.rmtree(partial, ignore_errors=True)
+    pq.write_to_dataset(
+        _to_arrow(df, months),
+        partial,
+        partition_cols=[partition_column] if months is not None else None,
+        basename_template="part-{i}.parquet",
+        file_visitor=files.append,
+        use_dictionary=True,
+        write_statistics=True,
+        compression="snappy",
+        row_group_size=row_group_size
+    )
+    shutil.rmtree(path, ignore_errors=True)
+    partial.rename(path)
+    return len(df), len(files), time.perf_counter() - start
+
+
+def export_tables(
+        tables: dict[str, pd.DataFrame],
+        root,
+        intake_months: dict[str, pd.Series],
+        *, max_workers: int = 2
+) -> dict[str, tuple[int, int, float]]:
+    """
+    Export every table, tables in intake_months partitioned by intake month.
+
+    :param tables: final dataframes keyed by table name (the frames given to the sink)
+    :param root: directory of the export
+    :param intake_months: table name -> intake month of each row (see intake_month)
+    :param max_workers: number of tables written at the same time
+    :return: output of export_table (rows, files, seconds) keyed by table name, in the order of tables
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            table_name: pool.submit(export_table, table_name, df, Path(root), intake_months.get(table_name))
+            for table_name, df in tables.items()
+        }
+        return {table_name: future.result() for table_name, future in futures.items()}
@@ -0,0 +1,253 @@
+"""
+Note:
+    ELT mode: foreign keys are resolved by the database instead of df_relationship_builder. The cleaned dataframes of
+    each source are bulk loaded into staging tables (`stg_<table>`) with an indexed column for every key they are
+    matched on, then each table of the final schema is filled with a single INSERT ... SELECT joining the staging
+    tables. The matching rules are the same as in the relationship plan:
+        - a child row gets the first parent row (lowest position) sharing its key
+        - "1-to-1" rows are matched with the parent row at the same position
+        - dimension tables list the values of the junction in order of their first appearance
+    Ids are the positions of the rows, as after hard_reset_index.
+
+Example use:
+    with engine.begin() as con:
+        metadata.create_all(con)
+        results = pushdown_load(con, outputs_by_table(transform_outputs), metadata, relationship_plan, connection_list)
+
+    # compare with the pandas path on a local SQLite file (run from src)
+    $ python -m load_toolbox.pushdown sqlite:////tmp/virtual_sparta.db
+"""
+import time
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, Integer, String, Index, select, insert, func, and_
+from .bulk_loader import bulk_load
+from .ddl import is_junction
+from .key_registry import match_key
+from .incremental import load_order
+
+
+staging_prefix = "stg_"
+
+
+def key_column(on: list[str]) -> str:
+    return f"key_{'_'.join(on)}"
+
+
+def _dimension_name(relationship) -> str:
+    return relationship.child.removesuffix("_junction")
+
+
+def staging_columns(table_name: str, metadata: MetaData, plan: list) -> tuple[list[str], list[str]]:
+    """
+    List the columns of the staging table of a cleaned dataframe.
+
+    :return: value columns (copied to the final table) and key columns (used to match rows)
+    """
+    keys = []
+    values = []
+    for relationship in plan:
+        if table_name in (relationship.parent, relationship.child):
+            keys.append(key_column(relationship.on))
+        if table_name == relationship.child and relationship.cardinality == "many-to-many":
+            values.append(_dimension_name(relationship))
+    if not is_junction(table_name):
+        foreign_keys = {f"{relationship.parent}_id" for relationship in plan if relationship.child == table_name}
+        values += [col.name for col in metadata.tables[table_name].columns
+                   if col.name != "index" and col.name not in foreign_keys]
+    return values, list(dict.fromkeys(keys))
+
+
+def stage_frames(
+        con,
+        frames: dict[str, pd.DataFrame],
+        metadata: MetaData,
+        plan: list,
+        *, chunksize: int = 5000
+) -> dict[str, Table]:
+    """
+    Bulk load cleaned dataframes into staging tables, indexed on their keys.
+
+    :param con: SQLAlchemy connection
+    :param frames: cleaned dataframes keyed by table name (junctions in their composite form)
+    :param metadata: metadata of the final tables (see ddl.build_metadata)
+    :param plan: relationship plan (see schema.relationship_plan)
+    :param chunksize: rows per INSERT statement when LOAD DATA LOCAL INFILE is not available
+    :return: staging tables keyed by the name of the cleaned dataframe
+    """
+    staging_metadata = MetaData()
+    staged = {}
+    for table_name, frame in frames.items():
+        values, keys = staging_columns(table_name, metadata, plan)
+        dimensions = [
+            _dimension_name(relationship) for relationship in plan
+            if relationship.child == table_name and relationship.cardinality == "many-to-many"
+        ]
+        dimension_types = {dimension: metadata.tables[dimension].c[dimension].type for dimension in dimensions}
+        table = Table(
+            staging_prefix + table_name, staging_metadata,
+            Column("row_no", Integer, primary_key=True, autoincrement=False),
+            *[Column(col, dimension_types.get(col) or metadata.tables[table_name].c[col].type) for col in values],
+            *[Column(col, String(255)) for col in keys]
+        )
+        for col in keys:
+            Index(f"ix_{table.name}_{col}", table.c[col])
+        table.drop(con, checkfirst=True)
+        table.create(con)
+
+        df = frame.reset_index(drop=True)[values]
+        df.insert(0, "row_no", range(len(df)))
+        for relationship in plan:
+            if table_name in (relationship.parent, relationship.child):
+                df[key_column(relationship.on)] = match_key(frame.reset_index(drop=True), relationship.on)
+        bulk_load(con, table.name, df, chunksize=chunksize)
+        staged[table_name] = table
+    return staged
+
+
+def _first_rows(staged_parent: Table, on: list[str]):
+    """
+    Position of the first parent row of each key.
+    """
+    key = staged_parent.c[key_column(on)]
+    return select(key.label("key"), func.min(staged_parent.c.row_no).label("row_no")).group_by(key).subquery()
+
+
+def resolve_statement(table_name: str, metadata: MetaData, staged: dict[str, Table], plan: list):
+    """
+    Build the INSERT ... SELECT filling one table of the final schema from the staging tables.
+
+    :param table_name: name of the final table
+    :param metadata: metadata of the final tables
+    :param staged: output of stage_frames
+    :param plan: relationship plan
+    :return: INSERT statement
+    """
+    table = metadata.tables[table_name]
+    for relationship in plan:
+        if relationship.cardinality != "many-to-many":
+            continue
+        dimension = _dimension_name(relationship)
+        junction = staged[relationship.child]
+        if table_name == dimension:
+            # ids in order of first appearance, the missing value included
+            first = select(
+                junction.c[dimension].label("value"), func.min(junction.c.row_no).label("first_row")
+            ).group_by(junction.c[dimension]).subquery()
+            query = select(func.row_number().over(order_by=first.c.first_row) - 1, first.c.value)
+            return insert(table).from_select(["index", dimension], query)
+        if table_name == relationship.child:
+            parent = _first_rows(staged[relationship.parent], relationship.on)
+            dimension_table = metadata.tables[dimension]
+            query = select(parent.c.row_no, dimension_table.c["index"]).select_from(
+                junction
+                .outerjoin(parent, parent.c.key == junction.c[key_column(relationship.on)])
+                .outerjoin(dimension_table, dimension_table.c[dimension] == junction.c[dimension])
+            ).order_by(junction.c.row_no)
+            return insert(table).from_select([f"{relationship.parent}_id", f"{dimension}_id"], query)
+
+    child = staged[table_name]
+    values, _ = staging_columns(table_name, metadata, plan)
+    columns = {"index": child.c.row_no, **{col: child.c[col] for col in values}}
+    source = child
+    for relationship in plan:
+        if relationship.child != table_name:
+            continue
+        key = key_column(relationship.on)
+        if relationship.cardinality == "1-to-1":
+            parent = staged[relationship.parent].alias(f"{relationship.parent}_parent")
+            condition = and_(parent.c.row_no == child.c.row_no, parent.c[key] == child.c[key])
+        else:
+            parent = _first_rows(staged[relationship.parent], relationship.on).alias(f"{relationship.parent}_parent")
+            condition = parent.c.key == child.c[key]
+        source = source.outerjoin(parent, condition)
+        columns[f"{relationship.parent}_id"] = parent.c.row_no
+    query = select(*columns.values()).select_from(source).order_by(child.c.row_no)
+    return insert(table).from_select(list(columns), query)
+
+
+def pushdown_load(
+        con,
+        frames: dict[str, pd.DataFrame],
+        metadata: MetaData,
+        plan: list,
+        connection_list: list[tuple[str, str]],
+        *, chunksize: int = 5000
+) -> dict[str, tuple[int, float]]:
+    """
+    Stage cleaned dataframes and fill the final tables with set-based SQL. Staging tables are dropped at the end.
+
+    :param con: SQLAlchemy connection
+    :param frames: cleaned dataframes keyed by table name (output of the transforms, dates already converted)
+    :param metadata: metadata of the final tables, created already (see ddl.build_metadata)
+    :param plan: relationship plan (see schema.relationship_plan)
+    :param connection_list: (origin table, target table) pairs
+    :param chunksize: rows per INSERT statement when LOAD DATA LOCAL INFILE is not available
+    :return: number of rows and time it took, for the staging step ('staging') and for each final table
+    """
+    results = {}
+    start = time.perf_counter()
+    staged = stage_frames(con, frames, metadata, plan, chunksize=chunksize)
+    results["staging"] = sum(len(frame) for frame in frames.values()), time.perf_counter() - start
+
+    for table_name in load_order(list(metadata.tables), connection_list):
+        start = time.perf_counter()
+        rows = con.execute(resolve_statement(table_name, metadata, staged, plan)).rowcount
+        results[table_name] = rows, time.perf_counter() - start
+
+    for table in staged.values():
+        table.drop(con)
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    import datetime
+    import warnings
+    from pathlib import Path
+    from sqlalchemy import create_engine
+    from schema import tables_list, connection_list, relationship_plan, get_value
+    from transform_toolbox.transform_runner import run_transforms, outputs_by_table
+    from transform_toolbox.relationship_executor import run_relationship_plan
+    from load_toolbox.ddl import build_metadata
+    from load_toolbox.parallel_loader import load_tables
+
+    warnings.simplefilter(action='ignore', category=FutureWarning)
+    uri = sys.argv[1] if len(sys.argv) > 1 else "sqlite:///virtual_sparta_benchmark.db"
+    engine = create_engine(uri, connect_args={"local_infile": 1} if uri.startswith("mysql") else {})
+
+    pickle_jar_path = Path(__file__).parent.parent.parent.resolve() / "pickle_jar"
+    outputs, _ = run_transforms({
+        "academy_csv": pd.read_pickle(pickle_jar_path / "academy_csv_v2.pkl"),
+        "talent_csv": pd.read_pickle(pickle_jar_path / "talent_csv_v2.pkl"),
+        "talent_json": pd.read_pickle(pickle_jar_path / "talent_json.pkl"),
+        "talent_txt": pd.read_pickle(pickle_jar_path / "talent_txt_v2.pkl")
+    })
+    frames = outputs_by_table(outputs)
+
+    def list_to_date(arr):
+        return datetime.date(arr[2], arr[1], arr[0]) if arr else None
+    frames["student_information"]["dob"] = frames["student_information"]["dob"].apply(list_to_date)
+    frames["invitation"]["invited_date"] = frames["invitation"]["invited_date"].apply(list_to_date)
+    metadata = build_metadata({name: get_value(name + "_dtypes") for name in tables_list}, connection_list)
+
+    def reset_tables():
+        with engine.begin() as con:
+            metadata.drop_all(con)
+            metadata.create_all(con)
+
+    reset_tables()
+    start = time.perf_counter()
+    tables, _, _ = run_relationship_plan(dict(frames), relationship_plan)
+    relationships_done = time.perf_counter()
+    load_tables(engine, {name: tables[name][list(get_value(name + "_dtypes"))] for name in tables_list})
+    pandas_done = time.perf_counter()
+    print(f"pandas:   {pandas_done - start:.2f}s (relationships {relationships_done - start:.2f}s, "
+          f"load {pandas_done - relationships_done:.2f}s)")
+
+    reset_tables()
+    start = time.perf_counter()
+    with engine.begin() as con:
+        results = pushdown_load(con, frames, metadata, relationship_plan, connection_list)
+    print(f"pushdown: {time.perf_counter() - start:.2f}s (staging {results['staging'][1]:.2f}s)")
+    for table_name in tables_list:
+        print(f"\t{table_name}... {results[table_name][0]} rows in {results[table_name][1]:.2f}s")
@@ -0,0 +1,194 @@
+"""
+Note:
+    Targets of the load stage. A sink owns the engine and knows how to prepare the database, create the tables from
+    schema.py, load the dataframes and finish off with the foreign keys. run.py talks to the sink only, so the same
+    pipeline runs against MySQL (in Docker) or a local SQLite file (no server needed, e.g. for benchmarks).
+
+    SQLite cannot add constraints to existing tables, so SQLiteSink always declares foreign keys in CREATE TABLE and
+    loads with the checks off (SQLite's default); in mode 'validate' orphans are counted after loading instead.
+    SQLite has a single writer, so tables are loaded one after another, each in batched transactions.
+
+Example use:
+    sink = SQLiteSink("virtual_sparta.db")
+    sink.prepare()
+    sink.create_tables(table_dtypes, connection_list)
+    results = sink.load(tables)
+    sink.finish(tables_list, connection_list)
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+import pprint as pp
+from pathlib import Path
+from subprocess import call
+from typing import Optional
+import pandas as pd
+from sqlalchemy import create_engine, event, inspect
+from .bulk_loader import prepare_frame
+from .ddl import build_metadata, add_foreign_keys, orphan_counts
+from .parallel_loader import load_tables
+
+
+class Sink(ABC):
+    """
+    Base class of load targets. Subclasses set self.engine and self.fk_mode.
+    """
+    engine = None
+    fk_mode = "validate"
+
+    @abstractmethod
+    def prepare(self, *, keep: bool = False) -> None:
+        """
+        Start from an empty database.
+
+        :param keep: keep the existing database (incremental runs)
+        """
+
+    def create_tables(self, table_dtypes: dict[str, dict], connection_list: list[tuple[str, str]], *,
+                      foreign_keys: bool = False):
+        """
+        Create the tables with primary keys and indexes (see ddl.build_metadata).
+
+        :param table_dtypes: table name -> column dtypes
+        :param connection_list: (origin table, target table) pairs
+        :param foreign_keys: declare foreign keys in CREATE TABLE
+        :return: metadata of the tables
+        """
+        foreign_keys = foreign_keys or self.fk_mode == "deferred"
+        metadata = build_metadata(table_dtypes, connection_list, foreign_keys=foreign_keys)
+        with self.engine.begin() as con:
+            metadata.create_all(con)
+        return metadata
+
+    @abstractmethod
+    def load(self, tables: dict[str, pd.DataFrame], *, chunksize: int = 5000) -> dict[str, tuple[int, float, str]]:
+        """
+        Load dataframes into the existing tables of the same name.
+
+        :return: rows, seconds and method keyed by table name, in the order of tables
+        """
+
+    @abstractmethod
+    def finish(self, table_names: list[str], connection_list: list[tuple[str, str]], *,
+               foreign_keys: bool = True) -> None:
+        """
+        Add (or check) foreign keys once every table is loaded and print the tables.
+
+        :param table_names: tables to print
+        :param connection_list: (origin table, target table) pairs
+        :param foreign_keys: False if the tables were not fully reloaded (incremental runs)
+        """
+
+
+class MySQLSink(Sink):
+    """
+    Example use:
+    sink = MySQLSink(uri, restart_script=project_path / "restart_docker_container.sh", writers=4)
+    """
+
+    def __init__(self, uri: str, *, restart_script: Optional[Path] = None, writers: int = 4,
+                 fk_mode: str = "validate") -> None:
+        """
+        :param uri: SQLAlchemy URI of the database
+        :param restart_script: script recreating the Docker container, run by prepare
+        :param writers: number of tables loaded at the same time (size of the connection pool)
+        :param fk_mode: 'validate' (add foreign keys after loading) or 'deferred' (declare them, load unchecked)
+        """
+        self.engine = create_engine(uri, pool_size=writers, max_overflow=0, connect_args={"local_infile": 1})
+        self.restart_script = restart_script
+        self.writers = writers
+        self.fk_mode = fk_mode
+
+    def prepare(self, *, keep: bool = False) -> None:
+        if not keep and self.restart_script is not None:
+            call(str(self.restart_script), shell=True)
+
+    def load(self, tables: dict[str, pd.DataFrame], *, chunksize: int = 5000) -> dict[str, tuple[int, float, str]]:
+        return load_tables(self.engine, tables, max_writers=self.writers, chunksize=chunksize,
+                           foreign_key_checks=(self.fk_mode == "validate"))
+
+    def finish(self, table_names: list[str], connection_list: list[tuple[str, str]], *,
+               foreign_keys: bool = True) -> None:
+        with self.engine.begin() as con:
+            if foreign_keys and self.fk_mode == "validate":
+                print("Validating and adding foreign keys... ", end='')
+                add_foreign_keys(con, connection_list)
+                print("DONE")
+            pp.pprint(con.execute("SHOW TABLES;").fetchall())
+            for table_name in table_names:
+                pp.pprint(con.execute(f"DESCRIBE {table_name};").fetchall())
+
+
+def _sqlite_pragmas(dbapi_connection, _) -> None:
+    # the file is rebuilt on every full run, durability is not worth an fsync per transaction
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode = WAL;")
+    cursor.execute("PRAGMA synchronous = OFF;")
+    cursor.close()
+
+
+def _rows(df: pd.DataFrame) -> list[tuple]:
+    """
+    Convert dataframe to tuples of Python values, missing values as None.
+    """
+    df = prepare_frame(df).astype(object)
+    return list(df.where(df.notna(), None).itertuples(index=False, name=None))
+
+
+class SQLiteSink(Sink):
+    """
+    Example use:
+    sink = SQLiteSink("virtual_sparta.db", fk_mode="deferred")
+    """
+
+    def __init__(self, path: str, *, fk_mode: str = "validate") -> None:
+        """
+        :param path: database file
+        :param fk_mode: 'validate' (count orphans after loading and raise if any) or 'deferred' (do not check)
+        """
+        self.path = path
+        self.fk_mode = fk_mode
+        self.engine = create_engine(f"sqlite:///{path}")
+        event.listen(self.engine, "connect", _sqlite_pragmas)
+
+    def prepare(self, *, keep: bool = False) -> None:
+        if not keep and os.path.exists(self.path):
+            self.engine.dispose()
+            for suffix in ["", "-wal", "-shm"]:
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+
+    def create_tables(self, table_dtypes: dict[str, dict], connection_list: list[tuple[str, str]], *,
+                      foreign_keys: bool = False):
+        # foreign keys cannot be added once the tables exist
+        return super().create_tables(table_dtypes, connection_list, foreign_keys=True)
+
+    def load(self, tables: dict[str, pd.DataFrame], *, chunksize: int = 5000) -> dict[str, tuple[int, float, str]]:
+        """
+        Insert each dataframe with executemany, chunksize rows per transaction.
+        """
+        results = {}
+        for table_name, df in tables.items():
+            start = time.perf_counter()
+            columns = ', '.join(f'"{col}"' for col in df.columns)
+            parameters = ', '.join('?' * len(df.columns))
+            statement = f'INSERT INTO "{table_name}" ({columns}) VALUES ({parameters});'
+            for i in range(0, len(df), chunksize):
+                with self.engine.begin() as con:
+                    con.exec_driver_sql(statement, _rows(df.iloc[i:i + chunksize]))
+            results[table_name] = len(df), time.perf_counter() - start, "insert"
+        return results
+
+    def finish(self, table_names: list[str], connection_list: list[tuple[str, str]], *,
+               foreign_keys: bool = True) -> None:
+        with self.engine.begin() as con:
+            if foreign_keys and self.fk_mode == "validate":
+                print("Validating foreign keys... ", end='')
+                orphans = {pair: n for pair, n in orphan_counts(con, connection_list).items() if n}
+                if orphans:
+                    raise ValueError(f"Orphaned rows found: {orphans}")
+                print("DONE")
+        inspector = inspect(self.engine)
+        pp.pprint(inspector.get_table_names())
+        for table_name in table_names:
+            pp.pprint([(col["name"], str(col["type"]), col["nullable"]) for col in inspector.get_columns(table_name)])
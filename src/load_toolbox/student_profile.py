@@ -0,0 +1,156 @@
+"""
+Note:
+    Denormalized student profiles for lookups of a single candidate: one JSON document per student with everything
+    otherwise spread over student_information, invitation, test_score, trainee_performance, academy_performance and
+    the junction/dimension pairs. The documents are built from the related dataframes with merges and one groupby per
+    nested list, and loaded into `student_profile` keyed by the student's id, so reading a profile is a single
+    primary key fetch.
+
+    Profile document:
+        {"student_id": 0, "student_name": ..., <other student_information columns>,
+         "invitation": {"invited_date": ..., "invited_by": ...},
+         "test_score": {"psychometrics_score": ..., "psychometrics_max": ..., "presentation_score": ..., ...},
+         "trainee_performance": {"self_development": ..., ..., "result": ..., "course_interest": ...},
+         "strengths": [...], "weaknesses": [...], "tech_self_scores": [{"tech_self_score": "C#", "value": 6}, ...],
+         "academy_performance": [{"course_name": ..., "week": "W1", "analytic": ..., ...}, ...]}
+
+Example use:
+    profiles = build_profiles(tables)
+    with engine.begin() as con:
+        load_profiles(con, profiles)
+        con.execute("SELECT profile FROM student_profile WHERE student_id = 42;")
+"""
+import json
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, Index, Integer, String, JSON, delete
+from .bulk_loader import bulk_load
+
+
+student_columns = ["student_name", "gender", "dob", "email", "city", "address", "postcode", "phone_number", "uni",
+                   "degree"]
+test_score_columns = ["psychometrics_score", "psychometrics_max", "presentation_score", "presentation_max"]
+academy_columns = ["course_name", "week", "analytic", "independent", "determined", "professional", "studious",
+                   "imaginative"]
+
+
+def profile_metadata() -> MetaData:
+    metadata = MetaData()
+    profile = Table(
+        "student_profile", metadata,
+        Column("student_id", Integer, primary_key=True, autoincrement=False),
+        Column("student_name", String(255)),
+        Column("profile", JSON, nullable=False)
+    )
+    Index("ix_student_profile_student_name", profile.c.student_name)
+    return metadata
+
+
+def _records(df: pd.DataFrame) -> list[dict]:
+    """
+    Convert dataframe to dicts of Python values (dates as ISO strings), missing values as None.
+    """
+    df = df.astype(object)
+    df = df.where(df.notna(), None)
+    for col in df.columns:
+        df[col] = df[col].map(lambda value: value.isoformat() if hasattr(value, "isoformat") else value)
+    return df.to_dict("records")
+
+
+def _first(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Nest the columns of the first row of each student as a dict e.g. the test scores of a student.
+
+    :return: dicts keyed by student id
+    """
+    df = df[df["student_information_id"].notna()].drop_duplicates("student_information_id")
+    return pd.Series(_records(df[columns]), index=df["student_information_id"].astype(int).to_numpy())
+
+
+def _nested(df: pd.DataFrame, columns: list[str]) -> pd.Series:
+    """
+    Nest the columns of all rows of each student as a list of dicts (or of values without the missing ones, if there
+    is only one column).
+
+    :return: lists keyed by student id
+    """
+    df = df[df["student_information_id"].notna()]
+    if len(columns) == 1:
+        df = df[df[columns[0]].notna()]
+    values = _records(df[columns])
+    if len(columns) == 1:
+        values = [value[columns[0]] for value in values]
+    items = pd.Series(values, index=df["student_information_id"].astype(int).to_numpy(), dtype=object)
+    return items.groupby(level=0).agg(list)
+
+
+def _dimension_values(tables: dict[str, pd.DataFrame], dimension: str) -> pd.DataFrame:
+    """
+    Junction rows with the dimension value (and any other column kept from the composite dataframe).
+    """
+    junction = tables[f"{dimension}_junction"]
+    if dimension in junction:
+        return junction
+    names = tables[dimension].rename(columns={"index": f"{dimension}_id"})
+    return junction.merge(names, on=f"{dimension}_id", how="left")
+
+
+def build_profiles(tables: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Build the profile document of every student.
+
+    :param tables: related dataframes keyed by table name (dates already converted to datetime.date)
+    :return: student_id, student_name and profile (JSON text) of each student
+    """
+    students = tables["student_information"]
+    student_ids = students["index"].astype(int).to_numpy()
+    invitations = tables["invitation"][["index", "invited_date", "invited_by"]].rename(
+        columns={"index": "invitation_id"}
+    )
+    invitations = students[["invitation_id"]].merge(invitations, on="invitation_id", how="left")
+
+    documents = pd.DataFrame(_records(students[student_columns]), index=student_ids)
+    documents.insert(0, "student_id", student_ids)
+    documents["invitation"] = _records(invitations[["invited_date", "invited_by"]])
+    documents["test_score"] = _first(tables["test_score"], test_score_columns)
+    documents["trainee_performance"] = _first(
+        tables["trainee_performance"],
+        ["self_development", "geo_flex", "financial_support", "result", "course_interest"]
+    )
+    documents["strengths"] = _nested(_dimension_values(tables, "strength"), ["strength"])
+    documents["weaknesses"] = _nested(_dimension_values(tables, "weakness"), ["weakness"])
+    tech_self_scores = _dimension_values(tables, "tech_self_score")
+    documents["tech_self_scores"] = _nested(
+        tech_self_scores, [col for col in ["tech_self_score", "value"] if col in tech_self_scores]
+    )
+    courses = tables["course"][["index", "course_name"]].rename(columns={"index": "course_id"})
+    academy = tables["academy_performance"].drop(columns="course_name", errors="ignore").merge(
+        courses, on="course_id", how="left"
+    )
+    documents["academy_performance"] = _nested(academy, academy_columns)
+
+    # students without rows in a nested table get an empty list or null instead of NaN
+    for col in ["strengths", "weaknesses", "tech_self_scores", "academy_performance"]:
+        documents[col] = documents[col].map(lambda value: value if isinstance(value, list) else [])
+    documents = documents.astype(object).where(documents.notna(), None)
+
+    return pd.DataFrame({
+        "student_id": student_ids,
+        "student_name": students["student_name"].to_numpy(),
+        "profile": [json.dumps(document) for document in documents.to_dict("records")]
+    })
+
+
+def load_profiles(con, profiles: pd.DataFrame, *, chunksize: int = 5000) -> int:
+    """
+    Create student_profile if needed and replace its rows.
+
+    :param con: SQLAlchemy connection
+    :param profiles: output of build_profiles
+    :param chunksize: rows per INSERT statement when LOAD DATA LOCAL INFILE is not available
+    :return: number of profiles loaded
+    """
+    metadata = profile_metadata()
+    metadata.create_all(con)
+    con.execute(delete(metadata.tables["student_profile"]))
+    rows, _, _ = bulk_load(con, "student_profile", profiles, chunksize=chunksize)
+    return rows
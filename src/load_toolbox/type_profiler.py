@@ -0,0 +1,122 @@
+"""
+Note:
+    Scan the transformed dataframes and replace the generic TEXT/INTEGER types from schema.py with the smallest types
+    that fit the data:
+        - strings with a closed set of values (the `values` of their check in schema.py) -> ENUM of the allowed values
+          and of the values found
+        - other strings -> VARCHAR(n), n being twice the longest value rounded up to a power of two
+        - integers -> TINYINT/SMALLINT when the range found, widened to the `low`/`high` of their check, allows
+    Keys (`index` and `<table>_id`) keep their declared type, so foreign keys still match the primary keys. Only the
+    types change, never the values, so later runs load the same data as the first one.
+    Incremental runs keep the tables a profiled full load created. Each string type leaves room for longer values,
+    and only a declared value set becomes an ENUM, because a value first seen by a later run would not fit an ENUM
+    made of the values found. Integer columns without a declared range are sized from the data of the profiled load
+    only.
+
+Example use:
+    table_dtypes = profile_tables(tables, table_dtypes, table_checks)
+"""
+import math
+from typing import Optional
+import pandas as pd
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TypeEngine, TEXT, INTEGER, SMALLINT, BOOLEAN, VARCHAR, Enum
+
+
+def is_key(column_name: str) -> bool:
+    return column_name == "index" or column_name.endswith("_id")
+
+
+def integer_type(low: int, high: int) -> TypeEngine:
+    """
+    Smallest integer type holding every value between low and high.
+    """
+    if -128 <= low and high <= 127:
+        return SMALLINT().with_variant(mysql.TINYINT(), "mysql")
+    if -32768 <= low and high <= 32767:
+        return SMALLINT()
+    return INTEGER()
+
+
+def varchar_length(max_length: int, *, headroom: int = 2) -> int:
+    """
+    Length of a VARCHAR holding values headroom times longer than the longest value, a power of two (at least 8).
+    """
+    return 2 ** math.ceil(math.log2(max(max_length * headroom, 8)))
+
+
+def _declared_class(dtype) -> type:
+    return dtype if isinstance(dtype, type) else type(dtype)
+
+
+def profile_column(column: pd.Series, check=None) -> TypeEngine:
+    """
+    Propose a type for a single TEXT or INTEGER column.
+
+    :param column: column of a transformed dataframe
+    :param check: check of the column declared in schema.py, if any - its `values` make a string column an ENUM,
+    its `low` and `high` widen the range of an integer column
+    :return: type of the column
+    """
+    values = column.dropna()
+    if column.dtype == bool:
+        return BOOLEAN()
+    if pd.api.types.is_numeric_dtype(column):
+        bounds = [int(bound) for bound in [getattr(check, "low", None), getattr(check, "high", None)]
+                  if bound is not None]
+        if not bounds and values.empty:
+            return INTEGER()
+        # values breaking the check are kept too, unless the load stops on them (--validate strict)
+        bounds += [int(values.min()), int(values.max())] if not values.empty else []
+        return integer_type(min(bounds), max(bounds))
+
+    text = values.astype(str)
+    if text.empty:
+        return TEXT()
+
+    if getattr(check, "values", None):
+        return Enum(*sorted(set(map(str, check.values)) | set(text.unique())), name=column.name)
+
+    return VARCHAR(varchar_length(int(text.str.len().max())))
+
+
+def profile_tables(
+        tables: dict[str, pd.DataFrame],
+        table_dtypes: dict[str, dict],
+        table_checks: Optional[dict[str, dict]] = None
+) -> dict[str, dict]:
+    """
+    Propose right-sized types for every table.
+
+    :param tables: related dataframes keyed by table name
+    :param table_dtypes: table name -> column dtypes declared in schema.py
+    :param table_checks: table name -> column checks declared in schema.py (see profile_column)
+    :return: table name -> new column dtypes, usable by build_metadata and the loader
+    """
+    profiled_dtypes = {}
+    for table_name, dtypes in table_dtypes.items():
+        profiled_dtypes[table_name] = {}
+        for col, dtype in dtypes.items():
+            if is_key(col) or not issubclass(_declared_class(dtype), (TEXT, INTEGER)):
+                profiled_dtypes[table_name][col] = dtype
+                continue
+            check = (table_checks or {}).get(table_name, {}).get(col)
+            profiled_dtypes[table_name][col] = profile_column(tables[table_name][col], check)
+    return profiled_dtypes
+
+
+def print_profile(table_dtypes: dict[str, dict], profiled_dtypes: dict[str, dict]) -> None:
+    """
+    Print every column whose type changed.
+    """
+    def type_name(dtype) -> str:
+        dtype = dtype() if isinstance(dtype, type) else dtype
+        return str(dtype.compile(dialect=mysql.dialect()))
+
+    for table_name, dtypes in profiled_dtypes.items():
+        before = {col: type_name(dtype) for col, dtype in table_dtypes[table_name].items()}
+        after = {col: type_name(dtype) for col, dtype in dtypes.items()}
+        changes = [f"{col} {before.get(col, 'new')} -> {after[col]}" for col in after if before.get(col) != after[col]]
+        changes += [f"{col} {before[col]} -> removed" for col in before if col not in after]
+        if changes:
+            print(f"\t{table_name}: {', '.join(changes)}")
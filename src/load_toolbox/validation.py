@@ -0,0 +1,207 @@
+"""
+Note:
+    Data-quality checks of the final dataframes before they are loaded. Every rule is evaluated as one boolean mask
+    over a whole column (True marks a violating row), so checking millions of rows takes a fraction of a second:
+        - type: values the declared column type cannot store, e.g. 2.5 in an INTEGER column or a list in a TEXT column
+        - nullable: missing values in a column declared with Check(nullable=False)
+        - unique: every row sharing its value with another row
+        - range: numbers or dates outside [low, high]
+        - values: values not in the allowed list
+        - pattern: strings not matching the regular expression as a whole
+        - foreign_key: `<parent>_id` values without a row in the parent table
+    The checks are declared next to the dtype maps in schema.py (`<table>_checks`), the types come from the dtype maps
+    and the foreign keys from connection_list. Values breaking the type rule are left out of the range, values and
+    pattern rules, missing values are left out of every rule but nullable.
+
+Example use:
+    table_checks = {table_name: get_value(table_name + "_checks") for table_name in tables_list}
+    results = validate_tables(tables, table_dtypes, table_checks, connection_list)
+    print_violations(results)
+"""
+import datetime
+from typing import Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy.types import Integer, Boolean, Date, String
+
+
+# kinds of pd.api.types.infer_dtype every value of which a TEXT column can store
+TEXT_KINDS = {"string", "categorical", "empty", "boolean", "integer", "floating", "mixed-integer-float", "decimal"}
+DATE_KINDS = {"date", "datetime", "empty"}
+
+
+def _declared_class(dtype) -> type:
+    # type classes, type instances and variants (with_variant) of the type profiler
+    dtype = dtype if isinstance(dtype, type) else getattr(dtype, "impl", dtype)
+    return dtype if isinstance(dtype, type) else type(dtype)
+
+
+def type_mask(column: pd.Series, dtype) -> np.ndarray:
+    """
+    Rows whose value the declared column type cannot store. Missing values are never a type violation.
+
+    :param column: column of a final dataframe
+    :param dtype: SQLAlchemy type (class or instance) of the column
+    :return: boolean mask, True for violating rows
+    """
+    declared = _declared_class(dtype)
+    none = np.zeros(len(column), dtype=bool)
+    if issubclass(declared, Boolean):
+        if pd.api.types.is_bool_dtype(column):
+            return none
+        return column.notna().to_numpy() & ~column.isin([True, False]).to_numpy()
+    if issubclass(declared, Integer):
+        if pd.api.types.is_bool_dtype(column) or pd.api.types.is_integer_dtype(column):
+            return none
+        numbers = pd.to_numeric(column, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            return column.notna().to_numpy() & (np.isnan(numbers) | (numbers % 1 != 0))
+    if issubclass(declared, Date):
+        if pd.api.types.is_datetime64_any_dtype(column) or pd.api.types.infer_dtype(column, skipna=True) in DATE_KINDS:
+            return none
+        return column.notna().to_numpy() & ~column.apply(isinstance, args=(datetime.date,)).to_numpy(dtype=bool)
+    if issubclass(declared, String):
+        if pd.api.types.infer_dtype(column, skipna=True) in TEXT_KINDS:
+            return none
+        return column.notna().to_numpy() & ~column.map(pd.api.types.is_scalar).to_numpy(dtype=bool)
+    return none
+
+
+def range_mask(column: pd.Series, low=None, high=None, *, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Rows with a value below low or above high (both inclusive, None for no bound).
+
+    :param valid: rows to compare (default: rows with a value), the other rows are never violating
+    """
+    mask = np.zeros(len(column), dtype=bool)
+    if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        # NaN is never outside the range
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        if low is not None:
+            mask |= values < low
+        if high is not None:
+            mask |= values > high
+        return mask if valid is None else mask & valid
+    if pd.api.types.is_datetime64_any_dtype(column):
+        low, high = [pd.Timestamp(bound) if bound is not None else None for bound in (low, high)]
+    valid = column.notna().to_numpy() if valid is None else valid
+    values = column.to_numpy()[valid]
+    outside = np.zeros(len(values), dtype=bool)
+    if low is not None:
+        outside |= values < low
+    if high is not None:
+        outside |= values > high
+    mask[valid] = outside
+    return mask
+
+
+def pattern_mask(column: pd.Series, pattern: str, *, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Rows with a value not matching the regular expression as a whole. Matching runs in Arrow (RE2 syntax), several
+    times faster than pandas' str.fullmatch.
+
+    :param valid: rows to match (default: rows with a value), the other rows are never violating
+    """
+    pattern = f"^(?:{pattern})$"
+    if pd.api.types.infer_dtype(column, skipna=True) == "string":
+        # missing values become nulls, no copy of the column needed
+        matches = pc.match_substring_regex(pa.array(column, type=pa.string(), from_pandas=True), pattern)
+        mask = ~matches.fill_null(True).to_numpy(zero_copy_only=False)
+        return mask if valid is None else mask & valid
+    valid = column.notna().to_numpy() if valid is None else valid
+    text = column.to_numpy()[valid].astype(str)
+    mask = np.zeros(len(column), dtype=bool)
+    mask[valid] = ~pc.match_substring_regex(pa.array(text, type=pa.string()), pattern).to_numpy(zero_copy_only=False)
+    return mask
+
+
+def column_masks(column: pd.Series, dtype, check=None) -> dict[str, np.ndarray]:
+    """
+    Evaluate the type rule and the rules of a schema.Check on a column.
+
+    :param column: column of a final dataframe
+    :param dtype: SQLAlchemy type of the column
+    :param check: schema.Check of the column, None for the type rule only
+    :return: boolean masks (True for violating rows) keyed by rule name, only for the rules declared
+    """
+    masks = {"type": type_mask(column, dtype)}
+    if check is None:
+        return masks
+    missing = column.isna().to_numpy()
+    # range, values and pattern only see values of the right type
+    valid = ~missing & ~masks["type"]
+    if not check.nullable:
+        masks["nullable"] = missing
+    if check.unique:
+        masks["unique"] = ~missing & column.duplicated(keep=False).to_numpy()
+    if check.low is not None or check.high is not None:
+        masks["range"] = range_mask(column, check.low, check.high, valid=valid)
+    if check.values is not None:
+        masks["values"] = valid & ~column.isin(check.values).to_numpy()
+    if check.pattern is not None:
+        masks["pattern"] = pattern_mask(column, check.pattern, valid=valid)
+    return masks
+
+
+def foreign_key_mask(column: pd.Series, parent_index: pd.Series) -> np.ndarray:
+    """
+    Rows referencing a parent row that does not exist. Missing references are left to the nullable rule.
+    """
+    return column.notna().to_numpy() & ~column.isin(parent_index).to_numpy()
+
+
+def validate_tables(
+        tables: dict[str, pd.DataFrame],
+        table_dtypes: dict[str, dict],
+        table_checks: dict[str, dict],
+        connection_list: list[tuple[str, str]],
+        *, foreign_keys: bool = True, sample_size: int = 5
+) -> dict[tuple[str, str, str], tuple[int, pd.DataFrame]]:
+    """
+    Check every declared column of the dataframes, and every `<parent>_id` column of connection_list against the
+    `index` of the parent. Tables or columns missing from the dataframes (e.g. in an incremental batch) are skipped.
+
+    :param tables: final dataframes keyed by table name
+    :param table_dtypes: column types of each table (schema.py dtype maps)
+    :param table_checks: schema.Check of the columns of each table (schema.py `<table>_checks` maps)
+    :param connection_list: (child, parent) pairs of schema.py
+    :param foreign_keys: False to skip the foreign key rule, e.g. when the parents of a batch are in the database
+    :param sample_size: violating rows kept for each rule
+    :return: number of violating rows and the first violating rows (declared columns only) keyed by
+             (table, column, rule), for every rule checked
+    """
+    results = {}
+    for table_name, dtypes in table_dtypes.items():
+        if table_name not in tables:
+            continue
+        df = tables[table_name]
+        columns = [col for col in dtypes if col in df]
+        masks = {}
+        for col in columns:
+            for rule, mask in column_masks(df[col], dtypes[col], table_checks.get(table_name, {}).get(col)).items():
+                masks[(table_name, col, rule)] = mask
+        if foreign_keys:
+            for child, parent in connection_list:
+                if child == table_name and f"{parent}_id" in df and parent in tables:
+                    masks[(table_name, f"{parent}_id", "foreign_key")] = foreign_key_mask(
+                        df[f"{parent}_id"], tables[parent]["index"]
+                    )
+        for key, mask in masks.items():
+            rows = np.flatnonzero(mask)
+            results[key] = (len(rows), df.iloc[rows[:sample_size]][columns])
+    return results
+
+
+def print_violations(results: dict[tuple[str, str, str], tuple[int, pd.DataFrame]]) -> None:
+    """
+    Print every broken rule with the values of its first violating rows.
+    """
+    broken = 0
+    for (table_name, col, rule), (count, sample) in results.items():
+        if count:
+            broken += 1
+            print(f"\t{table_name}.{col} {rule}: {count} rows, e.g. {sample[col].tolist()} "
+                  f"(index {sample['index'].tolist() if 'index' in sample else sample.index.tolist()})")
+    print(f"\t{len(results) - broken}/{len(results)} rules passed")
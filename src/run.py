@@ -1,186 +1,559 @@
 import datetime
+import sys
+import tempfile
+import time
 from pathlib import Path
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-from transform_toolbox.df_relationship_builder import df_relationship_builder, many_to_many_relationship
 from sqlalchemy import create_engine
-from schema import tables_list, connection_list, get_value
-import pprint as pp
-from subprocess import call
-import sys
+from schema import tables_list, connection_list, relationship_plan, natural_keys, get_value
+import argparse
+
+from extract_files import ExtractFiles
+from transform_toolbox.transform_runner import run_transforms, outputs_by_table
+from transform_toolbox.compact_dtypes import compact_tables, compared_columns, print_memory_report
+from transform_toolbox.prefix_trie import names_path, load_prefixes, new_entries, append_entries
+from transform_toolbox.transform_cache import TransformCache
+from transform_toolbox.partitions import PartitionSpool, plan_partitions
+from transform_toolbox.checkpoints import CheckpointStore, code_version, file_fingerprint, stage_key
+from transform_toolbox.profiling import Profiler, print_profiles
+from transform_toolbox.relationship_executor import (
+    run_relationship_plan, print_relationship_timings, print_match_report
+)
+from load_toolbox.sinks import MySQLSink, SQLiteSink
+from load_toolbox.type_profiler import profile_tables, print_profile
+from load_toolbox.key_registry import KeyRegistry
+from load_toolbox.incremental import (
+    state_metadata, ingested_objects, extract_new_objects, tables_for_batch, incremental_load, record_objects
+)
+from load_toolbox.pushdown import pushdown_load
+from load_toolbox.parquet_export import export_tables, intake_month
+from load_toolbox.analytics_mart import build_mart, read_sources, affected_groups, merge_groups, load_mart
+from load_toolbox.student_profile import build_profiles, load_profiles
+from load_toolbox.validation import validate_tables, print_violations
+from run_metrics import RunMetrics, print_history_comparison
+
+
+def convert_dates(tables: dict[str, pd.DataFrame]) -> None:
+    """
+    Convert the [dd, mm, yyyy] lists of the date columns to datetime.date, in place.
+    """
+    def list_to_date(arr):
+        return datetime.date(arr[2], arr[1], arr[0]) if arr else None
+    for table_name, col in [("student_information", "dob"), ("invitation", "invited_date")]:
+        # an incremental batch may not include the table
+        if table_name in tables and col in tables[table_name]:
+            tables[table_name][col] = tables[table_name][col].apply(list_to_date)
+
+
+def table_rows(tables: dict[str, pd.DataFrame]) -> int:
+    return sum(len(df) for df in tables.values())
+
 
-from transform_toolbox.academy_csv import AcademyCSV
-from transform_toolbox.talent_csv import TalentCSV
-from transform_toolbox.talent_json import TalentJSON
-from transform_toolbox.talent_txt import TalentTXT
+def write_profiles(profiler: Profiler) -> None:
+    print(f"Writing profiles to {profiler.output_dir}... ", end='')
+    summaries = profiler.write()
+    print("DONE")
+    print_profiles(summaries)
+
+
+def write_metrics(metrics: RunMetrics, metrics_dir: str) -> None:
+    """
+    Write the metrics of the run and compare its stages with the previous runs.
+    """
+    report = metrics.write(Path(metrics_dir))
+    print(f"Metrics written to {metrics_dir} ({report['wall_seconds']:.2f}s)")
+    print_history_comparison(Path(metrics_dir) / "history.jsonl", report)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ETL pipeline for the Virtual Sparta Global dataset")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes used to transform sources and build relationships "
+                             "(default: number of CPUs)")
+    parser.add_argument("--shard", action="store_true",
+                        help="split each source by intake month and transform the shards in parallel")
+    parser.add_argument("--compact-dtypes", action="store_true",
+                        help="convert the transformed dataframes to smaller dtypes (categoricals, small integers, "
+                             "Arrow strings) before building relationships and print their memory usage")
+    parser.add_argument("--discover-names", action="store_true",
+                        help="after the transform stage, add the camel case names of the talent_csv source missing "
+                             "from camel_case_names.txt to the end of the list, for the next runs")
+    parser.add_argument("--fuzzy-threshold", type=float, default=None,
+                        help="fuzzy match rows left without a key using this name similarity (0-1); off by default")
+    parser.add_argument("--fuzzy-month-window", type=int, default=0,
+                        help="months before/after the intake month searched by fuzzy matching")
+    parser.add_argument("--sink", choices=["mysql", "sqlite"], default="mysql",
+                        help="'mysql': load into MySQL in Docker; 'sqlite': load into a local SQLite file "
+                             "(no Docker needed)")
+    parser.add_argument("--sqlite-path", default="virtual_sparta.db",
+                        help="database file of the SQLite sink")
+    parser.add_argument("--chunksize", type=int, default=5000,
+                        help="rows per INSERT statement when LOAD DATA LOCAL INFILE is not available "
+                             "(rows per transaction with the SQLite sink)")
+    parser.add_argument("--writers", type=int, default=4,
+                        help="number of tables loaded at the same time (size of the connection pool)")
+    parser.add_argument("--fk-mode", choices=["validate", "deferred"], default="validate",
+                        help="'validate': check for orphans and add all foreign keys after loading; "
+                             "'deferred': create foreign keys with the tables and load with the checks disabled")
+    parser.add_argument("--profile-types", action="store_true",
+                        help="size column types from the data (VARCHAR(n), ENUM of declared values, TINYINT) "
+                             "instead of the TEXT/INTEGER types from schema.py")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep the database, extract only objects not loaded yet from S3 and upsert their rows "
+                             "with stable ids (the database has to be built by incremental runs only)")
+    parser.add_argument("--key-registry", default=None,
+                        help="SQLite file keeping ids stable between runs, also across full reloads "
+                             "(incremental runs keep the registry in MySQL unless a file is given)")
+    parser.add_argument("--pushdown", action="store_true",
+                        help="load the cleaned dataframes into staging tables and resolve the keys in MySQL with "
+                             "INSERT ... SELECT instead of building relationships in pandas")
+    parser.add_argument("--parquet-dir", default=None,
+                        help="also export the final tables as Parquet partitioned by intake month into this "
+                             "directory, while they are loaded")
+    parser.add_argument("--mart", action="store_true",
+                        help="also load summary tables for reports (scores per course and week, pass rates per "
+                             "cohort), refreshing only the groups touched by incremental runs")
+    parser.add_argument("--student-profile", action="store_true",
+                        help="also load one JSON profile document per student into student_profile")
+    parser.add_argument("--validate", choices=["report", "strict"], default=None,
+                        help="check the tables against the types and constraints of schema.py before loading; "
+                             "'report': print the violations, 'strict': also stop before loading if there are any")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="keep the cleaned and the related dataframes in this directory and skip the stages "
+                             "whose inputs, code and options did not change since the last run")
+    parser.add_argument("--transform-cache", default=None,
+                        help="keep the transform output of each source object in this directory and transform only "
+                             "the objects that are new or changed since the last run")
+    parser.add_argument("--stream", action="store_true",
+                        help="run the pipeline on one intake month partition at a time, from extract to load, so "
+                             "memory use does not grow with the number of intakes")
+    parser.add_argument("--memory-budget", type=int, default=256,
+                        help="estimated memory (MB) a partition of --stream may take, consecutive months are "
+                             "grouped into partitions up to this size")
+    parser.add_argument("--spool-dir", default=tempfile.gettempdir() + "/virtual_sparta_spool",
+                        help="directory keeping the sources of --stream split by intake month between runs")
+    parser.add_argument("--metrics-dir", default=None,
+                        help="write the wall time, CPU time, rows, bytes read and peak memory of each stage, source "
+                             "and table into this directory as JSON and as a Prometheus textfile, and keep a history "
+                             "of the runs to compare with")
+    parser.add_argument("--profile-dir", default=None,
+                        help="profile each stage and each transform and relationship step (CPU time per function and "
+                             "allocations per line) and write sorted stats and collapsed stacks for flame graphs into "
+                             "this directory; slows the run down")
+    args = parser.parse_args()
+    if args.incremental and args.profile_types:
+        parser.error("--profile-types cannot be used with --incremental, the types of existing tables are kept")
+    if args.pushdown and (args.incremental or args.profile_types or args.key_registry or args.fuzzy_threshold):
+        parser.error("--pushdown resolves keys by exact matching of full loads only, it cannot be used with "
+                     "--incremental, --profile-types, --key-registry or --fuzzy-threshold")
+    if args.parquet_dir and (args.incremental or args.pushdown):
+        parser.error("--parquet-dir exports full loads only, it cannot be used with --incremental or --pushdown")
+    if args.student_profile and (args.incremental or args.pushdown):
+        parser.error("--student-profile is built from full loads only, it cannot be used with --incremental or "
+                     "--pushdown")
+
+    if args.checkpoint_dir and (args.incremental or args.key_registry):
+        parser.error("--checkpoint-dir resumes full loads only, it cannot be used with --incremental or "
+                     "--key-registry, whose ids depend on the state of the database")
+
+    if args.stream and (args.incremental or args.pushdown or args.profile_types or args.parquet_dir or args.mart
+                        or args.student_profile or args.validate or args.checkpoint_dir or args.transform_cache):
+        parser.error("--stream loads partitions one by one with upserts, it cannot be used with --incremental, "
+                     "--pushdown, --profile-types, --parquet-dir, --mart, --student-profile, --validate, "
+                     "--checkpoint-dir or --transform-cache, which need every table at once")
+    if args.discover_names and args.stream:
+        parser.error("--discover-names reads the names of every source object at once, it cannot be used with --stream")
+    if args.transform_cache and args.incremental:
+        parser.error("--transform-cache keeps the outputs of full loads only, it cannot be used with --incremental")
+
     project_path = Path(__file__).parent.parent.resolve()
     warnings.simplefilter(action='ignore', category=FutureWarning)
 
-    print("Restarting Docker container... ", end='')
-    call(str(project_path / "restart_docker_container.sh"), shell=True)
-    print("DONE")
+    # stages are always measured, the measures are written with --metrics-dir only
+    profiler = Profiler(Path(args.profile_dir) if args.profile_dir else None)
+    src_path = Path(__file__).resolve().parent
+    metrics = RunMetrics(release=code_version([
+        *sorted((src_path / "load_toolbox").glob("*.py")), src_path / "run.py", src_path / "schema.py",
+        src_path / "extract_files.py"
+    ]))
+
+    # set up the load target
+    if args.sink == "sqlite":
+        sink = SQLiteSink(args.sqlite_path, fk_mode=args.fk_mode)
+    else:
+        dialect = "mysql"
+        driver = "pymysql"
+        username = "root"
+        password = "root"
+        host = "127.0.0.1"
+        port = 3306
+        uri = f"{dialect}://{username}:{password}@{host}:{port}/virtual_sparta"
+        sink = MySQLSink(uri, restart_script=project_path / "restart_docker_container.sh", writers=args.writers,
+                         fk_mode=args.fk_mode)
+    engine = sink.engine
 
-    # import pickles
-    print("Importing .pkl files... ", end='')
     pickle_jar_path = project_path / "pickle_jar"
-    raw_academy_csv_df = pd.read_pickle(pickle_jar_path / "academy_csv_v2.pkl")
-    raw_talent_csv_df = pd.read_pickle(pickle_jar_path / "talent_csv_v2.pkl")
-    raw_talent_json_df = pd.read_pickle(pickle_jar_path / "talent_json.pkl")
-    raw_talent_txt_df = pd.read_pickle(pickle_jar_path / "talent_txt_v2.pkl")
-    print("DONE")
+    pickle_paths = {
+        "academy_csv": pickle_jar_path / "academy_csv_v2.pkl",
+        "talent_csv": pickle_jar_path / "talent_csv_v2.pkl",
+        "talent_json": pickle_jar_path / "talent_json.pkl",
+        "talent_txt": pickle_jar_path / "talent_txt_v2.pkl"
+    }
 
-    # instantiate transform classes
-    academy_csv_transform = AcademyCSV(raw_academy_csv_df)
-    talent_csv_transform = TalentCSV()
-    talent_json_transform = TalentJSON(raw_talent_json_df)
-    talent_txt_transform = TalentTXT()
-
-    # split and clean each dataframe
-    print("Slicing and cleaning dataframes... ", end='')
-    trainer_df, course_df, academy_performance_df = academy_csv_transform.transform_academy_csv()
-    student_information_df, invitation_df = talent_csv_transform.transform_talent_csv(raw_talent_csv_df)
-    (trainee_performance_df, weakness_junction_df, strength_junction_df,
-     tech_self_score_junction_df) = talent_json_transform.transform_talent_json()
-    test_score_df = talent_txt_transform.transform_talent_txt(raw_talent_txt_df)
-    print("DONE")
+    if args.incremental:
+        # extract only the objects previous runs did not load
+        print("Looking up ingested objects... ", end='')
+        with engine.begin() as con:
+            state_metadata().create_all(con)
+            recorded_objects = ingested_objects(con)
+        print(f"DONE ({len(recorded_objects)} objects)")
+        extract_stage = metrics.start("extract")
+        profile = profiler.start("stage.extract")
+        raw_dfs, new_objects = extract_new_objects(ExtractFiles("data32-final-project-files"), recorded_objects)
+        profiler.stop(profile)
+        metrics.stop(extract_stage, rows_out=table_rows(raw_dfs))
+        for source, raw_df in raw_dfs.items():
+            metrics.add("extract", {"source": source}, rows_out=len(raw_df))
+        if not new_objects:
+            print("No new objects to load")
+            sys.exit()
+    else:
+        print("Preparing the database... ", end='')
+        sink.prepare()
+        print("DONE")
 
-    # build relationships between dataframes
-    print("Building relationships between dataframes... (1/9)", end='')
-    student_information, invitation = df_relationship_builder(
-        left_df=student_information_df,
-        right_df=invitation_df,
-        common_columns=["student_name", "date"],
-        index_column_name="invitation_id",
-        relationship_type="1-to-1"
-    )
-    sys.stdout.write("\033[F")
-    print("\rBuilding relationships between dataframes... (2/9)", end='')
-
-    student_information, test_score = df_relationship_builder(
-        left_df=student_information,
-        right_df=test_score_df,
-        common_columns=["student_name", "date"],
-        index_column_name="student_information_id",
-        relationship_type="0-or-1-to-1",
-        where_index_column="right"
-    )
-    sys.stdout.write("\033[F")
-    print("\rBuilding relationships between dataframes... (3/9)", end='')
-
-    student_information, academy_performance = df_relationship_builder(
-        left_df=student_information,
-        right_df=academy_performance_df,
-        common_columns=["student_name"],
-        index_column_name="student_information_id",
-        relationship_type="0-or-1-to-1",
-        where_index_column="right"
-    )
-    print("\rBuilding relationships between dataframes... (4/9)", end='')
-
-    student_information, trainee_performance = df_relationship_builder(
-        left_df=student_information,
-        right_df=trainee_performance_df,
-        common_columns=["student_name", "date"],
-        index_column_name="student_information_id",
-        relationship_type="0-or-1-to-1",
-        where_index_column="right"
-    )
-    print("\rBuilding relationships between dataframes... (5/9)", end='')
-
-    student_information, tech_self_score_junction, tech_self_score = many_to_many_relationship(
-        df=student_information,
-        composite_junction_df=tech_self_score_junction_df,
-        col_name="tech_self_score",
-        index_col_names=["student_information_id", "tech_self_score_id"],
-        common_columns=["student_name", "date"]
-    )
-    print("\rBuilding relationships between dataframes... (6/9)", end='')
-
-    student_information, weakness_junction, weakness = many_to_many_relationship(
-        df=student_information,
-        composite_junction_df=weakness_junction_df,
-        col_name="weakness",
-        index_col_names=["student_information_id", "weakness_id"],
-        common_columns=["student_name", "date"]
-    )
-    print("\rBuilding relationships between dataframes... (7/9)", end='')
-
-    student_information, strength_junction, strength = many_to_many_relationship(
-        df=student_information,
-        composite_junction_df=strength_junction_df,
-        col_name="strength",
-        index_col_names=["student_information_id", "strength_id"],
-        common_columns=["student_name", "date"]
-    )
-    print("\rBuilding relationships between dataframes... (8/9)", end='')
-
-    course, academy_performance = df_relationship_builder(
-        left_df=course_df,
-        right_df=academy_performance,
-        common_columns=["course_name", "date"],
-        index_column_name="course_id",
-        relationship_type="1-to-many",
-        where_index_column="right"
-    )
-    print("\rBuilding relationships between dataframes... (9/9)", end='')
-
-    trainer, course = df_relationship_builder(
-        left_df=trainer_df,
-        right_df=course,
-        common_columns=["trainer_name"],
-        index_column_name="trainer_id",
-        relationship_type="1-to-many",
-        where_index_column="right"
-    )
-    print("\rBuilding relationships between dataframes... DONE")
-
-    # convert dates from list to datetime.date
-    print("Convert list-type variables to datetime.date... ", end='')
+    if args.stream:
+        # one intake month partition at a time from extract to load, with stable ids and upserts as in incremental
+        # runs, so the dimension tables grow partition by partition and only one partition is in memory
+        with engine.begin() as con:
+            state_metadata().create_all(con)
+        print("Spooling .pkl files by intake month... ", end='')
+        extract_stage = metrics.start("extract")
+        profile = profiler.start("stage.extract")
+        spool = PartitionSpool(Path(args.spool_dir))
+        for source, path in pickle_paths.items():
+            spool.add(source, path)
+        partitions = plan_partitions(spool.month_bytes(), args.memory_budget * 2 ** 20)
+        profiler.stop(profile)
+        metrics.stop(extract_stage, bytes_read=sum(path.stat().st_size for path in pickle_paths.values()))
+        print(f"DONE ({len(spool.month_bytes())} months in {len(partitions)} partitions)")
 
-    def list_to_date(arr):
-        return datetime.date(arr[2], arr[1], arr[0]) if arr else None
-    student_information["dob"] = student_information["dob"].apply(list_to_date)
-    invitation["invited_date"] = invitation["invited_date"].apply(list_to_date)
-    print("DONE")
+        table_dtypes = {table_name: get_value(table_name + "_dtypes") for table_name in tables_list}
+        print("Creating tables... ", end='')
+        metadata = sink.create_tables(table_dtypes, connection_list, foreign_keys=True)
+        print("DONE")
+        if args.key_registry:
+            key_registry = KeyRegistry(create_engine(f"sqlite:///{args.key_registry}"))
+        else:
+            key_registry = KeyRegistry(engine)
 
-    # set up engine for MySQL
-    print("Connecting to MySQL database... ", end='')
-    dialect = "mysql"
-    driver = "pymysql"
-    username = "root"
-    password = "root"
-    host = "127.0.0.1"
-    port = 3306
-    uri = f"{dialect}://{username}:{password}@{host}:{port}/virtual_sparta"
-    engine = create_engine(uri)
-    print("DONE")
+        print("Streaming partitions:")
+        # stages summed over the partitions
+        stage_seconds = {"transform": 0.0, "relationships": 0.0, "load": 0.0}
+        for i, months in enumerate(partitions):
+            partition_stage = metrics.start("partition", {"months": f"{months[0]}..{months[-1]}"})
+            raw_dfs = spool.read(months)
+            raw_rows = table_rows(raw_dfs)
+            stage_start = time.perf_counter()
+            profile = profiler.start("stage.transform")
+            transform_outputs, _ = run_transforms(
+                raw_dfs, max_workers=args.workers, shard=args.shard, profiler=profiler
+            )
+            tables = outputs_by_table(transform_outputs)
+            del raw_dfs, transform_outputs
+            if args.compact_dtypes:
+                tables, _ = compact_tables(tables, compared_columns(relationship_plan))
+            profiler.stop(profile)
+            stage_seconds["transform"] += time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
+            profile = profiler.start("stage.relationships")
+            tables, _, _ = run_relationship_plan(
+                tables_for_batch(tables, relationship_plan),
+                relationship_plan,
+                max_workers=args.workers,
+                fuzzy_threshold=args.fuzzy_threshold,
+                month_window=args.fuzzy_month_window,
+                key_registry=key_registry,
+                natural_keys=natural_keys,
+                profiler=profiler
+            )
+            convert_dates(tables)
+            profiler.stop(profile)
+            stage_seconds["relationships"] += time.perf_counter() - stage_start
+            stage_start = time.perf_counter()
+            profile = profiler.start("stage.load")
+            with engine.begin() as con:
+                counts = incremental_load(con, tables, metadata, natural_keys, connection_list,
+                                          chunksize=args.chunksize)
+            profiler.stop(profile)
+            stage_seconds["load"] += time.perf_counter() - stage_start
+            del tables
+            new_rows = sum(new for new, _, _ in counts.values())
+            partition = metrics.stop(partition_stage, rows_in=raw_rows, rows_out=new_rows)
+            print(f"\t({i + 1}/{len(partitions)}) {months[0]} to {months[-1]}... {new_rows} new rows in "
+                  f"{partition.wall_seconds:.2f}s, peak RSS {partition.peak_rss_bytes / 2 ** 20:.0f} MB")
+        for stage, seconds in stage_seconds.items():
+            metrics.add(stage, wall_seconds=seconds)
+
+        sink.finish(tables_list, connection_list, foreign_keys=False)
+        if args.profile_dir:
+            write_profiles(profiler)
+        if args.metrics_dir:
+            write_metrics(metrics, args.metrics_dir)
+        sys.exit()
 
-    with engine.connect() as con:
-        # insert tables in the database
-        print("Inserting tables:")
-        for i, table_name in enumerate(tables_list):
-            print(f"\t({i + 1}/{len(tables_list)}) {table_name}... ", end='')
-            table = locals()[table_name]
-            column_names = get_value(table_name + "_col_names")
-            dtypes = get_value(table_name + "_dtypes")
-            table[column_names].to_sql(table_name, con=engine, index=False, dtype=dtypes)
+    cleaned = related = None
+    if args.checkpoint_dir:
+        # a stage is skipped if nothing it depends on changed: the stage before, the code, the options and the
+        # camel case names (see prefix_trie)
+        checkpoints = CheckpointStore(Path(args.checkpoint_dir))
+        version = code_version([Path(__file__).resolve(), Path(__file__).resolve().parent / "schema.py"])
+        cleaned_key = stage_key(file_fingerprint(pickle_paths.values()), version, file_fingerprint([names_path]),
+                                {"shard": args.shard, "compact_dtypes": args.compact_dtypes})
+        related_key = stage_key(cleaned_key, {"pushdown": args.pushdown, "fuzzy_threshold": args.fuzzy_threshold,
+                                              "fuzzy_month_window": args.fuzzy_month_window})
+        related = checkpoints.load("related", related_key)
+        cleaned = None if related else checkpoints.load("cleaned", cleaned_key)
 
-            if "junction" not in table_name:
-                con.execute(f"ALTER TABLE {table_name} ADD PRIMARY KEY (`index`);")
+    if related:
+        tables, _ = related
+        print(f"Building relationships between dataframes... SKIPPED (checkpoint {related_key})")
+    elif cleaned:
+        tables, _ = cleaned
+        print(f"Slicing and cleaning dataframes... SKIPPED (checkpoint {cleaned_key})")
+    else:
+        if not args.incremental:
+            # import pickles
+            print("Importing .pkl files... ", end='')
+            extract_stage = metrics.start("extract")
+            profile = profiler.start("stage.extract")
+            raw_dfs = {}
+            for source, path in pickle_paths.items():
+                source_start = time.perf_counter()
+                raw_dfs[source] = pd.read_pickle(path)
+                metrics.add("extract", {"source": source}, wall_seconds=time.perf_counter() - source_start,
+                            rows_out=len(raw_dfs[source]), bytes_read=path.stat().st_size)
+            profiler.stop(profile)
+            metrics.stop(extract_stage, rows_out=table_rows(raw_dfs),
+                         bytes_read=sum(path.stat().st_size for path in pickle_paths.values()))
+            print("DONE")
+
+        # split and clean each dataframe, one worker process per source (per changed object with the cache)
+        transform_cache = TransformCache(Path(args.transform_cache)) if args.transform_cache else None
+        print("Slicing and cleaning dataframes... ", end='')
+        transform_stage = metrics.start("transform")
+        profile = profiler.start("stage.transform")
+        transform_outputs, transform_durations = run_transforms(
+            raw_dfs,
+            max_workers=args.workers,
+            shard=args.shard,
+            cache=transform_cache,
+            profiler=profiler
+        )
+        tables = outputs_by_table(transform_outputs)
+        profiler.stop(profile)
+        metrics.stop(transform_stage, rows_in=table_rows(raw_dfs), rows_out=table_rows(tables))
+        print("DONE")
+        for source, duration in transform_durations.items():
+            # time spent in the worker processes, summed over the shards or objects of the source
+            metrics.add("transform", {"source": source}, wall_seconds=duration, rows_in=len(raw_dfs[source]),
+                        rows_out=table_rows(outputs_by_table({source: transform_outputs[source]})))
+            if transform_cache:
+                cached_objects, all_objects = transform_cache.hits[source]
+                print(f"\t{source}... {duration:.2f}s ({cached_objects}/{all_objects} objects cached)")
+            else:
+                print(f"\t{source}... {duration:.2f}s")
+
+        if args.discover_names and "talent_csv" in raw_dfs:
+            # the list is read once per process, the names of this run were normalised with the list as it was
+            entries = new_entries(raw_dfs["talent_csv"]["name"], load_prefixes())
+            append_entries(entries)
+            print(f"Added {len(entries)} camel case names to {names_path.name}")
 
+        if args.compact_dtypes:
+            print("Compacting dtypes... ", end='')
+            compact_stage = metrics.start("compact_dtypes")
+            tables, memory = compact_tables(tables, compared_columns(relationship_plan))
+            metrics.stop(compact_stage, rows_in=table_rows(tables), rows_out=table_rows(tables))
             print("DONE")
+            print_memory_report(memory)
 
-        print("Adding foreign keys:")
-        for i, (origin_table, target_table) in enumerate(connection_list):
-            print(f"\t({i + 1}/{len(connection_list)}) {origin_table} <- {target_table}... ", end='')
-            con.execute(f"ALTER TABLE `{origin_table}` "
-                        f"ADD CONSTRAINT fk_{origin_table}_{target_table} "
-                        f"FOREIGN KEY (`{target_table}_id`) REFERENCES {target_table}(`index`);")
+        if args.checkpoint_dir:
+            checkpoints.save("cleaned", cleaned_key, tables)
+
+    if not related:
+        # build relationships between dataframes (pushdown builds them in the database)
+        if not args.pushdown:
+            print("Building relationships between dataframes... ", end='')
+            if args.incremental:
+                tables = tables_for_batch(tables, relationship_plan)
+            key_registry = None
+            if args.key_registry:
+                key_registry = KeyRegistry(create_engine(f"sqlite:///{args.key_registry}"))
+            elif args.incremental:
+                key_registry = KeyRegistry(engine)
+            relationship_stage = metrics.start("relationships")
+            profile = profiler.start("stage.relationships")
+            rows_before = {table_name: len(df) for table_name, df in tables.items()}
+            tables, step_durations, match_counts = run_relationship_plan(
+                tables,
+                relationship_plan,
+                max_workers=args.workers,
+                fuzzy_threshold=args.fuzzy_threshold,
+                month_window=args.fuzzy_month_window,
+                key_registry=key_registry,
+                natural_keys=natural_keys,
+                profiler=profiler
+            )
+            profiler.stop(profile)
+            metrics.stop(relationship_stage, rows_in=sum(rows_before.values()), rows_out=table_rows(tables))
+            for i, relationship in enumerate(relationship_plan):
+                metrics.add("relationships", {"child": relationship.child, "parent": relationship.parent},
+                            wall_seconds=step_durations[i])
+            for table_name, df in tables.items():
+                metrics.add("relationships", {"table": table_name}, rows_in=rows_before.get(table_name),
+                            rows_out=len(df))
             print("DONE")
+            print_relationship_timings(relationship_plan, step_durations)
+            if args.fuzzy_threshold:
+                print("Match rates:")
+                print_match_report(relationship_plan, match_counts)
+
+        # convert dates from list to datetime.date
+        print("Convert list-type variables to datetime.date... ", end='')
+        convert_dates(tables)
+        print("DONE")
+
+        if args.checkpoint_dir:
+            checkpoints.save("related", related_key, tables)
+
+    table_dtypes = {table_name: get_value(table_name + "_dtypes") for table_name in tables_list}
+    if args.validate:
+        # parents of an incremental batch may be in the database only
+        print("Validating tables... ", end='')
+        validate_start = time.perf_counter()
+        table_checks = {table_name: get_value(table_name + "_checks") for table_name in tables_list}
+        violations = validate_tables(tables, table_dtypes, table_checks, connection_list,
+                                     foreign_keys=not args.incremental)
+        print(f"DONE ({time.perf_counter() - validate_start:.2f}s)")
+        print_violations(violations)
+        if args.validate == "strict" and any(count for count, _ in violations.values()):
+            sys.exit("Validation failed, nothing was loaded")
+
+    if args.mart and not (args.incremental or args.pushdown):
+        print("Computing summary tables... ", end='')
+        mart = build_mart(tables)
+        print("DONE")
+    if args.student_profile:
+        print("Building student profiles... ", end='')
+        profiles = build_profiles(tables)
+        print("DONE")
+
+    if args.profile_types:
+        print("Profiling column types:")
+        table_checks = {table_name: get_value(table_name + "_checks") for table_name in tables_list}
+        profiled_dtypes = profile_tables(tables, table_dtypes, table_checks)
+        print_profile(table_dtypes, profiled_dtypes)
+        table_dtypes = profiled_dtypes
+
+    # create tables with primary keys and indexes before loading any rows
+    print("Creating tables... ", end='')
+    metadata = sink.create_tables(table_dtypes, connection_list, foreign_keys=args.incremental)
+    print("DONE")
+
+    if args.incremental:
+        # upsert the batch and record its objects in one transaction, parents before children
+        print("Upserting tables... ", end='')
+        load_stage = metrics.start("load")
+        profile = profiler.start("stage.load")
+        with engine.begin() as con:
+            if args.mart:
+                # groups rows leave as well as groups they join
+                mart_groups = affected_groups(con, metadata, tables)
+            counts = incremental_load(con, tables, metadata, natural_keys, connection_list, chunksize=args.chunksize)
+            if args.mart:
+                mart_groups = merge_groups(mart_groups, affected_groups(con, metadata, tables))
+                mart_counts = load_mart(con, build_mart(read_sources(con, metadata, *mart_groups)), *mart_groups,
+                                        chunksize=args.chunksize)
+            record_objects(con, new_objects)
+        profiler.stop(profile)
+        metrics.stop(load_stage, rows_in=table_rows(tables),
+                     rows_out=sum(new + changed for new, changed, _ in counts.values()))
+        print("DONE")
+        for table_name, (new_rows, changed_rows, unchanged_rows) in counts.items():
+            metrics.add("load", {"table": table_name}, rows_in=new_rows + changed_rows + unchanged_rows,
+                        rows_out=new_rows + changed_rows)
+            print(f"\t{table_name}... {new_rows} new, {changed_rows} changed, {unchanged_rows} unchanged")
+        if args.mart:
+            for table_name, rows in mart_counts.items():
+                print(f"\t{table_name}... {rows} rows refreshed")
+    elif args.pushdown:
+        # stage the cleaned dataframes and fill the tables with INSERT ... SELECT, parents before children
+        print("Staging and inserting tables... ", end='')
+        load_stage = metrics.start("load")
+        profile = profiler.start("stage.load")
+        with engine.begin() as con:
+            load_results = pushdown_load(con, tables, metadata, relationship_plan, connection_list,
+                                         chunksize=args.chunksize)
+        profiler.stop(profile)
+        load = metrics.stop(load_stage, rows_in=table_rows(tables),
+                            rows_out=sum(rows for rows, _ in load_results.values()))
+        print(f"DONE ({load.wall_seconds:.2f}s)")
+        for table_name, (rows, seconds) in load_results.items():
+            metrics.add("load", {"table": table_name}, wall_seconds=seconds, rows_out=rows)
+            print(f"\t{table_name}... {rows} rows in {seconds:.2f}s")
+    else:
+        # insert tables in the database, largest first, up to args.writers at a time
+        # the Parquet export reads the same frames in a separate thread
+        print("Inserting tables... ", end='')
+        load_stage = metrics.start("load")
+        profile = profiler.start("stage.load")
+        load_frames = {table_name: tables[table_name][list(table_dtypes[table_name])] for table_name in tables_list}
+        with ThreadPoolExecutor(max_workers=1) as export_pool:
+            if args.parquet_dir:
+                intake_months = {
+                    table_name: intake_month(tables[table_name]) for table_name in tables_list
+                    if "date" in tables[table_name]
+                }
+                export_future = export_pool.submit(export_tables, load_frames, args.parquet_dir, intake_months)
+            load_results = sink.load(load_frames, chunksize=args.chunksize)
+        profiler.stop(profile)
+        load = metrics.stop(load_stage, rows_in=table_rows(load_frames),
+                            rows_out=sum(rows for rows, _, _ in load_results.values()))
+        print(f"DONE ({load.wall_seconds:.2f}s)")
+        for i, (table_name, (rows, seconds, method)) in enumerate(load_results.items()):
+            metrics.add("load", {"table": table_name}, wall_seconds=seconds, rows_in=len(load_frames[table_name]),
+                        rows_out=rows)
+            print(f"\t({i + 1}/{len(tables_list)}) {table_name}... "
+                  f"{rows} rows via {method} in {seconds:.2f}s, {rows / max(seconds, 1e-9):.0f} rows/s")
+        if args.parquet_dir:
+            print(f"Exported Parquet to {args.parquet_dir}:")
+            for table_name, (rows, files, seconds) in export_future.result().items():
+                print(f"\t{table_name}... {rows} rows in {files} files, {seconds:.2f}s")
+
+    if args.mart and not args.incremental:
+        print("Loading summary tables... ", end='')
+        with engine.begin() as con:
+            if args.pushdown:
+                # the related tables exist only in the database
+                mart = build_mart(read_sources(con, metadata))
+            mart_counts = load_mart(con, mart, chunksize=args.chunksize)
+        print("DONE")
+        for table_name, rows in mart_counts.items():
+            print(f"\t{table_name}... {rows} rows")
+
+    if args.student_profile:
+        print("Loading student profiles... ", end='')
+        with engine.begin() as con:
+            profile_rows = load_profiles(con, profiles, chunksize=args.chunksize)
+        print(f"DONE ({profile_rows} profiles)")
+
+    # foreign keys need every table to be present
+    sink.finish(tables_list, connection_list, foreign_keys=not args.incremental)
 
-    pp.pprint(con.execute("SHOW TABLES;").fetchall())
-    for table_name in tables_list:
-        pp.pprint(con.execute(f"DESCRIBE {table_name};").fetchall())
+    if args.profile_dir:
+        write_profiles(profiler)
+    if args.metrics_dir:
+        write_metrics(metrics, args.metrics_dir)
@@ -0,0 +1,277 @@
+"""
+Note:
+    Stage metrics of a pipeline run. Every stage (extract, transform, relationships, load, ...) is measured as a whole
+    and broken down by source or table:
+        - wall_seconds, cpu_seconds: CPU time of this process and of the worker processes that finished in the stage
+        - rows_in, rows_out, bytes_read
+        - peak_rss_bytes: high-water mark of the resident memory of this process during the stage. Linux resets the
+          mark at the start of each stage (/proc/self/clear_refs), elsewhere it is the mark of the whole run so far.
+          Worker processes are measured by children_peak_rss_bytes, the mark of the largest worker that finished.
+    Breakdowns measured elsewhere (e.g. the transform of a single source in a worker process) are added with the
+    values known, the others are left empty.
+
+    A run writes three files into the metrics directory:
+        - last_run.json: the report of the run
+        - virtual_sparta.prom: the report as gauges for the textfile collector of the Prometheus node exporter,
+          replaced atomically
+        - history.jsonl: one report per line, appended, compared with the next runs by print_history_comparison
+
+Example use:
+    metrics = RunMetrics(release="1a2b3c4d")
+    stage = metrics.start("transform")
+    outputs, durations = run_transforms(raw_dfs)
+    metrics.stop(stage, rows_in=12327, rows_out=48392)
+    metrics.add("transform", {"source": "talent_txt"}, wall_seconds=durations["talent_txt"])
+    report = metrics.write(Path("metrics"))
+    print_history_comparison(Path("metrics") / "history.jsonl", report)
+"""
+import datetime
+import json
+import os
+import re
+import resource
+import statistics
+import time
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+METRIC_PREFIX = "virtual_sparta"
+
+# measures of StageMetrics with the help text of their gauges
+measures = {
+    "wall_seconds": "Wall time of the stage",
+    "cpu_seconds": "CPU time of the stage, worker processes included",
+    "rows_in": "Rows read by the stage",
+    "rows_out": "Rows written by the stage",
+    "bytes_read": "Bytes read by the stage",
+    "peak_rss_bytes": "Peak resident memory of the main process during the stage",
+    "children_peak_rss_bytes": "Peak resident memory of the largest finished worker process",
+}
+
+
+class StageMetrics(NamedTuple):
+    """
+    Measures of a stage, or of a source or table of a stage (labels), None where not measured.
+    """
+    stage: str
+    labels: dict
+    wall_seconds: Optional[float] = None
+    cpu_seconds: Optional[float] = None
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    bytes_read: Optional[int] = None
+    peak_rss_bytes: Optional[int] = None
+    children_peak_rss_bytes: Optional[int] = None
+
+
+class _StageStart(NamedTuple):
+    stage: str
+    labels: dict
+    wall: float
+    cpu: float
+
+
+def _cpu_seconds() -> float:
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _reset_peak_rss() -> None:
+    try:
+        with open("/proc/self/clear_refs", 'w') as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss() -> tuple[int, int]:
+    """
+    High-water marks of the resident memory of this process and of the largest finished child, in bytes.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    try:
+        with open("/proc/self/status", 'r') as file:
+            return int(re.search(r"VmHWM:\s+(\d+)", file.read()).group(1)) * 1024, children
+    except (OSError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, children
+
+
+def stage_name(metrics: StageMetrics) -> str:
+    """
+    Name of a stage and its labels e.g. 'transform[source=talent_csv]', the same in every run.
+    """
+    labels = ','.join(f"{key}={value}" for key, value in sorted(metrics.labels.items()))
+    return f"{metrics.stage}[{labels}]" if labels else metrics.stage
+
+
+def _label_value(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RunMetrics:
+    """
+    Example use:
+    metrics = RunMetrics()
+    stage = metrics.start("load")
+    ...
+    metrics.stop(stage, rows_out=48392)
+    """
+
+    def __init__(self, release: Optional[str] = None) -> None:
+        """
+        :param release: version of the code e.g. a hash of the sources, to compare runs of different releases
+        """
+        self.release = release
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self.start_wall = time.perf_counter()
+        self.stages = []
+
+    def start(self, stage: str, labels: Optional[dict] = None) -> _StageStart:
+        """
+        Start measuring a stage.
+
+        :param stage: stage name e.g. "transform"
+        :param labels: breakdown of the stage e.g. {"table": "course"}
+        :return: handle to pass to stop
+        """
+        _reset_peak_rss()
+        return _StageStart(stage, labels or {}, time.perf_counter(), _cpu_seconds())
+
+    def stop(self, started: _StageStart, *, rows_in: Optional[int] = None, rows_out: Optional[int] = None,
+             bytes_read: Optional[int] = None) -> StageMetrics:
+        """
+        Stop measuring a stage and record it with the rows and bytes it handled.
+        """
+        peak_rss, children_peak_rss = _peak_rss()
+        metrics = StageMetrics(
+            started.stage, started.labels,
+            wall_seconds=time.perf_counter() - started.wall,
+            cpu_seconds=_cpu_seconds() - started.cpu,
+            rows_in=rows_in, rows_out=rows_out, bytes_read=bytes_read,
+            peak_rss_bytes=peak_rss, children_peak_rss_bytes=children_peak_rss
+        )
+        self.stages.append(metrics)
+        return metrics
+
+    def add(self, stage: str, labels: Optional[dict] = None, **values) -> StageMetrics:
+        """
+        Record measures taken elsewhere e.g. add("load", {"table": "course"}, wall_seconds=0.2, rows_out=36).
+        """
+        metrics = StageMetrics(stage, labels or {}, **values)
+        self.stages.append(metrics)
+        return metrics
+
+    def report(self) -> dict:
+        """
+        Report of the run, as written to last_run.json and history.jsonl.
+        """
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "release": self.release,
+            "wall_seconds": time.perf_counter() - self.start_wall,
+            "stages": [metrics._asdict() for metrics in self.stages],
+        }
+
+    def write(self, directory: Path) -> dict:
+        """
+        Write the JSON report and the Prometheus textfile, and append the report to the history.
+
+        :param directory: metrics directory, created if missing
+        :return: report of the run
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        report = self.report()
+        with open(directory / "last_run.json", 'w') as file:
+            json.dump(report, file, indent=2)
+        # the node exporter may read the file at any time, so it is replaced in one step
+        partial = directory / f"{METRIC_PREFIX}.prom.partial"
+        with open(partial, 'w') as file:
+            file.write(prometheus_text(report))
+        os.replace(partial, directory / f"{METRIC_PREFIX}.prom")
+        with open(directory / "history.jsonl", 'a') as file:
+            file.write(json.dumps(report) + '\n')
+        return report
+
+
+def prometheus_text(report: dict) -> str:
+    """
+    Report in the Prometheus text exposition format, one gauge per measure labelled by stage, source and table.
+    """
+    started_at = datetime.datetime.fromisoformat(report["started_at"]).timestamp()
+    release = _label_value(report["release"])
+    lines = [
+        f"# HELP {METRIC_PREFIX}_run_timestamp_seconds Start of the last run",
+        f"# TYPE {METRIC_PREFIX}_run_timestamp_seconds gauge",
+        f'{METRIC_PREFIX}_run_timestamp_seconds{{release="{release}"}} {started_at:.0f}',
+        f"# HELP {METRIC_PREFIX}_run_wall_seconds Wall time of the last run",
+        f"# TYPE {METRIC_PREFIX}_run_wall_seconds gauge",
+        f'{METRIC_PREFIX}_run_wall_seconds{{release="{release}"}} {report["wall_seconds"]:.6f}',
+    ]
+    for measure, help_text in measures.items():
+        name = f"{METRIC_PREFIX}_stage_{measure}"
+        samples = []
+        for metrics in report["stages"]:
+            if metrics[measure] is None:
+                continue
+            labels = {"stage": metrics["stage"], **metrics["labels"]}
+            label_text = ','.join(f'{key}="{_label_value(value)}"' for key, value in labels.items())
+            samples.append(f"{name}{{{label_text}}} {metrics[measure]}")
+        if samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", *samples]
+    return '\n'.join(lines) + '\n'
+
+
+def read_history(path: Path) -> list[dict]:
+    """
+    Read the reports of the previous runs, oldest first. A missing history is empty.
+    """
+    if not Path(path).is_file():
+        return []
+    with open(path, 'r') as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def compare_history(history: list[dict], report: dict, *, last: int = 5) -> dict[str, tuple[float, float]]:
+    """
+    Compare the wall time of each stage with the median of the last runs before it.
+
+    :param history: reports of the previous runs, oldest first (the report itself may be the last one, as
+    written by RunMetrics.write)
+    :param report: report of the run
+    :param last: number of previous runs to take the median of
+    :return: stage name (see stage_name) -> (wall seconds of the run, median of the previous runs), for the stages
+    measured by some previous run
+    """
+    if history and history[-1] == report:
+        history = history[:-1]
+    previous = history[-last:]
+    past_walls = {}
+    for past in previous:
+        for metrics in past["stages"]:
+            if metrics["wall_seconds"] is not None:
+                past_walls.setdefault(stage_name(StageMetrics(**metrics)), []).append(metrics["wall_seconds"])
+    comparison = {}
+    for metrics in report["stages"]:
+        name = stage_name(StageMetrics(**metrics))
+        if metrics["wall_seconds"] is not None and name in past_walls:
+            comparison[name] = (metrics["wall_seconds"], statistics.median(past_walls[name]))
+    return comparison
+
+
+def print_history_comparison(history_path: Path, report: dict, *, last: int = 5, threshold: float = 1.2) -> None:
+    """
+    Print the wall time of each stage next to the median of the last runs. Sources and tables are printed only if they
+    are slower by threshold times (and by more than 0.1s), marked by '!' as the stages are.
+    """
+    comparison = compare_history(read_history(history_path), report, last=last)
+    if not comparison:
+        return
+    print(f"Stage wall times against the median of the last {last} runs:")
+    for name, (wall, median) in comparison.items():
+        slower = wall > threshold * median and wall - median > 0.1
+        if '[' in name and not slower:
+            continue
+        change = f"{(wall - median) / median * 100:+.0f}%" if median else "new"
+        print(f"\t{'!' if slower else ' '} {name}... {wall:.2f}s ({median:.2f}s, {change})")
@@ -1,5 +1,6 @@
+import datetime
 from sqlalchemy.types import TEXT, INTEGER, DATE, BOOLEAN
-from typing import Union
+from typing import Any, NamedTuple, Optional, Union
 
 
 tables_list = [
@@ -33,11 +34,75 @@ connection_list = [
     ("course", "trainer"),
 ]
 
+
+class Relationship(NamedTuple):
+    """
+    One step of the relationship plan. `child` receives the `<parent>_id` column, which references `parent` through
+    the rows matched on `on`. For "many-to-many" the child is a junction table and the dimension table is named after
+    it without the "_junction" suffix.
+    """
+    child: str
+    parent: str
+    on: list[str]
+    cardinality: str  # "1-to-1" | "1-to-many" | "0-or-1-to-1" | "many-to-many"
+
+
+relationship_plan = [
+    Relationship("student_information", "invitation", ["student_name", "date"], "1-to-1"),
+    Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1"),
+    Relationship("academy_performance", "student_information", ["student_name"], "0-or-1-to-1"),
+    Relationship("trainee_performance", "student_information", ["student_name", "date"], "0-or-1-to-1"),
+    Relationship("tech_self_score_junction", "student_information", ["student_name", "date"], "many-to-many"),
+    Relationship("weakness_junction", "student_information", ["student_name", "date"], "many-to-many"),
+    Relationship("strength_junction", "student_information", ["student_name", "date"], "many-to-many"),
+    Relationship("academy_performance", "course", ["course_name", "date"], "1-to-many"),
+    Relationship("course", "trainer", ["trainer_name"], "1-to-many"),
+]
+
+# columns identifying a row of each table across loads (see load_toolbox.incremental)
+natural_keys = {
+    "student_information": ["student_name", "date"],
+    "invitation": ["student_name", "date"],
+    "test_score": ["student_name", "date"],
+    "academy_performance": ["student_name", "date", "week"],
+    "trainee_performance": ["student_name", "date"],
+    "tech_self_score": ["tech_self_score"],
+    "weakness": ["weakness"],
+    "strength": ["strength"],
+    "tech_self_score_junction": ["student_name", "date", "tech_self_score"],
+    "weakness_junction": ["student_name", "date", "weakness"],
+    "strength_junction": ["student_name", "date", "strength"],
+    "course": ["course_name"],
+    "trainer": ["trainer_name"],
+}
+
+
+class Check(NamedTuple):
+    """
+    Declarative constraint of one column, checked by load_toolbox.validation on top of the type declared in the
+    dtypes map and the foreign keys of connection_list. `low` and `high` bound numbers or dates (inclusive), `values`
+    lists the allowed values and `pattern` is a regular expression whole values have to match. Missing values only
+    break `nullable=False`.
+    """
+    nullable: bool = True
+    unique: bool = False
+    low: Any = None
+    high: Any = None
+    values: Optional[list] = None
+    pattern: Optional[str] = None
+
+
+unique_check = Check(nullable=False, unique=True)
+score_check = Check(low=1, high=8)
+date_check = Check(low=datetime.date(1900, 1, 1), high=datetime.date(2022, 12, 31))
+
 trainer_dtypes = {'index': INTEGER, 'trainer_name': TEXT}
 trainer_col_names = [*trainer_dtypes]
+trainer_checks = {'index': unique_check, 'trainer_name': unique_check}
 
 course_dtypes = {'index': INTEGER, 'course_name': TEXT, 'trainer_id': INTEGER}
 course_col_names = [*course_dtypes]
+course_checks = {'index': unique_check, 'course_name': unique_check, 'trainer_id': Check(nullable=False)}
 
 academy_performance_dtypes = {
     'index': INTEGER,
@@ -52,6 +117,12 @@ academy_performance_dtypes = {
     'course_id': INTEGER
 }
 academy_performance_col_names = [*academy_performance_dtypes]
+academy_performance_checks = {
+    'index': unique_check,
+    'week': Check(nullable=False, pattern=r"W\d+"),
+    **{col: score_check for col in academy_performance_col_names[2:8]},
+    'course_id': Check(nullable=False)
+}
 
 student_information_dtypes = {
     'index': INTEGER,
@@ -68,9 +139,21 @@ student_information_dtypes = {
     'invitation_id': INTEGER
 }
 student_information_col_names = [*student_information_dtypes]
+student_information_checks = {
+    'index': unique_check,
+    'student_name': Check(nullable=False),
+    'gender': Check(values=['Male', 'Female']),
+    'dob': date_check,
+    'email': Check(pattern=r"[^@\s]+@[^@\s]+\.[^@\s]+"),
+    'postcode': Check(pattern=r"[A-Z]{1,2}\d[A-Z\d]?"),
+    'phone_number': Check(pattern=r"\+44[\d ()-]+"),
+    'degree': Check(values=['1st', '2:1', '2:2', '3rd']),
+    'invitation_id': Check(nullable=False)
+}
 
 invitation_dtypes = {'index': INTEGER, 'invited_date': DATE, 'invited_by': TEXT}
 invitation_col_names = [*invitation_dtypes]
+invitation_checks = {'index': unique_check, 'invited_date': date_check}
 
 trainee_performance_dtypes = {
     'index': INTEGER,
@@ -82,32 +165,53 @@ trainee_performance_dtypes = {
     'student_information_id': INTEGER
 }
 trainee_performance_col_names = [*trainee_performance_dtypes]
+trainee_performance_checks = {
+    'index': unique_check,
+    **{col: Check(nullable=False) for col in ['self_development', 'geo_flex', 'financial_support', 'result']},
+    'course_interest': Check(values=['Business', 'Data', 'Engineering'])
+}
 
 weakness_junction_dtypes = {'student_information_id': INTEGER, 'weakness_id': INTEGER}
 weakness_junction_col_names = [*weakness_junction_dtypes]
+weakness_junction_checks = {'student_information_id': Check(nullable=False), 'weakness_id': Check(nullable=False)}
 
 strength_junction_dtypes = {'student_information_id': INTEGER, 'strength_id': INTEGER}
 strength_junction_col_names = [*strength_junction_dtypes]
+strength_junction_checks = {'student_information_id': Check(nullable=False), 'strength_id': Check(nullable=False)}
 
 tech_self_score_junction_dtypes = {'student_information_id': INTEGER, 'tech_self_score_id': INTEGER}
 tech_self_score_junction_col_names = [*tech_self_score_junction_dtypes]
+tech_self_score_junction_checks = {
+    'student_information_id': Check(nullable=False),
+    'tech_self_score_id': Check(nullable=False)
+}
 
 test_score_dtypes = {
     'index': INTEGER,
-    'psychometrics': TEXT,
-    'presentation': TEXT,
+    'psychometrics_score': INTEGER,
+    'psychometrics_max': INTEGER,
+    'presentation_score': INTEGER,
+    'presentation_max': INTEGER,
     'student_information_id': INTEGER
 }
 test_score_col_names = [*test_score_dtypes]
+test_score_checks = {
+    'index': unique_check,
+    **{col: Check(low=0) for col in ['psychometrics_score', 'presentation_score']},
+    **{col: Check(low=1) for col in ['psychometrics_max', 'presentation_max']}
+}
 
 weakness_dtypes = {'index': INTEGER, 'weakness': TEXT}
 weakness_col_names = [*weakness_dtypes]
+weakness_checks = {'index': unique_check, 'weakness': unique_check}
 
 strength_dtypes = {'index': INTEGER, 'strength': TEXT}
 strength_col_names = [*strength_dtypes]
+strength_checks = {'index': unique_check, 'strength': unique_check}
 
 tech_self_score_dtypes = {'index': INTEGER, 'tech_self_score': TEXT}
 tech_self_score_col_names = [*tech_self_score_dtypes]
+tech_self_score_checks = {'index': unique_check, 'tech_self_score': unique_check}
 
 
 def get_value(var_name: str) -> Union[list, dict]:
@@ -5,6 +5,7 @@ Note:
         2. course name, trainer name, date (the one from the filename)
         3. student name, date, course name, analytic, independent, etc.
 """
+from pathlib import Path
 import pandas as pd
 
 pd.set_option('display.max_rows', None)
@@ -137,16 +138,19 @@ class AcademyCSV:
 
         return trainers_df, courses_df, academy_performance_df
 
-if __name__ == "main":
-
-    academy = AcademyCSV(pd.read_pickle('../../../../../Python/Projects/etl_pipeline_virtual_sparta_v3/pickle_jar/academy_csv_v2.pkl'))
-    academy.transform_academy_csv()
-#       print(academy.merge_dataframes().dtypes)
-#     # print(academy.merge_dataframes())
-#     # print(academy.trainers_df())
-#     # print(academy.course_trainers_df())
-#     # print(academy.dataframe_with_values())
-#     # print(academy.make_individual_dataframes())
-#     #print(academy.get_metrics_dataframe())
-#     # print(pd.read_pickle('../pickle_jar/academy_csv_v2.pkl'))
-#     # print(pd.read_pickle('../pickle_jar/academy_csv_filenames.pkl'))
+
+if __name__ == '__main__':  # pragma: no cover
+    # python -m transform_toolbox.academy_csv [--profile-dir profiles], run from src
+    from .profiling import runner_profiler, print_profiles
+    profiler = runner_profiler("Transform academy_csv_v2.pkl and print the first rows of each table")
+    pickle_jar_path = Path(__file__).resolve().parent.parent.parent / "pickle_jar"
+    df = pd.read_pickle(pickle_jar_path / "academy_csv_v2.pkl")
+    academy_csv = AcademyCSV(df)
+    with profiler.stage("transform.academy_csv"):
+        trainer_df, course_df, academy_performance_df = academy_csv.transform_academy_csv()
+    print_profiles(profiler.write())
+
+    pd.set_option('display.max_columns', None)
+    print(trainer_df.head())
+    print(course_df.head())
+    print(academy_performance_df.head())
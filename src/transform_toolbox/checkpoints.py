@@ -0,0 +1,199 @@
+"""
+Note:
+    Checkpoints of the stage outputs of run.py, so a re-run resumes at the first stage whose inputs or code changed:
+        - "cleaned": dataframes of the transform classes (compacted with --compact-dtypes) keyed by table name
+        - "related": the same dataframes with the relationships built and the dates converted
+    Every dataframe is written as a Feather (Arrow IPC) file, read back column by column without unpickling a Python
+    object per cell. Frames Arrow cannot represent fall back to a pickle. List columns are turned back into lists on
+    read, dict columns are stored as Arrow maps, which keep the keys of each row as they were.
+
+    A checkpoint is found by the fingerprint of everything its stage output depends on: the fingerprint of the stage
+    before (of the source files for the first one), the code version (the source files of the pipeline) and the
+    options changing the output. A stage with the same fingerprint gives the same output, so there is no need to hash
+    the dataframes themselves. Only the last checkpoint of each stage is kept:
+        <checkpoint dir>/<stage>/<fingerprint>/<table>.feather
+        <checkpoint dir>/<stage>/<fingerprint>/manifest.json
+
+Example use:
+    store = CheckpointStore(Path("checkpoints"))
+    cleaned_key = stage_key(file_fingerprint(pickle_paths), code_version(code_paths), {"shard": False})
+    checkpoint = store.load("cleaned", cleaned_key)
+    if checkpoint is None:
+        tables = outputs_by_table(run_transforms(raw_dfs)[0])
+        store.save("cleaned", cleaned_key, tables)
+    else:
+        tables, extras = checkpoint
+"""
+import hashlib
+import json
+import pickle
+import shutil
+from pathlib import Path
+from typing import Any, Iterable, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+toolbox_path = Path(__file__).resolve().parent
+
+
+def object_columns(df: pd.DataFrame) -> tuple[list, list]:
+    """
+    Columns holding lists and columns holding dicts, which Arrow does not give back as they were. Each object column
+    is looked at once.
+    """
+    list_columns = []
+    dict_columns = []
+    for col in df.columns[df.dtypes == object]:
+        types = set(map(type, df[col]))
+        if list in types:
+            list_columns.append(col)
+        if dict in types:
+            dict_columns.append(col)
+    return list_columns, dict_columns
+
+
+def _map_array(column: pd.Series) -> pa.Array:
+    """
+    Dicts of a column as an Arrow map e.g. {"Python": 5, "SQL": None} -> [("Python", 5), ("SQL", None)]. A struct
+    would add every key seen in the column to each row, so keys holding None could not be told from missing ones.
+    """
+    items = [list(v.items()) if isinstance(v, dict) else None for v in column]
+    values = pa.array([value for row in items if row is not None for _, value in row])
+    return pa.array(items, type=pa.map_(pa.string(), values.type))
+
+
+def _to_table(df: pd.DataFrame, dict_columns: list) -> pa.Table:
+    table = pa.Table.from_pandas(df.assign(**{col: None for col in dict_columns}), preserve_index=True)
+    for col in dict_columns:
+        table = table.set_column(table.schema.get_field_index(col), col, _map_array(df[col]))
+    return table
+
+
+def _to_frame(table: pa.Table, list_columns: list, dict_columns: list) -> pd.DataFrame:
+    df = table.to_pandas()
+    # Arrow gives back numpy arrays for list columns, the transforms expect lists
+    for col in list_columns:
+        df[col] = df[col].map(lambda v: v.tolist() if isinstance(v, np.ndarray) else v)
+    for col in dict_columns:
+        df[col] = [None if v is None else dict(v) for v in table.column(col).to_pylist()]
+    return df
+
+
+def file_fingerprint(paths: Iterable[Path]) -> str:
+    """
+    Hash of the names and contents of the files. Missing files are hashed as empty.
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        path = Path(path)
+        digest.update(path.name.encode() + b"\0")
+        if path.is_file():
+            with open(path, 'rb') as file:
+                for block in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def code_version(extra_paths: Iterable[Path] = ()) -> str:
+    """
+    Hash of the source files of the transform toolbox and of extra_paths (e.g. run.py and schema.py).
+    """
+    return file_fingerprint([*sorted(toolbox_path.glob("*.py")), *extra_paths])
+
+
+def stage_key(*parts: Any) -> str:
+    """
+    Fingerprint of a stage from fingerprints and options (anything JSON serialisable).
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """
+    Example use:
+    store = CheckpointStore(Path("checkpoints"))
+    store.save("related", key, tables, extras={"name_prefixes": ["Mac"]})
+    tables, extras = store.load("related", key)
+    """
+
+    def __init__(self, root: Path) -> None:
+        """
+        :param root: directory of the checkpoints, created on the first save
+        """
+        self.root = Path(root)
+
+    def path(self, stage: str, key: str) -> Path:
+        return self.root / stage / key
+
+    def load(self, stage: str, key: str, table_names: Optional[list[str]] = None
+             ) -> Optional[tuple[dict[str, pd.DataFrame], dict]]:
+        """
+        Read the checkpoint of a stage.
+
+        :param table_names: tables to read (default: all), tables missing from the checkpoint are left out
+        :return: dataframes keyed by table name and the extras saved with them, None if there is no checkpoint with
+        this fingerprint
+        """
+        path = self.path(stage, key)
+        if not (path / "manifest.json").is_file():
+            return None
+        with open(path / "manifest.json", 'r') as file:
+            manifest = json.load(file)
+        tables = {}
+        for table_name, entry in manifest["tables"].items():
+            if table_names is not None and table_name not in table_names:
+                continue
+            if entry["format"] == "pickle":
+                tables[table_name] = pd.read_pickle(path / f"{table_name}.pkl")
+            else:
+                table = feather.read_table(path / f"{table_name}.feather", memory_map=True)
+                df = _to_frame(table, entry["list_columns"], entry["dict_columns"])
+                # pandas metadata keeps the string dtype, not its storage
+                for col in entry["arrow_string_columns"]:
+                    df[col] = df[col].astype("string[pyarrow]")
+                tables[table_name] = df
+        return tables, manifest["extras"]
+
+    def save(self, stage: str, key: str, tables: dict[str, pd.DataFrame], extras: Optional[dict] = None) -> Path:
+        """
+        Write the checkpoint of a stage and remove the older checkpoints of the stage. The files are written to a
+        temporary directory first, so a run stopped halfway never leaves a checkpoint behind.
+
+        :param stage: stage name e.g. "cleaned"
+        :param key: fingerprint of the stage (see stage_key)
+        :param tables: stage output keyed by table name
+        :param extras: other (JSON serialisable) outputs of the stage
+        :return: directory of the checkpoint
+        """
+        path = self.path(stage, key)
+        partial = path.with_name(f"{key}.partial")
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+        manifest = {"stage": stage, "key": key, "tables": {}, "extras": extras or {}}
+        for table_name, df in tables.items():
+            list_columns, dict_columns = object_columns(df)
+            try:
+                table = _to_table(df, dict_columns)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                df.to_pickle(partial / f"{table_name}.pkl", protocol=pickle.HIGHEST_PROTOCOL)
+                entry_format = "pickle"
+            else:
+                feather.write_feather(table, partial / f"{table_name}.feather", compression="uncompressed")
+                entry_format = "feather"
+            manifest["tables"][table_name] = {
+                "format": entry_format, "list_columns": list_columns, "dict_columns": dict_columns,
+                "arrow_string_columns": [col for col in df.columns if df[col].dtype == "string[pyarrow]"]
+            }
+        with open(partial / "manifest.json", 'w') as file:
+            json.dump(manifest, file)
+
+        for old in path.parent.iterdir():
+            if old != partial:
+                shutil.rmtree(old, ignore_errors=True)
+        partial.rename(path)
+        return path
@@ -0,0 +1,109 @@
+"""
+Note:
+    Shrink the transform outputs before relationship building. Most columns come out of the transform classes as
+    object dtype, i.e. one Python object per cell:
+        - low-cardinality strings (gender, week, city, dimension values, ...) -> category
+        - other strings -> Arrow-backed strings (string[pyarrow]), one buffer per column instead of one object per value
+        - integers -> the smallest integer type holding them (int8 for the 1-8 scores, Int8/Int16 with missing values)
+    Keys (`index` and `<table>_id`), booleans, floats and lists (dates) are kept as they are, and so are the columns
+    rows are matched on across tables (the `on` columns of the relationship plan): matching builds keys from them with
+    Python string operations, which categoricals and Arrow strings do not support the same way as object columns.
+    Missing strings become pd.NA, which the loaders write as NULL.
+
+Example use:
+    tables, memory = compact_tables(tables, compared_columns(relationship_plan))
+    print_memory_report(memory)
+"""
+import numpy as np
+import pandas as pd
+
+
+def is_key(column_name: str) -> bool:
+    return column_name == "index" or column_name.endswith("_id")
+
+
+def compared_columns(plan: list) -> set[str]:
+    """
+    Columns rows are matched on by the relationship plan.
+    """
+    return {col for relationship in plan for col in relationship.on}
+
+
+def _integer_dtype(column: pd.Series) -> str:
+    """
+    Smallest integer dtype holding every value of the column, nullable if the column has missing values.
+    """
+    values = column.dropna()
+    low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for bits in (8, 16, 32):
+        info = np.iinfo(f"int{bits}")
+        if info.min <= low and high <= info.max:
+            break
+    else:
+        bits = 64
+    return f"Int{bits}" if column.isna().any() or pd.api.types.is_extension_array_dtype(column) else f"int{bits}"
+
+
+def compact_column(column: pd.Series, *, category_ratio: float = 0.5) -> pd.Series:
+    """
+    Convert a single column to a smaller dtype, if there is one.
+
+    :param column: column of a transformed dataframe
+    :param category_ratio: most distinct values per row a string column may have to become categorical
+    :return: converted (or the same) column
+    """
+    if pd.api.types.is_bool_dtype(column):
+        return column
+    if pd.api.types.is_integer_dtype(column):
+        return column.astype(_integer_dtype(column))
+    if column.dtype != object or pd.api.types.infer_dtype(column, skipna=True) != "string":
+        return column
+    if column.nunique() <= category_ratio * len(column):
+        return column.astype("category")
+    return column.astype("string[pyarrow]")
+
+
+def compact_frame(df: pd.DataFrame, compared: set[str] = frozenset(), *, category_ratio: float = 0.5) -> pd.DataFrame:
+    """
+    Convert every column but the keys and the compared columns to a smaller dtype.
+
+    :param df: transformed dataframe
+    :param compared: columns to keep as they are (see compared_columns)
+    :param category_ratio: most distinct values per row a string column may have to become categorical
+    :return: dataframe with the same columns and values
+    """
+    return pd.DataFrame({
+        col: df[col] if is_key(col) or col in compared else compact_column(df[col], category_ratio=category_ratio)
+        for col in df.columns
+    }, index=df.index)
+
+
+def compact_tables(
+        tables: dict[str, pd.DataFrame],
+        compared: set[str] = frozenset(),
+        *, category_ratio: float = 0.5
+) -> tuple[dict[str, pd.DataFrame], dict[str, tuple[int, int]]]:
+    """
+    Compact every dataframe and measure memory_usage(deep=True) before and after.
+
+    :param tables: transformed dataframes keyed by table name
+    :param compared: columns to keep as they are (see compared_columns)
+    :param category_ratio: most distinct values per row a string column may have to become categorical
+    :return: compacted dataframes and (bytes before, bytes after) keyed by table name
+    """
+    compacted, memory = {}, {}
+    for table_name, df in tables.items():
+        compacted[table_name] = compact_frame(df, compared, category_ratio=category_ratio)
+        memory[table_name] = (int(df.memory_usage(deep=True).sum()),
+                              int(compacted[table_name].memory_usage(deep=True).sum()))
+    return compacted, memory
+
+
+def print_memory_report(memory: dict[str, tuple[int, int]]) -> None:
+    """
+    Print the memory footprint of each table before and after compaction, and the total.
+    """
+    total = (sum(before for before, _ in memory.values()), sum(after for _, after in memory.values()))
+    for table_name, (before, after) in [*memory.items(), ("total", total)]:
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"\t{table_name}... {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB ({change:+.0f}%)")
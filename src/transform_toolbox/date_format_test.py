@@ -5,19 +5,25 @@ import pandas as pd
 def date_format_test(date_ser: pd.Series) -> None:
     """
     Small helper function that checks if the given column contains only dates the format: [dd, mm, yyyy].
+    Each rule is checked on the whole column at once, the failure message names the first entry breaking it.
     :param pd.Series date_ser: pandas' column of lists
     """
     utest = unittest.TestCase()
-    for i, entry in date_ser.items():
-        utest.assertIsInstance(entry, list, f"Entry #{i} in {date_ser.name}, {entry}. Got type {type(entry)}")
-        if entry:
-            utest.assertEqual(len(entry), 3, f"Entry #{i} in {date_ser.name}, {entry}. Got length {len(entry)}")
-            utest.assertEqual([type(x) for x in entry], [int, int, int], f"Entry #{i} in {date_ser.name}, {entry}. "
-                                                                         f"Got types [{type(entry[0])}, "
-                                                                         f"{type(entry[1])}, {type(entry[2])}].")
-            utest.assertTrue(0 < entry[0] <= 31, f"Entry #{i} in {date_ser.name}, {entry}. Got {entry[0]} - not a "
-                                                 f"proper day number.")
-            utest.assertTrue(0 < entry[1] <= 12, f"Entry #{i} in {date_ser.name}, {entry}. Got {entry[1]} - not a "
-                                                 f"proper month number")
-            utest.assertTrue(1900 < entry[2] < 2022, f"Entry #{i} in {date_ser.name}, {entry}. Got {entry[2]} - not a "
-                                                     f"proper year number.")
+
+    def check(valid: pd.Series, reason) -> None:
+        if not valid.all():
+            i = valid.index[~valid.to_numpy()][0]
+            entry = date_ser[i]
+            utest.fail(f"Entry #{i} in {date_ser.name}, {entry}. {reason(entry)}")
+
+    check(date_ser.map(type).eq(list), lambda entry: f"Got type {type(entry)}")
+    lengths = date_ser.str.len()
+    check(lengths.isin([0, 3]), lambda entry: f"Got length {len(entry)}")
+    dates = date_ser[lengths == 3]
+    parts = pd.DataFrame(dates.tolist(), index=dates.index, columns=["day", "month", "year"], dtype=object)
+    check(parts.applymap(type).eq(int).all(axis=1),
+          lambda entry: f"Got types [{type(entry[0])}, {type(entry[1])}, {type(entry[2])}].")
+    parts = parts.astype(int)
+    check(parts["day"].between(1, 31), lambda entry: f"Got {entry[0]} - not a proper day number.")
+    check(parts["month"].between(1, 12), lambda entry: f"Got {entry[1]} - not a proper month number")
+    check(parts["year"].between(1901, 2021), lambda entry: f"Got {entry[2]} - not a proper year number.")
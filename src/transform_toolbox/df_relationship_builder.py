@@ -128,9 +128,13 @@ def df_relationship_builder(
 
 
 if __name__ == "__main__":
-    from academy_csv import AcademyCSV
-    from talent_csv import TalentCSV
-    from talent_json import TalentJSON
+    import sys
+    # run as a script from this directory: import the transform classes through their package, as they import their
+    # helpers (e.g. prefix_trie) relatively
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from transform_toolbox.academy_csv import AcademyCSV
+    from transform_toolbox.talent_csv import TalentCSV
+    from transform_toolbox.talent_json import TalentJSON
 
     # import pickles
     pickle_jar_path = Path(__file__).parent.parent.parent.resolve() / "pickle_jar"
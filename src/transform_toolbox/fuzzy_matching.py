@@ -0,0 +1,128 @@
+"""
+Note:
+    Fallback matching for rows that found no exact partner in columns_to_id. Candidates are blocked by month/year of
+    the date column and by the soundex code of each word of the name, so every row is only scored against a handful of
+    rows from its own block and the cost grows linearly with the number of applicants.
+    With one_to_one=True (1-to-1 and 0-or-1-to-1 relationships) a parent row is given to one child row at most: pairs
+    are assigned best score first, and parent rows taken by exact matches are left out.
+
+Example use:
+    parent_ids = fuzzy_match(student_information_df, unmatched_df, ["student_name", "date"], threshold=0.9)
+    parent_ids = fuzzy_match(student_information_df, unmatched_df, ["student_name", "date"], one_to_one=True,
+                             taken=set(exact_ids.dropna()))
+"""
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Optional
+import pandas as pd
+
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+def soundex(word: str) -> str:
+    """
+    American soundex code of a word e.g. 'Robert' -> 'R163'. Used as a phonetic blocking signature.
+
+    :param str word: single word, letters only
+    :return: four character code or empty string for an empty word
+    """
+    word = word.lower()
+    if not word:
+        return ''
+
+    code = word[0].upper()
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for c in word[1:]:
+        digit = SOUNDEX_CODES.get(c, '')
+        if digit and digit != previous:
+            code += digit
+        # 'h' and 'w' do not separate letters with the same code, vowels do
+        if c not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def normalise_name(s: str) -> str:
+    """
+    Lowercase the name and keep letters, digits and single spaces only e.g. "L;Urette  DAVELEY" -> "lurette daveley",
+    "Data 28" -> "data 28"
+    """
+    return re.sub(r"\s+", ' ', re.sub(r"[^a-z0-9\s]", '', str(s).lower())).strip()
+
+
+def _period(date: Optional[list[int]]) -> Optional[int]:
+    """
+    Convert [dd, mm, yyyy] to the number of months since year 0, None when the date is missing
+    """
+    return date[2] * 12 + date[1] - 1 if date else None
+
+
+def _block_keys(name: str, period: Optional[int], month_window: int) -> set[tuple]:
+    codes = {soundex(word) for word in name.split(' ') if word}
+    if period is None:
+        return {(None, code) for code in codes}
+    return {(p, code) for p in range(period - month_window, period + month_window + 1) for code in codes}
+
+
+def fuzzy_match(
+        parent_df: pd.DataFrame,
+        child_df: pd.DataFrame,
+        common_columns: list[str],
+        *, threshold: float = 0.9,
+        month_window: int = 0,
+        one_to_one: bool = False,
+        taken: Optional[set] = None
+) -> pd.Series:
+    """
+    For each row of child_df find the best scoring row of parent_df within the same block.
+
+    :param parent_df: dataframe with rows to be referenced, its index is returned as the match
+    :param child_df: rows that need a match
+    :param common_columns: name column, optionally followed by a [dd, mm, yyyy] date column (as in columns_to_id)
+    :param threshold: minimum similarity (0-1) of normalised names to accept a match
+    :param month_window: also look for candidates this many months before and after the child's month
+    :param one_to_one: match each parent row to one child row at most, best scores first
+    :param taken: indexes of parent rows matched already (with one_to_one), never matched again
+    :return: index of the matched parent row for each child row, NaN where no candidate reached the threshold
+    """
+    name_col = common_columns[0]
+    date_col = common_columns[1] if len(common_columns) >= 2 else None
+
+    parent_names = parent_df[name_col].map(normalise_name)
+    parent_periods = parent_df[date_col].map(_period) if date_col else pd.Series(None, index=parent_df.index)
+
+    blocks = defaultdict(list)
+    for idx, name, period in zip(parent_df.index, parent_names, parent_periods):
+        for code in {soundex(word) for word in name.split(' ') if word}:
+            blocks[(period, code)].append(idx)
+
+    # (score, child position, parent index) of every candidate reaching the threshold
+    pairs = []
+    child_periods = child_df[date_col].map(_period) if date_col else pd.Series(None, index=child_df.index)
+    for i, (name, period) in enumerate(zip(child_df[name_col].map(normalise_name), child_periods)):
+        candidates = {idx for key in _block_keys(name, period, month_window) for idx in blocks.get(key, [])}
+        for idx in candidates:
+            score = SequenceMatcher(None, name, parent_names[idx]).ratio()
+            if score >= threshold:
+                pairs.append((score, i, idx))
+
+    matches = [None] * len(child_df)
+    used = set(taken or ())
+    # best scores first, ties resolve to the first child and the lowest parent index
+    for score, i, idx in sorted(pairs, key=lambda pair: (-pair[0], pair[1], pair[2])):
+        if matches[i] is not None or (one_to_one and idx in used):
+            continue
+        matches[i] = idx
+        if one_to_one:
+            used.add(idx)
+
+    return pd.Series(matches, index=child_df.index, dtype=float)
@@ -0,0 +1,119 @@
+"""
+Note:
+    Intake month partitions of the sources for the streaming mode of run.py, which takes one partition at a time from
+    extract to load instead of every intake at once:
+        - spool: each raw pickle is read on its own, split by intake month (see transform_runner.intake_month) and
+          written as a checkpoint of one Feather file per month (see checkpoints.py) before the next one is read
+        - plan: consecutive months are grouped into partitions whose estimated working set fits the memory budget
+        - read: the raw dataframes of one partition are read back from the spool
+    The working set of a partition is estimated from the in-memory size of its raw rows, as transforming and relating
+    them takes about WORKING_SET_FACTOR times as much memory. A month larger than the budget is a partition of its own.
+    Pickles that did not change since the last run are not split again.
+
+Example use:
+    spool = PartitionSpool(Path("partition_spool"))
+    for source, path in pickle_paths.items():
+        spool.add(source, path)
+    for months in plan_partitions(spool.month_bytes(), 256 * 2 ** 20):
+        raw_dfs = spool.read(months)
+"""
+from pathlib import Path
+import pandas as pd
+from .checkpoints import CheckpointStore, file_fingerprint, stage_key, toolbox_path
+from .transform_runner import intake_month, shard_columns
+
+
+# memory taken by transforming and relating rows per byte of the raw rows
+WORKING_SET_FACTOR = 10
+
+
+def month_key(month: tuple[int, int]) -> str:
+    """
+    Name of an intake month partition e.g. (2019, 2) -> '2019-02', rows without a recognised month go to '0000-00'.
+    """
+    year, month = month
+    return f"{year:04d}-{month:02d}"
+
+
+class PartitionSpool:
+    """
+    Example use:
+    spool = PartitionSpool(Path("partition_spool"))
+    spool.add("talent_txt", pickle_jar_path / "talent_txt_v2.pkl")
+    raw_dfs = spool.read(["2019-07", "2019-08"])
+    """
+
+    def __init__(self, root: Path) -> None:
+        """
+        :param root: directory of the spool, created on the first add
+        """
+        self.store = CheckpointStore(root)
+        # checkpoint key and raw bytes of each month of the sources added
+        self.keys = {}
+        self.sizes = {}
+
+    def add(self, source: str, path: Path) -> None:
+        """
+        Split the raw pickle of a source by intake month into the spool, unless it is there already.
+
+        :param source: source name ('academy_csv' | 'talent_csv' | 'talent_json' | 'talent_txt')
+        :param path: raw pickle of the source
+        """
+        key = stage_key(file_fingerprint([path]), file_fingerprint([toolbox_path / "transform_runner.py"]))
+        checkpoint = self.store.load(source, key, [])
+        if checkpoint is None:
+            raw_df = pd.read_pickle(path)
+            months = raw_df[shard_columns[source]].astype(str).map(intake_month).map(month_key)
+            parts = {month: part.reset_index(drop=True) for month, part in raw_df.groupby(months, sort=True)}
+            sizes = {month: int(part.memory_usage(deep=True).sum()) for month, part in parts.items()}
+            self.store.save(source, key, parts, {"sizes": sizes})
+        else:
+            sizes = checkpoint[1]["sizes"]
+        self.keys[source] = key
+        self.sizes[source] = sizes
+
+    def month_bytes(self) -> dict[str, int]:
+        """
+        In-memory size of the raw rows of each month, summed over the sources.
+        """
+        month_bytes = {}
+        for sizes in self.sizes.values():
+            for month, size in sizes.items():
+                month_bytes[month] = month_bytes.get(month, 0) + size
+        return month_bytes
+
+    def read(self, months: list[str]) -> dict[str, pd.DataFrame]:
+        """
+        Read the raw rows of the months back.
+
+        :return: raw dataframes keyed by source name, sources without rows in these months are left out
+        """
+        raw_dfs = {}
+        for source, key in self.keys.items():
+            parts, _ = self.store.load(source, key, months)
+            if parts:
+                raw_dfs[source] = pd.concat([parts[month] for month in months if month in parts], ignore_index=True)
+        return raw_dfs
+
+
+def plan_partitions(month_bytes: dict[str, int], budget: int, *, factor: float = WORKING_SET_FACTOR
+                    ) -> list[list[str]]:
+    """
+    Group consecutive months into partitions whose estimated working set fits the budget.
+
+    :param month_bytes: raw bytes of each month (see PartitionSpool.month_bytes)
+    :param budget: memory budget of a partition in bytes
+    :param factor: working set per raw byte
+    :return: months of each partition, in chronological order
+    """
+    partitions = []
+    size = 0
+    for month in sorted(month_bytes):
+        needed = month_bytes[month] * factor
+        if partitions and size + needed <= budget:
+            partitions[-1].append(month)
+            size += needed
+        else:
+            partitions.append([month])
+            size = needed
+    return partitions
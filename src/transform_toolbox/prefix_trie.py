@@ -0,0 +1,171 @@
+"""
+Note:
+    Camel case spellings of surnames, read from camel_case_names.txt at the root of the project. The list is an input
+    of the pipeline, checked in and edited by hand. Runs only add to it with --discover-names, once the transform stage
+    is over, so the names of a run are all normalised with the same list. Each line holds one entry:
+        - 'Mc*': a prefix, every upper or lower case word starting with it gets a capital after it
+          ('MCCRACKAN' -> 'McCrackan')
+        - 'MacGillespie': a whole word, restored only when the word matches it ('MACGILLESPIE' -> 'MacGillespie').
+          Prefixes like 'Mac' also start ordinary names ('Mackinder', 'Macrae'), so their camel case names are listed
+          one by one.
+    Blank lines and lines starting with '#' are ignored. Upper and lower case names lose the capital letter after the
+    prefix, e.g. 'MACLEOD' -> 'Macleod', which the list restores. The list is read into a trie once per process, so
+    every word is matched in a single walk over its letters, whatever the number of prefixes.
+
+    New entries are found in the names as written by the source: a prefix starting camel case words of several
+    names ('McCracken', 'McNair' -> 'Mc*'), or the camel case words one by one when the prefix also starts ordinary
+    names ('MacLeod' next to 'Mackinder' -> 'MacLeod'). Running the module prints the entries missing from the list:
+        python -m transform_toolbox.prefix_trie  (from src)
+
+Example use:
+    trie = load_prefixes()
+    trie.restore("Mccrackan")  # 'McCrackan'
+    trie.restore("Mackinder")  # 'Mackinder'
+    append_entries(new_entries(raw_df["name"], trie))
+"""
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+
+
+names_path = Path(__file__).resolve().parent.parent.parent / "camel_case_names.txt"
+
+CAMEL_PREFIX_PATTERN = r"\b([A-Z][a-z]+)[A-Z][a-z]"
+
+
+class PrefixTrie:
+    """
+    Example use:
+    trie = PrefixTrie(["Mac", "Mc"], words=["DeVito"])
+    trie.longest_prefix("maccenzie")  # 3
+    """
+
+    def __init__(self, prefixes: tuple[str, ...] = (), *, words: tuple[str, ...] = (), min_rest: int = 3) -> None:
+        """
+        :param prefixes: prefixes to start with (any case)
+        :param words: whole words in camel case e.g. 'MacGillespie', restored whatever the prefixes
+        :param min_rest: fewest letters that have to follow a prefix for it to be restored e.g. 'Mack' stays as it is
+        """
+        self.root = {}
+        self.min_rest = min_rest
+        self.prefixes = set()
+        self.words = {word.lower(): word for word in words}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def __contains__(self, prefix: str) -> bool:
+        return prefix.lower() in self.prefixes
+
+    def __len__(self) -> int:
+        return len(self.prefixes)
+
+    def add(self, prefix: str) -> bool:
+        """
+        Insert a prefix.
+
+        :return: False if the prefix was known already
+        """
+        prefix = prefix.strip().lower()
+        if not prefix or prefix in self.prefixes:
+            return False
+        node = self.root
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node[''] = True
+        self.prefixes.add(prefix)
+        return True
+
+    def longest_prefix(self, word: str) -> int:
+        """
+        Length of the longest prefix of the word followed by at least min_rest letters, 0 if there is none.
+        """
+        word = word.lower()
+        longest = 0
+        node = self.root
+        for i, c in enumerate(word[:len(word) - self.min_rest]):
+            node = node.get(c)
+            if node is None:
+                break
+            if '' in node:
+                longest = i + 1
+        return longest
+
+    def restore(self, word: str) -> str:
+        """
+        Spell a listed word in camel case, or capitalise the letter after the longest prefix e.g.
+        'Maccenzie' -> 'MacCenzie'.
+        """
+        if word.lower() in self.words:
+            return self.words[word.lower()]
+        n = self.longest_prefix(word)
+        return word[:n] + word[n:].capitalize() if n else word
+
+
+@lru_cache(maxsize=None)
+def load_prefixes(path: Path = names_path) -> PrefixTrie:
+    """
+    Read the list into a trie, once per process. A missing list gives an empty trie.
+    """
+    if not path.is_file():
+        return PrefixTrie()
+    with open(path, 'r') as file:
+        entries = [line.strip() for line in file if line.strip() and not line.lstrip().startswith('#')]
+    return PrefixTrie(
+        tuple(entry[:-1] for entry in entries if entry.endswith('*')),
+        words=tuple(entry for entry in entries if not entry.endswith('*'))
+    )
+
+
+def discover_prefixes(names: pd.Series, *, min_count: int = 2) -> list[str]:
+    """
+    Find the prefixes of words written in camel case e.g. 'Ann McCracken' -> 'Mc'.
+
+    :param names: names as written by the source (not normalised)
+    :param min_count: fewest different words a prefix has to start
+    :return: prefixes e.g. ['Mac', 'Mc']
+    """
+    words = names.dropna().astype(str).str.split().explode().dropna().drop_duplicates()
+    prefixes = words.str.extract(CAMEL_PREFIX_PATTERN, expand=False).dropna()
+    counts = prefixes.value_counts()
+    return sorted(counts[counts >= min_count].index)
+
+
+def new_entries(names: pd.Series, trie: PrefixTrie, *, min_count: int = 2) -> list[str]:
+    """
+    Find the entries of the list the names call for and the trie does not have yet.
+
+    :param names: names as written by the source (not normalised)
+    :param trie: camel case names known already
+    :param min_count: fewest different words a prefix has to start
+    :return: entries e.g. ['Mc*', 'MacLeod']
+    """
+    words = names.dropna().astype(str).str.split().explode().dropna().drop_duplicates()
+    entries = []
+    for prefix in discover_prefixes(names, min_count=min_count):
+        if prefix in trie:
+            continue
+        started = words[words.str.startswith(prefix) & (words.str.len() >= len(prefix) + trie.min_rest)]
+        camel_case = started[started.str.match(prefix + "[A-Z][a-z]")]
+        if len(camel_case) == len(started):
+            entries.append(prefix + "*")
+        else:
+            # 'Mackinder' written by the source, a 'Mac*' prefix would spell it 'MacKinder'
+            entries.extend(word for word in sorted(camel_case) if trie.restore(word.capitalize()) != word)
+    return entries
+
+
+def append_entries(entries: list[str], path: Path = names_path) -> None:
+    """
+    Add entries to the end of the list in one write, the list is read again by the next load_prefixes.
+    """
+    if not entries:
+        return
+    with open(path, 'a') as file:
+        file.write(''.join(entry + '\n' for entry in entries))
+    load_prefixes.cache_clear()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    raw_df = pd.read_pickle(names_path.parent / "pickle_jar" / "talent_csv_v2.pkl")
+    for entry in new_entries(raw_df["name"], load_prefixes()):
+        print(entry)
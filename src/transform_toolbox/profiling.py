@@ -0,0 +1,307 @@
+"""
+Note:
+    Opt-in profiling of the pipeline. A Profiler records CPU time per function (cProfile) and allocations per line
+    (tracemalloc) of:
+        - stages of the main process: profiler.start/stop or the profiler.stage context manager
+        - calls of functions run in worker processes: profiler.wrap(func, name) returns a picklable wrapper, each call
+          records a part of the profile in the worker
+    Profiles of the same name are merged by profiler.write, e.g. all intake month shards of a source or all partitions
+    of a stage, into:
+        - <name>.prof: pstats dump, for snakeviz or pstats.Stats
+        - <name>.txt: functions sorted by cumulative and by own time
+        - <name>.collapsed: collapsed stacks in microseconds for flamegraph.pl or speedscope. cProfile keeps callers
+          rather than whole stacks, so the time of a function called from several places is split between its callers
+          in proportion to the time each caller spent in it.
+        - <name>.allocations.txt: peak traced memory and the lines holding the most memory at the end of the call
+    A disabled profiler (no output directory) hands every function back unwrapped and its stages do nothing, so the
+    pipeline does not pay for profiling unless it is asked for. tracemalloc slows allocation heavy code down several
+    times while profiling.
+
+Example use:
+    profiler = Profiler(Path("profiles"))
+    with profiler.stage("stage.transform"):
+        outputs, durations = run_transforms(raw_dfs, profiler=profiler)
+    print_profiles(profiler.write())
+
+    # profile the __main__ runner of a transform class, from src
+    python -m transform_toolbox.talent_json --profile-dir profiles
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import shutil
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+
+# lines kept per part of an allocation profile and printed per profile
+ALLOCATION_LINES = 50
+# functions printed per sort order
+STATS_LINES = 40
+
+
+# process whose traces _profiled may use, see _drop_inherited_traces
+_traces_pid = os.getpid()
+
+
+class ProfileSummary(NamedTuple):
+    calls: int
+    seconds: float
+    peak_bytes: int
+
+
+@contextmanager
+def _profiled(parts_dir: Path, name: str) -> Iterator[None]:
+    """
+    Profile the block and write its part of the profile into parts_dir.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    snapshot_before = tracemalloc.take_snapshot()
+    profile = cProfile.Profile()
+    start = time.perf_counter()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] - traced_before
+        # leave out the memory taken by the profilers themselves
+        own_files = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, cProfile.__file__)]
+        lines = tracemalloc.take_snapshot().filter_traces(own_files).compare_to(
+            snapshot_before.filter_traces(own_files), "lineno"
+        )
+        if started_tracing:
+            tracemalloc.stop()
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        part = f"{name}__{os.getpid()}_{uuid.uuid4().hex[:8]}"
+        profile.dump_stats(parts_dir / f"{part}.prof")
+        allocations = {
+            "seconds": seconds,
+            "peak_bytes": peak,
+            "lines": [[str(line.traceback[0]), line.size_diff, line.count_diff] for line in lines[:ALLOCATION_LINES]]
+        }
+        with open(parts_dir / f"{part}.alloc", 'w') as file:
+            json.dump(allocations, file)
+
+
+def _drop_inherited_traces() -> None:
+    """
+    A worker forked while the main process was tracing inherits all of its traces, which would make every snapshot of
+    the worker as large as the main process. Stop tracing once per process, so _profiled starts from scratch.
+    """
+    global _traces_pid
+    if _traces_pid != os.getpid():
+        _traces_pid = os.getpid()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+class ProfiledCall:
+    """
+    Picklable wrapper of a function profiling every call, see Profiler.wrap.
+    """
+
+    def __init__(self, func: Callable, name: str, parts_dir: Path) -> None:
+        self.func = func
+        self.name = name
+        self.parts_dir = parts_dir
+
+    def __call__(self, *args, **kwargs) -> Any:
+        _drop_inherited_traces()
+        with _profiled(self.parts_dir, self.name):
+            return self.func(*args, **kwargs)
+
+
+class Profiler:
+    """
+    Example use:
+    profiler = Profiler(Path("profiles"))
+    profile = profiler.start("stage.load")
+    ...
+    profiler.stop(profile)
+    summaries = profiler.write()
+    """
+
+    def __init__(self, output_dir: Optional[Path] = None) -> None:
+        """
+        :param output_dir: directory the profiles are written to, None disables profiling
+        """
+        self.output_dir = None if output_dir is None else Path(output_dir)
+
+    @property
+    def enabled(self) -> bool:
+        return self.output_dir is not None
+
+    @property
+    def parts_dir(self) -> Optional[Path]:
+        return None if self.output_dir is None else self.output_dir / "parts"
+
+    def stage(self, name: str):
+        """
+        Context manager profiling a stage of the main process under name.
+        """
+        return _profiled(self.parts_dir, name) if self.enabled else nullcontext()
+
+    def start(self, name: str):
+        """
+        Start profiling a stage of the main process, stages must not overlap.
+
+        :return: handle to pass to stop
+        """
+        if not self.enabled:
+            return None
+        stage = self.stage(name)
+        stage.__enter__()
+        return stage
+
+    def stop(self, stage) -> None:
+        if stage is not None:
+            stage.__exit__(None, None, None)
+
+    def wrap(self, func: Callable, name: Optional[str] = None) -> Callable:
+        """
+        Profile every call of func, also when it runs in a worker process.
+
+        :param func: function to profile, a module-level function when it is sent to a worker process
+        :param name: name of the merged profile, defaults to the name of func
+        :return: func itself when profiling is disabled
+        """
+        if not self.enabled:
+            return func
+        return ProfiledCall(func, name or func.__name__, self.parts_dir)
+
+    def write(self) -> dict[str, ProfileSummary]:
+        """
+        Merge the parts recorded so far by name and write the profiles into the output directory.
+
+        :return: calls, seconds and peak traced memory of each profile, keyed by name
+        """
+        if not self.enabled or not self.parts_dir.is_dir():
+            return {}
+        parts = {}
+        for path in sorted(self.parts_dir.glob("*.prof")):
+            parts.setdefault(path.name.rsplit("__", 1)[0], []).append(path)
+
+        summaries = {}
+        for name, paths in parts.items():
+            stats = pstats.Stats(*map(str, paths))
+            stats.dump_stats(self.output_dir / f"{name}.prof")
+            with open(self.output_dir / f"{name}.txt", 'w') as file:
+                file.write(sorted_stats(stats))
+            with open(self.output_dir / f"{name}.collapsed", 'w') as file:
+                file.writelines(f"{stack} {micros}\n" for stack, micros in collapsed_stacks(stats).items())
+
+            allocations = []
+            for path in paths:
+                with open(str(path).removesuffix(".prof") + ".alloc", 'r') as file:
+                    allocations.append(json.load(file))
+            peak = max(part["peak_bytes"] for part in allocations)
+            with open(self.output_dir / f"{name}.allocations.txt", 'w') as file:
+                file.write(allocation_report(allocations))
+            summaries[name] = ProfileSummary(len(paths), sum(part["seconds"] for part in allocations), peak)
+        shutil.rmtree(self.parts_dir)
+        return summaries
+
+
+def sorted_stats(stats: pstats.Stats, limit: int = STATS_LINES) -> str:
+    """
+    Functions of a profile sorted by cumulative time and by own time.
+    """
+    output = io.StringIO()
+    stats.stream = output
+    for sort_key in ["cumulative", "tottime"]:
+        print(f"Sorted by {sort_key} time:", file=output)
+        stats.sort_stats(sort_key).print_stats(limit)
+    return output.getvalue()
+
+
+def _function_label(func: tuple[str, int, str]) -> str:
+    filename, line, function = func
+    if filename == "~":
+        # built-in function e.g. "<method 'join' of 'str' objects>"
+        return function
+    return f"{function} ({Path(filename).name}:{line})"
+
+
+def collapsed_stacks(stats: pstats.Stats, *, min_micros: int = 1000) -> dict[str, int]:
+    """
+    Rebuild call stacks from the callers kept by cProfile, for flame graphs.
+
+    :param stats: merged profile
+    :param min_micros: stacks that took less time are left out
+    :return: 'root;caller;function' -> own time of function in that stack in microseconds
+    """
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((func, cumulative))
+    roots = [func for func, (_, _, _, _, callers) in stats.stats.items() if not callers]
+
+    stacks = {}
+
+    def visit(func, stack: tuple, seconds: float) -> None:
+        _, _, own, cumulative, _ = stats.stats[func]
+        share = min(seconds / cumulative, 1.0) if cumulative else 0.0
+        label = ';'.join(stack + (_function_label(func),))
+        micros = round(own * share * 1e6)
+        if micros >= min_micros:
+            stacks[label] = stacks.get(label, 0) + micros
+        for callee, callee_seconds in callees.get(func, []):
+            # recursion adds no frames, its time is already in the outer call
+            if callee != func and _function_label(callee) not in stack and callee_seconds * share * 1e6 >= min_micros:
+                visit(callee, stack + (_function_label(func),), callee_seconds * share)
+
+    for root in roots:
+        visit(root, (), stats.stats[root][3])
+    return stacks
+
+
+def allocation_report(allocations: list[dict], limit: int = ALLOCATION_LINES) -> str:
+    """
+    Peak traced memory of the calls of a profile and the lines holding the most memory, summed over the calls.
+    """
+    lines = {}
+    for part in allocations:
+        for line, size, count in part["lines"]:
+            total_size, total_count = lines.get(line, (0, 0))
+            lines[line] = (total_size + size, total_count + count)
+    peak = max(part["peak_bytes"] for part in allocations)
+    report = [f"Calls: {len(allocations)}, peak traced memory of a call: {peak / 2 ** 20:.1f} MiB",
+              "Memory held at the end of the calls by line (KiB, blocks, line):"]
+    for line, (size, count) in sorted(lines.items(), key=lambda item: -abs(item[1][0]))[:limit]:
+        report.append(f"\t{size / 1024:10.1f} {count:8d} {line}")
+    return '\n'.join(report) + '\n'
+
+
+def print_profiles(summaries: dict[str, ProfileSummary]) -> None:
+    """
+    Print calls, time and peak traced memory of each profile written.
+    """
+    for name, (calls, seconds, peak) in summaries.items():
+        print(f"\t{name}... {calls} calls in {seconds:.2f}s, peak traced memory {peak / 2 ** 20:.1f} MiB")
+
+
+def runner_profiler(description: str) -> Profiler:
+    """
+    Parse the arguments of the __main__ runner of a transform class.
+
+    :param description: what the runner does
+    :return: profiler writing into --profile-dir, disabled without it
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--profile-dir", default=None,
+                        help="profile the transform (CPU time per function and allocations) into this directory")
+    args = parser.parse_args()
+    return Profiler(args.profile_dir and Path(args.profile_dir))
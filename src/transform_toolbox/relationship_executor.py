@@ -0,0 +1,309 @@
+"""
+Note:
+    Runs the relationship plan declared in schema.py. Every step only adds a key column to its child (or builds a
+    junction and a dimension table), so steps that do not touch each other's columns are executed concurrently in a
+    process pool.
+
+Example use:
+    tables, durations, _ = run_relationship_plan(tables, relationship_plan, max_workers=4)
+    print_relationship_timings(relationship_plan, durations)
+
+    # with fuzzy matching of rows left without a key
+    tables, durations, match_counts = run_relationship_plan(tables, relationship_plan, fuzzy_threshold=0.9)
+    print_match_report(relationship_plan, match_counts)
+
+    # with ids that stay the same between runs
+    tables, durations, _ = run_relationship_plan(tables, relationship_plan, key_registry=KeyRegistry(engine),
+                                                 natural_keys=natural_keys)
+
+    # profile each step in the worker processes
+    tables, durations, _ = run_relationship_plan(tables, relationship_plan, profiler=Profiler(Path("profiles")))
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional
+import pandas as pd
+from .df_relationship_builder import df_relationship_builder, many_to_many_relationship, hard_reset_index
+from .fuzzy_matching import fuzzy_match
+from .profiling import Profiler
+
+
+def _dimension_name(relationship) -> str:
+    """
+    Name of the dimension table built by a many-to-many step e.g. 'weakness_junction' -> 'weakness'
+    """
+    return relationship.child.removesuffix("_junction")
+
+
+def _step_label(relationship) -> str:
+    return f"{relationship.child} <- {relationship.parent}"
+
+
+def _step_columns(relationship) -> tuple[set[tuple[str, str]], set[tuple[str, str]]]:
+    """
+    List (table, column) pairs read and written by a single step. Column '*' stands for the whole table.
+
+    :param relationship: entry of the relationship plan
+    :return: reads and writes of the step
+    """
+    reads = {(relationship.parent, "index")}
+    reads |= {(relationship.parent, col) for col in relationship.on}
+    reads |= {(relationship.child, col) for col in relationship.on}
+    if relationship.cardinality == "many-to-many":
+        writes = {(relationship.child, "*"), (_dimension_name(relationship), "*")}
+    else:
+        writes = {(relationship.child, f"{relationship.parent}_id")}
+    return reads, writes
+
+
+def _overlap(a: set[tuple[str, str]], b: set[tuple[str, str]]) -> bool:
+    return any(t1 == t2 and "*" in (c1, c2) or (t1, c1) == (t2, c2) for t1, c1 in a for t2, c2 in b)
+
+
+def build_dependency_graph(plan: list) -> dict[int, set[int]]:
+    """
+    Work out which steps have to wait for which. A step depends on an earlier one if it reads or writes a column the
+    earlier step writes, or writes a column the earlier step reads.
+
+    :param list plan: relationship plan (see schema.relationship_plan)
+    :return: step number -> set of step numbers it depends on
+    """
+    columns = [_step_columns(relationship) for relationship in plan]
+    graph = {}
+    for i, (reads, writes) in enumerate(columns):
+        graph[i] = {
+            j for j, (prev_reads, prev_writes) in enumerate(columns[:i])
+            if _overlap(prev_writes, reads | writes) or _overlap(prev_reads, writes)
+        }
+    return graph
+
+
+def critical_path(graph: dict[int, set[int]], durations: dict[int, float]) -> list[int]:
+    """
+    Find the chain of dependent steps with the longest total duration.
+
+    :param graph: output of build_dependency_graph
+    :param durations: step number -> duration in seconds
+    :return: step numbers on the critical path, in execution order
+    """
+    finish = {}
+    previous = {}
+    # steps are numbered in plan order, which is already a topological order
+    for i in sorted(graph):
+        before = max(graph[i], key=lambda j: finish[j], default=None)
+        previous[i] = before
+        finish[i] = durations[i] + (finish[before] if before is not None else 0.0)
+
+    path = []
+    step = max(finish, key=finish.get, default=None)
+    while step is not None:
+        path.append(step)
+        step = previous[step]
+    return path[::-1]
+
+
+def _fill_unmatched(
+        keys: pd.Series,
+        relationship,
+        parent_df: pd.DataFrame,
+        child_df: pd.DataFrame,
+        fuzzy_options: Optional[dict]
+) -> tuple[pd.Series, tuple[int, int, int, float]]:
+    """
+    Fuzzy match child rows whose key is missing after exact matching.
+
+    :param keys: key column aligned by position with child_df
+    :return: filled key column and match counts (rows, exact matches, fuzzy matches, fuzzy matching time)
+    """
+    unmatched = keys.isna().to_numpy()
+    exact = len(keys) - int(unmatched.sum())
+    if not fuzzy_options or not unmatched.any():
+        return keys, (len(keys), exact, 0, 0.0)
+
+    start = time.perf_counter()
+    if relationship.cardinality in ("1-to-1", "0-or-1-to-1"):
+        # a parent row taken by an exact match (or by a better fuzzy match) is not given to another child row
+        fuzzy_options = {**fuzzy_options, "one_to_one": True, "taken": set(keys.dropna())}
+    matches = fuzzy_match(parent_df, child_df[unmatched], relationship.on, **fuzzy_options)
+    keys = keys.astype(float)
+    keys[unmatched] = matches.to_numpy()
+    return keys, (len(keys), exact, int(matches.notna().sum()), time.perf_counter() - start)
+
+
+def _run_step(
+        relationship,
+        parent_df: pd.DataFrame,
+        child_df: pd.DataFrame,
+        fuzzy_options: Optional[dict] = None
+) -> tuple[dict, float, tuple[int, int, int, float]]:
+    """
+    Execute one step of the plan. Runs in a worker process.
+
+    :return: new/updated dataframes (or key columns) keyed by table name, duration of the step and match counts
+    """
+    start = time.perf_counter()
+    if relationship.cardinality == "many-to-many":
+        dimension = _dimension_name(relationship)
+        _, junction_df, dimension_df = many_to_many_relationship(
+            df=parent_df,
+            composite_junction_df=child_df,
+            col_name=dimension,
+            index_col_names=[f"{relationship.parent}_id", f"{dimension}_id"],
+            common_columns=relationship.on
+        )
+        parent_id = f"{relationship.parent}_id"
+        # junction rows follow the order of the composite dataframe
+        junction_df[parent_id], match_count = _fill_unmatched(
+            junction_df[parent_id], relationship, parent_df, child_df.reset_index(drop=True), fuzzy_options
+        )
+        # keep the columns of the composite dataframe (matched on, dimension value, score), as other child tables do
+        for col in child_df.columns:
+            junction_df[col] = child_df[col].to_numpy()
+        output = {relationship.child: junction_df, dimension: dimension_df}
+    else:
+        index_column_name = f"{relationship.parent}_id"
+        _, child_df = df_relationship_builder(
+            left_df=parent_df,
+            right_df=child_df,
+            common_columns=relationship.on,
+            relationship_type=relationship.cardinality,
+            index_column_name=index_column_name,
+            where_index_column="right"
+        )
+        keys, match_count = _fill_unmatched(
+            child_df[index_column_name], relationship, parent_df, child_df, fuzzy_options
+        )
+        output = {index_column_name: keys}
+    return output, time.perf_counter() - start, match_count
+
+
+def run_relationship_plan(
+        tables: dict[str, pd.DataFrame],
+        plan: list,
+        *, max_workers: Optional[int] = None,
+        fuzzy_threshold: Optional[float] = None,
+        month_window: int = 0,
+        key_registry=None,
+        natural_keys: Optional[dict[str, list[str]]] = None,
+        profiler: Optional[Profiler] = None
+) -> tuple[dict[str, pd.DataFrame], dict[int, float], dict[int, tuple[int, int, int, float]]]:
+    """
+    Build relationships between dataframes according to the plan. Independent steps run concurrently.
+
+    :param tables: cleaned dataframes keyed by table name; junction tables are expected in their composite form
+    (student_name, date, <dimension>)
+    :param plan: relationship plan (see schema.relationship_plan)
+    :param max_workers: size of the process pool, defaults to the number of CPUs
+    :param fuzzy_threshold: if given, rows left without a key are fuzzy matched with this similarity threshold
+    :param month_window: months before/after the row's date searched by fuzzy matching
+    :param key_registry: if given, positional ids are replaced with its stable ids (see load_toolbox.key_registry)
+    :param natural_keys: table name -> columns identifying a row (see schema.natural_keys), used with key_registry
+    :param profiler: profile each step under 'relationship.<child>.<parent>' (see profiling.Profiler.wrap)
+    :return: related dataframes keyed by table name (with dimension tables added), step durations and match counts
+    (rows, exact matches, fuzzy matches, fuzzy matching time) of each step
+    """
+    # fix primary keys once, so that each step can reference them without rebuilding the parent
+    tables = {name: hard_reset_index(df) for name, df in tables.items()}
+    graph = build_dependency_graph(plan)
+
+    pending = list(range(len(plan)))
+    running = {}
+    durations = {}
+    match_counts = {}
+    fuzzy_options = {"threshold": fuzzy_threshold, "month_window": month_window} if fuzzy_threshold else None
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for i in [i for i in pending if graph[i] <= durations.keys()]:
+                relationship = plan[i]
+                parent_df = tables[relationship.parent][relationship.on]
+                child_df = tables[relationship.child]
+                if relationship.cardinality != "many-to-many":
+                    child_df = child_df[relationship.on]
+                run_step = _run_step
+                if profiler is not None:
+                    run_step = profiler.wrap(_run_step, f"relationship.{relationship.child}.{relationship.parent}")
+                running[pool.submit(run_step, relationship, parent_df, child_df, fuzzy_options)] = i
+                pending.remove(i)
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                i = running.pop(future)
+                output, durations[i], match_counts[i] = future.result()
+                if plan[i].cardinality == "many-to-many":
+                    tables.update(output)
+                else:
+                    for column_name, column in output.items():
+                        tables[plan[i].child][column_name] = column.values
+
+    if key_registry is not None:
+        assign_stable_ids(tables, plan, key_registry, natural_keys)
+    return tables, durations, match_counts
+
+
+def assign_stable_ids(
+        tables: dict[str, pd.DataFrame],
+        plan: list,
+        key_registry,
+        natural_keys: dict[str, list[str]]
+) -> None:
+    """
+    Replace positional ids of related dataframes (in place) with stable ids from the key registry. Copies of a row
+    share its id and only one of them is kept. Keys of rows whose parent was not in this run are looked up among the
+    parents registered by earlier runs.
+
+    :param tables: output of the plan keyed by table name
+    :param plan: relationship plan the tables were related with
+    :param key_registry: KeyRegistry (see load_toolbox.key_registry)
+    :param natural_keys: table name -> columns identifying a row (see schema.natural_keys)
+    """
+    id_maps = {}
+    for table_name, df in tables.items():
+        if "index" in df and table_name in natural_keys and not df.empty:
+            stable_ids = key_registry.assign_ids(table_name, df, natural_keys[table_name])
+            id_maps[table_name] = dict(zip(df["index"], stable_ids))
+            df["index"] = stable_ids.to_numpy()
+            if df["index"].duplicated().any():
+                tables[table_name] = df[~df["index"].duplicated()].copy()
+
+    for relationship in plan:
+        if not tables[relationship.parent].empty:
+            key_registry.register_aliases(relationship.parent, tables[relationship.parent], relationship.on)
+
+    for relationship in plan:
+        child_df = tables[relationship.child]
+        references = [(relationship.parent, relationship.on)]
+        if relationship.cardinality == "many-to-many":
+            # dimension tables are always built from the junction, so their ids are known
+            references.append((_dimension_name(relationship), None))
+        for parent, on in references:
+            column = f"{parent}_id"
+            stable_ids = child_df[column].map(id_maps.get(parent, {}))
+            missing = stable_ids.isna()
+            if on is not None and missing.any():
+                stable_ids[missing] = key_registry.resolve(parent, child_df[missing], on)
+            child_df[column] = stable_ids.astype("Int64")
+
+
+def print_relationship_timings(plan: list, durations: dict[int, float]) -> None:
+    """
+    Print duration of each step and the critical path of the plan.
+    """
+    path = critical_path(build_dependency_graph(plan), durations)
+    for i, relationship in enumerate(plan):
+        marker = '*' if i in path else ' '
+        print(f"\t{marker} ({i + 1}/{len(plan)}) {_step_label(relationship)}... {durations[i]:.2f}s")
+    print(f"\tCritical path ({sum(durations[i] for i in path):.2f}s): "
+          f"{' -> '.join(_step_label(plan[i]) for i in path)}")
+
+
+def print_match_report(plan: list, match_counts: dict[int, tuple[int, int, int, float]]) -> None:
+    """
+    Print match rate of each step before and after fuzzy matching.
+    """
+    for i, relationship in enumerate(plan):
+        rows, exact, fuzzy, seconds = match_counts[i]
+        if not rows:
+            continue
+        print(f"\t({i + 1}/{len(plan)}) {_step_label(relationship)}... "
+              f"exact {exact}/{rows} ({exact / rows:.1%}), "
+              f"fuzzy +{fuzzy} ({(exact + fuzzy) / rows:.1%}) in {seconds:.2f}s")
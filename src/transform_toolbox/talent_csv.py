@@ -3,6 +3,7 @@ from typing import Union, Optional
 import pandas as pd
 import re
 from pathlib import Path
+from .prefix_trie import PrefixTrie, load_prefixes
 
 
 class TalentCSV:
@@ -12,50 +13,6 @@ class TalentCSV:
         info_df, inv_df = talent_csv.transform_talent_csv(df)
     """
 
-    @staticmethod
-    def __camel_case_reader(method: str, cc_list: Optional[list[str]] = None) -> Optional[list[str]]:  # pragma: no cover
-        """
-        Function that interfaces with a list of recorded so-far prefixes of camel case words. Possible modes of
-        operation:
-        1. no file found on read -> return empty list;
-        2. no file found on write -> create file, write list to the file;
-        3. file exists on read -> return it's content;
-        4. file exists on write -> read it's content, concatenate with existing list and remove duplicates, then write;
-
-        :param str method: can be set to 'read' or 'write' -> read/write data from the file record
-        :param Optional[list[str]] cc_list: required if method set to 'write'; list of discovered prefixes
-        :return: if method set to 'read' the function return list of recorded prefixes
-        """
-        filepath = Path(__file__).resolve().parent.parent / "camel_case_record" / "record.txt"
-        if method == 'read':
-            if filepath.is_file():
-                # file exists on read -> return it's content
-                with open(filepath, 'r') as file:
-                    return file.readlines()
-            else:
-                # no file found on read -> return empty list;
-                return []
-        elif method == 'write':
-            # ensure each prefix is normalised e.g. MAC -> Mac, van -> Van
-            for i, pref in enumerate(cc_list):
-                cc_list[i] = pref.lower().capitalize()
-
-            if filepath.is_file():
-                # file exists on write -> read it's content
-                with open(filepath, 'r') as file:
-                    old_record = file.readlines()
-                # concatenate with existing list
-                total_record = old_record + cc_list
-                # remove duplicates, then write
-                with open(filepath, 'w') as file:
-                    file.writelines(set(total_record))
-            else:
-                # no file found on write -> create file, remove duplicates, write list to the file
-                with open(filepath, 'w') as file:
-                    file.writelines(set(cc_list))
-        else:
-            return None
-
     @staticmethod
     def _get_date_from_string(filename: str) -> list[int]:
         """
@@ -112,17 +69,20 @@ class TalentCSV:
             return date_ls
 
     @staticmethod
-    def _normalise_string(s: str) -> str:
+    def _normalise_string(s: str, *, prefixes: Optional[PrefixTrie] = None) -> str:
         """
-        Makes sure each word in the string starts with capital letter. Takes into account camel cases.
+        Makes sure each word in the string starts with capital letter. Takes into account camel cases: words are
+        spelled as in the camel case names list, unless written with a single capital by the source ('Mackinder').
 
-        :param str s: input string e.g. 'MARTY MACCENZIE'
-        :return: normalised string e.g. 'Marty MacCenzie' or 'Marty Maccenzie' - the latter may occur if the record is
-        not populated with valid prefixes
+        :param str s: input string e.g. 'MARTY MCCRACKAN'
+        :param Optional[PrefixTrie] prefixes: camel case names, camel_case_names.txt (see prefix_trie) if None
+        :return: normalised string e.g. 'Marty McCrackan' or 'Marty Mccrackan' - the latter may occur if the list does
+        not cover the name
         """
         # discard invalid strings
         if not s or s.isspace():
             return ''
+        prefixes = load_prefixes() if prefixes is None else prefixes
         # remove duplicate spaces
         s = re.sub(r'\s+', ' ',   s).strip()
         # split into words and iterate
@@ -133,8 +93,13 @@ class TalentCSV:
                 word = 'and'
             # allow only for letters and some special characters
             word = ''.join([c for c in word if c not in "0123456789!£$%^&*(),.@:;?/\\<>{}[]#~"])
-            # lowercase all characters and capitalize first letter
-            word = word.lower().capitalize()
+            # lowercase all characters, capitalize first letter and the letter after a camel case prefix
+            capitalized = word.lower().capitalize()
+            restored = prefixes.restore(capitalized)
+            # mixed case e.g. 'McCracken' or 'Mackinder' is kept only if written as a known camel case name or with
+            # a single capital, 'jOHN' -> 'John'
+            if word.isupper() or word.islower() or word not in (capitalized, restored):
+                word = restored
             # special case for words with apostrophe at the beginning
             if word[0] == "'":
                 word = word[0] + word[1].capitalize() + word[2:]
@@ -187,10 +152,15 @@ class TalentCSV:
 
 
 if __name__ == '__main__':  # pragma: no cover
+    # python -m transform_toolbox.talent_csv [--profile-dir profiles], run from src
+    from .profiling import runner_profiler, print_profiles
+    profiler = runner_profiler("Transform talent_csv_v2.pkl and print the first rows of each table")
     pickle_jar_path = Path(__file__).resolve().parent.parent.parent / "pickle_jar"
     df = pd.read_pickle(pickle_jar_path / "talent_csv_v2.pkl")
     talent_csv = TalentCSV()
-    info_df, inv_df = talent_csv.transform_talent_csv(df)
+    with profiler.stage("transform.talent_csv"):
+        info_df, inv_df = talent_csv.transform_talent_csv(df)
+    print_profiles(profiler.write())
 
     pd.set_option('display.max_columns', None)
     print(info_df.head())
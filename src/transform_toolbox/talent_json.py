@@ -212,8 +212,19 @@ class TalentJSON:
 
 from pathlib import Path
 
-if __name__ == '__main__':
-    pickle_jar_path = Path(__file__).parent.parent.resolve() / "pickle_jar"
-    raw = pd.read_pickle(pickle_jar_path / 'talent_json.pkl')
-    check = TalentJSON(raw)
-    pass
+if __name__ == '__main__':  # pragma: no cover
+    # python -m transform_toolbox.talent_json [--profile-dir profiles], run from src
+    from .profiling import runner_profiler, print_profiles
+    profiler = runner_profiler("Transform talent_json.pkl and print the first rows of each table")
+    pickle_jar_path = Path(__file__).resolve().parent.parent.parent / "pickle_jar"
+    df = pd.read_pickle(pickle_jar_path / "talent_json.pkl")
+    talent_json = TalentJSON(df)
+    with profiler.stage("transform.talent_json"):
+        emp_df, weakness_df, strength_df, tech_df = talent_json.transform_talent_json()
+    print_profiles(profiler.write())
+
+    pd.set_option('display.max_columns', None)
+    print(emp_df.head())
+    print(weakness_df.head())
+    print(strength_df.head())
+    print(tech_df.head())
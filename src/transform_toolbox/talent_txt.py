@@ -1,8 +1,11 @@
 """
 Note:
     Use both content of the file and the name of each to generate one table:
-        1. student name, date (the one in the filename), psychometrics, presentation
+        1. student name, date (the one in the filename), psychometrics and presentation scores, each split into the
+        score and the maximum score (e.g. '19/32' -> 19, 32)
+    Every row of a file shares its date, so dates are parsed once per file and broadcast to the rows.
 """
+from pathlib import Path
 import pandas as pd
 
 
@@ -17,18 +20,29 @@ class TalentTXT:
 
     def remove_word(self, df, column_name, word):
         ''' Removes a word, Use to remove Sparta Day and .text'''
-        df[column_name] = df[column_name].str.replace(word,'')
+        df[column_name] = df[column_name].str.replace(word, '', regex=False)
         return df
 
     def transform_date(self, df, column_name):
-        ''' Transforms the Date strings into DATETIME format
-        i.e 1 August 2019 will be 2019-08-01'''
-        df[column_name] = pd.to_datetime(df[column_name])
-        for i in range(len(df[column_name])):
-            df[column_name][i] = (df[column_name].iloc[i].day,df[column_name].iloc[i].month, df[column_name].iloc[i].year)
-            df[column_name][i] = (list(df[column_name][i]))
+        ''' Transforms the Date strings into [dd, mm, yyyy] lists
+        i.e 1 August 2019 will be [1, 8, 2019]. Each distinct string is parsed once, every row gets a list of its
+        own.'''
+        codes, uniques = pd.factorize(df[column_name])
+        dates = pd.to_datetime(pd.Series(uniques, dtype=object))
+        date_lists = [[date.day, date.month, date.year] for date in dates]
+        # code -1 (missing value) takes the empty list appended at the end
+        # copy the lists, so changing the date of a row does not change the rows sharing it
+        df[column_name] = pd.Series(date_lists + [[]], dtype=object).take(codes).map(list).to_numpy()
         return df
 
+    def split_score(self, df, column_name):
+        ''' Splits 'n/m' scores into two integer columns, <column_name>_score and <column_name>_max
+        i.e 19/32 will be 19 and 32'''
+        parts = df[column_name].str.extract(r'^\s*(\d+)\s*/\s*(\d+)\s*$')
+        df[f'{column_name}_score'] = parts[0].astype('Int64')
+        df[f'{column_name}_max'] = parts[1].astype('Int64')
+        return df.drop(columns=column_name)
+
     def rename_column(self, df, old_name, new_name):
         ''' Renames a column'''
         df = df.rename(columns = {old_name: new_name })
@@ -67,7 +81,10 @@ class TalentTXT:
         raw_df = self.rename_column(raw_df, 'Name', 'student_name')
         raw_df = self.rename_column(raw_df, 'Psychometrics', 'psychometrics')
         raw_df = self.rename_column(raw_df, 'Presentation', 'presentation')
-        raw_df = self.reorder_columns(raw_df, ['student_name', 'date', 'psychometrics', 'presentation'])
+        raw_df = self.split_score(raw_df, 'psychometrics')
+        raw_df = self.split_score(raw_df, 'presentation')
+        raw_df = self.reorder_columns(raw_df, ['student_name', 'date', 'psychometrics_score', 'psychometrics_max',
+                                               'presentation_score', 'presentation_max'])
         raw_df = self.lower_case(raw_df,'student_name')
         raw_df = self.change_dtypes(raw_df, 'student_name', 'str')
         #################################
@@ -77,15 +94,16 @@ class TalentTXT:
 
 
 
-if __name__ == '__main__':
-    # run your code here for sanity checks
-    df = pd.read_pickle('/Users/jamaomar/Documents/Data32/Final project v3/etl_pipeline_virtual_sparta_v2/app/pipeline/pickle_jar/talent_txt_v2.pkl')
-    # df= Talent.remove_word(df, 'filename', 'Talent/Sparta Day')
-    # df = Talent.remove_word(df, 'filename', '.txt')
-    # df = Talent.transform_date(df,'filename')
-    # df =Talent.rename_column(df, 'filename', 'Date')
-    # df = Talent.reorder_columns(df, ['Name', 'Date', 'Psychometrics', 'Presentation'])
-    # print(df)
-    Talent = TalentTXT()
-    print(type(Talent.transform_talent_txt(df)['date'][0]))
-    pass
+if __name__ == '__main__':  # pragma: no cover
+    # python -m transform_toolbox.talent_txt [--profile-dir profiles], run from src
+    from .profiling import runner_profiler, print_profiles
+    profiler = runner_profiler("Transform talent_txt_v2.pkl and print the first rows of each table")
+    pickle_jar_path = Path(__file__).resolve().parent.parent.parent / "pickle_jar"
+    df = pd.read_pickle(pickle_jar_path / "talent_txt_v2.pkl")
+    talent_txt = TalentTXT()
+    with profiler.stage("transform.talent_txt"):
+        test_score_df = talent_txt.transform_talent_txt(df)
+    print_profiles(profiler.write())
+
+    pd.set_option('display.max_columns', None)
+    print(test_score_df.head())
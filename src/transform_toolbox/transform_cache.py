@@ -0,0 +1,109 @@
+"""
+Note:
+    Cache of the transform outputs of each source object, so a run applies the transform classes only to the objects
+    that are new or changed since the last run and concatenates the cached outputs of the others.
+
+    An output is found by the tag of its object and by the transform version of its source. The pickles of the full
+    load carry no S3 ETag, so the tag is a hash of the raw rows of the object, which changes with its content as the
+    ETag does. The transform version is a hash of the code the output depends on (see transform_modules), so editing
+    TalentTXT discards the cached test scores only.
+
+    The outputs of each source are stored as checkpoints (see checkpoints.py), one Feather file per table holding the
+    rows of every object and the key of the object they came from:
+        <cache dir>/<source>/<transform version>/<table>.feather
+
+Example use:
+    cache = TransformCache(Path("transform_cache"))
+    outputs, durations = run_transforms(raw_dfs, cache=cache)
+    cached_objects, all_objects = cache.hits["talent_csv"]
+"""
+import hashlib
+from pathlib import Path
+import pandas as pd
+from .checkpoints import CheckpointStore, file_fingerprint, toolbox_path
+from .prefix_trie import names_path
+
+
+# column of the cached tables holding the key of the object each row came from
+OBJECT_COLUMN = "_object_key"
+
+# files the transform output of each source depends on, besides transform_runner.py
+transform_modules = {
+    "academy_csv": [toolbox_path / "academy_csv.py"],
+    "talent_csv": [toolbox_path / "talent_csv.py", toolbox_path / "prefix_trie.py", names_path],
+    "talent_json": [toolbox_path / "talent_json.py"],
+    "talent_txt": [toolbox_path / "talent_txt.py"],
+}
+
+
+def transform_version(source: str) -> str:
+    """
+    Hash of the code the transform output of the source depends on.
+    """
+    return file_fingerprint([toolbox_path / "transform_runner.py", *transform_modules[source]])[:16]
+
+
+def object_tag(raw_df: pd.DataFrame) -> str:
+    """
+    Hash of the column names and the values of the raw rows of an object, in order.
+    """
+    digest = hashlib.sha256(repr(list(raw_df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(raw_df.astype(str), index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+class TransformCache:
+    """
+    Example use:
+    cache = TransformCache(Path("transform_cache"))
+    cached = cache.load("talent_txt", ["test_score"])
+    tag, (test_score_df,) = cached["Talent/Sparta Day 1 August 2019.txt"]
+    """
+
+    def __init__(self, root: Path) -> None:
+        """
+        :param root: directory of the cache, created on the first save
+        """
+        self.store = CheckpointStore(root)
+        # (objects taken from the cache, all objects) of each source of the last run
+        self.hits = {}
+
+    def load(self, source: str, table_names: list[str]) -> dict[str, tuple[str, list[pd.DataFrame]]]:
+        """
+        Read the cached outputs of a source, if its transform version did not change.
+
+        :param source: source name e.g. "talent_csv"
+        :param table_names: tables of the transform output, in order
+        :return: object key -> (object tag, output dataframes in the order of table_names)
+        """
+        checkpoint = self.store.load(source, transform_version(source))
+        if checkpoint is None:
+            return {}
+        tables, extras = checkpoint
+        rows = {
+            table_name: dict(iter(tables[table_name].groupby(OBJECT_COLUMN, sort=False))) for table_name in table_names
+        }
+
+        def object_output(key: str) -> list[pd.DataFrame]:
+            # objects without rows in a table are left out of its file
+            return [
+                rows[table_name].get(key, tables[table_name].iloc[:0]).drop(columns=OBJECT_COLUMN)
+                .reset_index(drop=True) for table_name in table_names
+            ]
+        return {key: (tag, object_output(key)) for key, tag in extras["objects"].items()}
+
+    def save(self, source: str, table_names: list[str], outputs: dict[str, tuple[str, list[pd.DataFrame]]]) -> None:
+        """
+        Replace the cached outputs of a source. Objects missing from outputs (no longer in the source) are dropped.
+
+        :param source: source name e.g. "talent_csv"
+        :param table_names: tables of the transform output, in order
+        :param outputs: object key -> (object tag, output dataframes in the order of table_names)
+        """
+        tables = {
+            table_name: pd.concat(
+                [output[i].assign(**{OBJECT_COLUMN: key}) for key, (_, output) in outputs.items()], ignore_index=True
+            ) for i, table_name in enumerate(table_names)
+        }
+        objects = {key: tag for key, (tag, _) in outputs.items()}
+        self.store.save(source, transform_version(source), tables, {"objects": objects})
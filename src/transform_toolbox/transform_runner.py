@@ -0,0 +1,231 @@
+"""
+Note:
+    Runs the transform classes of all four sources concurrently in a process pool. Sources do not depend on each other,
+    so the transform stage takes about as long as the slowest source.
+
+Example use:
+    outputs, durations = run_transforms({"academy_csv": raw_academy_csv_df, "talent_csv": raw_talent_csv_df,
+                                         "talent_json": raw_talent_json_df, "talent_txt": raw_talent_txt_df})
+    trainer_df, course_df, academy_performance_df = outputs["academy_csv"]
+
+    # split every source into intake month shards and spread the shards over the pool
+    outputs, durations = run_transforms(raw_dfs, max_workers=8, shard=True)
+
+    # transform only the objects that changed since the last run
+    outputs, durations = run_transforms(raw_dfs, cache=TransformCache(Path("transform_cache")))
+
+    # profile the transform of every source (or shard) in the worker processes
+    outputs, durations = run_transforms(raw_dfs, profiler=Profiler(Path("profiles")))
+"""
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import pandas as pd
+from .academy_csv import AcademyCSV
+from .talent_csv import TalentCSV
+from .talent_json import TalentJSON
+from .talent_txt import TalentTXT
+from .transform_cache import TransformCache, object_tag
+from .profiling import Profiler
+
+
+def transform_academy_csv(raw_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    return AcademyCSV(raw_df).transform_academy_csv()
+
+
+def transform_talent_csv(raw_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    return TalentCSV().transform_talent_csv(raw_df)
+
+
+def transform_talent_json(raw_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    return TalentJSON(raw_df).transform_talent_json()
+
+
+def transform_talent_txt(raw_df: pd.DataFrame) -> pd.DataFrame:
+    return TalentTXT().transform_talent_txt(raw_df)
+
+
+transforms = {
+    "academy_csv": transform_academy_csv,
+    "talent_csv": transform_talent_csv,
+    "talent_json": transform_talent_json,
+    "talent_txt": transform_talent_txt,
+}
+
+
+# tables returned by the transform of each source, in the order of the output
+table_outputs = {
+    "academy_csv": ["trainer", "course", "academy_performance"],
+    "talent_csv": ["student_information", "invitation"],
+    "talent_json": ["trainee_performance", "weakness_junction", "strength_junction", "tech_self_score_junction"],
+    "talent_txt": ["test_score"],
+}
+
+# column used to find the intake month of each row
+shard_columns = {
+    "academy_csv": "filename",
+    "talent_csv": "filename",
+    "talent_json": "date",
+    "talent_txt": "filename",
+}
+
+# outputs listing distinct values - the same value may come from more than one shard
+distinct_outputs = {
+    "academy_csv": [0],
+}
+
+
+def outputs_by_table(outputs: dict[str, tuple]) -> dict[str, pd.DataFrame]:
+    """
+    Key the dataframes returned by run_transforms by table name (see table_outputs).
+    """
+    tables = {}
+    for source, output in outputs.items():
+        dfs = [output] if isinstance(output, pd.DataFrame) else output
+        tables.update(zip(table_outputs[source], dfs))
+    return tables
+
+
+def intake_month(value: str) -> tuple[int, int]:
+    """
+    Get (yyyy, mm) of the intake from a filename or a date e.g. 'Academy/Data_28_2019-02-18.csv' -> (2019, 2),
+    'Talent/Sparta Day 1 August 2019.txt' -> (2019, 8), '2/07/2019' -> (2019, 7), '13//08/2019' -> (2019, 8)
+
+    :param str value: filename or date in the format dd/mm/yyyy
+    :return: year and month, (0, 0) if the month cannot be recognised
+    """
+    iso_date = re.search(r"(\d{4})-(\d{2})-\d{2}", value)
+    if iso_date:
+        return int(iso_date.group(1)), int(iso_date.group(2))
+    # some dates of the JSON files repeat the separator e.g. '13//08/2019'
+    dmy_date = re.fullmatch(r"\s*\d{1,2}/+(\d{1,2})/+(\d{4})\s*", value)
+    if dmy_date:
+        return int(dmy_date.group(2)), int(dmy_date.group(1))
+    date_list = TalentCSV._get_date_from_string(value)
+    return (date_list[2], date_list[1]) if date_list else (0, 0)
+
+
+def shard_by_month(raw_df: pd.DataFrame, column: str) -> list[pd.DataFrame]:
+    """
+    Split raw dataframe into one dataframe per intake month, in chronological order. Transform classes rely on
+    positional indices, so each shard is re-indexed from 0.
+
+    :param raw_df: raw dataframe of a single source
+    :param column: column holding the filename or date (see shard_columns)
+    :return: list of shards
+    """
+    months = raw_df[column].astype(str).map(intake_month)
+    return [shard.reset_index(drop=True) for _, shard in raw_df.groupby(months, sort=True)]
+
+
+def object_units(raw_df: pd.DataFrame, column: str) -> list[tuple[str, pd.DataFrame]]:
+    """
+    Split raw dataframe into the units cached by TransformCache: one per source object (file), in the order of the raw
+    dataframe. Sources without a filename column (talent_json) are split into intake month shards instead, as their
+    transform class needs more than one object to build its columns.
+
+    :param raw_df: raw dataframe of a single source
+    :param column: column holding the filename or date (see shard_columns)
+    :return: list of (object key, raw rows of the object re-indexed from 0)
+    """
+    if column == "filename":
+        return [(key, unit.reset_index(drop=True)) for key, unit in raw_df.groupby(column, sort=False)]
+    months = raw_df[column].astype(str).map(intake_month)
+    return [(f"{year:04d}-{month:02d}", unit.reset_index(drop=True))
+            for (year, month), unit in raw_df.groupby(months, sort=True)]
+
+
+def _concat_shards(source: str, shard_outputs: list) -> tuple:
+    """
+    Merge outputs of the shards of one source back into the shape returned by the transform class.
+    """
+    if isinstance(shard_outputs[0], pd.DataFrame):
+        return pd.concat(shard_outputs, ignore_index=True)
+
+    output = []
+    for i, dfs in enumerate(zip(*shard_outputs)):
+        df = pd.concat(dfs, ignore_index=True)
+        if i in distinct_outputs.get(source, []):
+            df = df.drop_duplicates(ignore_index=True)
+        output.append(df)
+    return tuple(output)
+
+
+def _timed(func, *args) -> tuple:
+    """
+    Call func and measure how long it took. Runs in a worker process.
+    """
+    start = time.perf_counter()
+    output = func(*args)
+    return output, time.perf_counter() - start
+
+
+def run_transforms(
+        raw_dfs: dict[str, pd.DataFrame],
+        *, max_workers: Optional[int] = None,
+        shard: bool = False,
+        cache: Optional[TransformCache] = None,
+        profiler: Optional[Profiler] = None
+) -> tuple[dict[str, tuple], dict[str, float]]:
+    """
+    Transform raw dataframes of each source in a separate worker process. With shard=True each source is first split by
+    intake month and every shard becomes a separate task, so a single large source is spread over all workers.
+
+    :param raw_dfs: raw dataframes keyed by source name ('academy_csv' | 'talent_csv' | 'talent_json' | 'talent_txt')
+    :param max_workers: size of the process pool, defaults to the number of CPUs
+    :param shard: split each source into intake month shards
+    :param cache: transform each source object (see object_units) as a separate task, only if its output is not in
+    the cache, then update the cache (shard is implied)
+    :param profiler: profile the transform of each source under 'transform.<source>' (see profiling.Profiler.wrap)
+    :return: output of the transform class and time spent transforming (summed over shards), both keyed by source name
+    """
+    if cache is None:
+        shards = {
+            source: shard_by_month(raw_df, shard_columns[source]) if shard else [raw_df]
+            for source, raw_df in raw_dfs.items()
+        }
+    else:
+        units = {source: object_units(raw_df, shard_columns[source]) for source, raw_df in raw_dfs.items()}
+        tags = {source: [object_tag(unit) for _, unit in source_units] for source, source_units in units.items()}
+        cached = {source: cache.load(source, table_outputs[source]) for source in raw_dfs}
+        # objects that are new or changed since the last run
+        stale = {
+            source: [cached[source].get(key, (None,))[0] != tag for (key, _), tag in zip(units[source], tags[source])]
+            for source in raw_dfs
+        }
+        shards = {
+            source: [unit for (_, unit), is_stale in zip(source_units, stale[source]) if is_stale]
+            for source, source_units in units.items()
+        }
+    source_transforms = {source: transforms[source] for source in shards}
+    if profiler is not None:
+        source_transforms = {
+            source: profiler.wrap(func, f"transform.{source}") for source, func in source_transforms.items()
+        }
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            source: [pool.submit(_timed, source_transforms[source], shard_df) for shard_df in source_shards]
+            for source, source_shards in shards.items()
+        }
+        results = {source: [future.result() for future in source_futures] for source, source_futures in futures.items()}
+
+    outputs = {}
+    durations = {}
+    for source, source_results in results.items():
+        shard_outputs = [output for output, _ in source_results]
+        durations[source] = sum(duration for _, duration in source_results)
+        if cache is not None:
+            # outputs of every object in the order of the raw dataframe, cached or just transformed
+            fresh = ([output] if isinstance(output, pd.DataFrame) else list(output) for output in shard_outputs)
+            object_outputs = {
+                key: (tag, next(fresh) if is_stale else cached[source][key][1])
+                for (key, _), tag, is_stale in zip(units[source], tags[source], stale[source])
+            }
+            cache.hits[source] = (stale[source].count(False), len(stale[source]))
+            if any(stale[source]) or cached[source].keys() != object_outputs.keys():
+                cache.save(source, table_outputs[source], object_outputs)
+            # single dataframe or tuple, as returned by the transform class
+            shard_outputs = [output[0] if len(output) == 1 else tuple(output) for _, output in object_outputs.values()]
+        outputs[source] = _concat_shards(source, shard_outputs) if shard or cache is not None else shard_outputs[0]
+    return outputs, durations
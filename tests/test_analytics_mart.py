@@ -0,0 +1,87 @@
+import datetime
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from src.schema import tables_list, connection_list, get_value
+from src.load_toolbox.ddl import build_metadata
+from src.load_toolbox.analytics_mart import (
+    build_mart, read_sources, affected_groups, merge_groups, load_mart, course_week_scores
+)
+
+
+class TestAnalyticsMart(unittest.TestCase):
+    def setUp(self) -> None:
+        scores = {"analytic": [2, 4, 6], "independent": [1, 1, 1], "determined": [3, 3, 3],
+                  "professional": [5, 5, 5], "studious": [2, 2, 2], "imaginative": [4, 4, 4]}
+        self.tables = {
+            "trainer": pd.DataFrame({"index": [0, 1], "trainer_name": ["Gregor Gomez", "Ely Kely"]}),
+            "course": pd.DataFrame({"index": [0, 1], "course_name": ["Data 1", "Business 2"], "trainer_id": [0, 1]}),
+            "academy_performance": pd.DataFrame({
+                "index": [0, 1, 2], "week": ["W1", "W1", "W2"], **scores,
+                "student_information_id": [0, 1, 0], "course_id": [0, 0, 1]
+            }),
+            "invitation": pd.DataFrame({
+                "index": [0, 1, 2],
+                "invited_date": [datetime.date(2019, 8, 5), datetime.date(2019, 8, 20), datetime.date(2019, 9, 2)],
+                "invited_by": ["Bruno Bellbrook"] * 3
+            }),
+            "student_information": pd.DataFrame({"index": [0, 1, 2], "student_name": ["A", "B", "C"],
+                                                 "invitation_id": [0, 1, 2]}),
+            "test_score": pd.DataFrame({"index": [0, 1, 2], "psychometrics_score": [50, 70, 60],
+                                        "psychometrics_max": [100] * 3, "presentation_score": [16, 24, 8],
+                                        "presentation_max": [32] * 3, "student_information_id": [0, 1, 2]}),
+            "trainee_performance": pd.DataFrame({"index": [0, 1, 2], "result": [True, False, True],
+                                                 "course_interest": ["Data", "Data", "Business"],
+                                                 "student_information_id": [0, 1, 2]})
+        }
+        self.metadata = build_metadata(
+            {table_name: get_value(table_name + "_dtypes") for table_name in tables_list}, connection_list
+        )
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as con:
+            self.metadata.create_all(con)
+            for table_name, df in self.tables.items():
+                df.to_sql(table_name, con=con, index=False, if_exists="append")
+
+    def fetch(self, table_name: str) -> pd.DataFrame:
+        with self.engine.connect() as con:
+            df = pd.read_sql_table(table_name, con)
+        return df.sort_values(list(df.columns[:2])).reset_index(drop=True)
+
+    def test_course_week_scores(self) -> None:
+        df = course_week_scores(self.tables["academy_performance"], self.tables["course"], self.tables["trainer"])
+        self.assertEqual([(0, "W1", "Gregor Gomez", 2, 3.0), (1, "W2", "Ely Kely", 1, 6.0)],
+                         list(df[["course_id", "week", "trainer_name", "row_count", "analytic"]].itertuples(
+                             index=False, name=None)))
+
+    def test_cohort_pass_rates(self) -> None:
+        df = build_mart(self.tables)["mart_cohort_pass_rate"]
+        august = df[df["cohort_month"] == "2019-08"].iloc[0]
+        self.assertEqual((2, 1, 0.5, 0.6), (august["trainees"], august["passed"], august["pass_rate"],
+                                            august["psychometrics"]))
+
+    def test_mart_from_database_matches_mart_from_dataframes(self) -> None:
+        with self.engine.begin() as con:
+            actual = build_mart(read_sources(con, self.metadata))
+        for table_name, df in build_mart(self.tables).items():
+            pd.testing.assert_frame_equal(df.reset_index(drop=True), actual[table_name].reset_index(drop=True),
+                                          check_dtype=False)
+
+    def test_refresh_replaces_affected_groups_only(self) -> None:
+        with self.engine.begin() as con:
+            load_mart(con, build_mart(self.tables))
+        batch = {
+            "academy_performance": self.tables["academy_performance"].iloc[[2]].assign(index=3, analytic=10),
+            "trainee_performance": self.tables["trainee_performance"].iloc[[2]].assign(index=3, result=False)
+        }
+        with self.engine.begin() as con:
+            groups = affected_groups(con, self.metadata, batch)
+            for table_name, df in batch.items():
+                df.to_sql(table_name, con=con, index=False, if_exists="append")
+            groups = merge_groups(groups, affected_groups(con, self.metadata, batch))
+            load_mart(con, build_mart(read_sources(con, self.metadata, *groups)), *groups)
+            expected = build_mart(read_sources(con, self.metadata))
+        self.assertEqual(([1], ["2019-09"]), groups)
+        for table_name, df in expected.items():
+            pd.testing.assert_frame_equal(df.sort_values(list(df.columns[:2])).reset_index(drop=True),
+                                          self.fetch(table_name), check_dtype=False)
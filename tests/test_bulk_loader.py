@@ -0,0 +1,78 @@
+import io
+import datetime
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from src.load_toolbox.bulk_loader import prepare_frame, frame_to_tsv, bulk_load, _local_infile_refused
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df = pd.DataFrame({
+            "index": [0, 1, 2],
+            "student_name": ["John\tWick", "C:\\Jane", None],
+            "dob": [datetime.date(1995, 9, 5), None, datetime.date(1990, 1, 2)],
+            "geo_flex": [True, False, True],
+            "student_information_id": [3.0, None, 1.0]
+        })
+
+    def test_prepare_frame_nullable_integers(self) -> None:
+        actual = prepare_frame(self.df)
+        self.assertEqual("Int64", str(actual["student_information_id"].dtype))
+        self.assertEqual([1, 0, 1], actual["geo_flex"].tolist())
+
+    def test_frame_to_tsv(self) -> None:
+        expected = "0\tJohn\\tWick\t1995-09-05\t1\t3\n" \
+                   "1\tC:\\\\Jane\t\\N\t0\t\\N\n" \
+                   "2\t\\N\t1990-01-02\t1\t1\n"
+        buf = io.StringIO()
+        frame_to_tsv(self.df, buf)
+        self.assertEqual(expected, buf.getvalue())
+
+    def test_frame_to_tsv_of_boolean_columns(self) -> None:
+        """ 'True' and 'False' would be stored as 0 by LOAD DATA """
+        df = pd.DataFrame({
+            "geo_flex": [True, None, False],
+            "result": pd.array([False, True, None], dtype="boolean"),
+            "student_name": ["True", None, "Ann Bo"]
+        })
+        buf = io.StringIO()
+        frame_to_tsv(df, buf)
+        self.assertEqual("1\t0\tTrue\n\\N\t1\t\\N\n0\t\\N\tAnn Bo\n", buf.getvalue())
+
+    def test_frame_to_tsv_of_compacted_text_columns(self) -> None:
+        compacted = self.df.astype({"student_name": "string[pyarrow]"})
+        expected, actual = io.StringIO(), io.StringIO()
+        frame_to_tsv(self.df, expected)
+        frame_to_tsv(compacted, actual)
+        self.assertEqual(expected.getvalue(), actual.getvalue())
+
+    def test_bulk_load_falls_back_to_inserts(self) -> None:
+        """ SQLite does not know LOAD DATA, so rows have to arrive through chunked inserts """
+        engine = create_engine("sqlite://")
+        with engine.begin() as con:
+            self.df.head(0).to_sql("student_information", con=con, index=False)
+            rows, _, method = bulk_load(con, "student_information", self.df, chunksize=2)
+            actual = con.execute("SELECT COUNT(*) FROM student_information;").scalar()
+        self.assertEqual((3, "insert", 3), (rows, method, actual))
+
+    def test_bulk_load_raises_other_errors(self) -> None:
+        engine = create_engine("sqlite://")
+        with engine.begin() as con:
+            con.exec_driver_sql("CREATE TABLE student_information (`index` INTEGER PRIMARY KEY, student_name TEXT, "
+                                "dob DATE, geo_flex BOOLEAN, student_information_id INTEGER);")
+            bulk_load(con, "student_information", self.df)
+            with self.assertRaises(IntegrityError):
+                bulk_load(con, "student_information", self.df)
+
+    def test_local_infile_refused(self) -> None:
+        for code, expected in [(1148, True), (2068, True), (3948, True), (1062, False), (1146, False)]:
+            with self.subTest(code=code):
+                error = DBAPIError("LOAD DATA LOCAL INFILE ...", None, Exception(code, "error message"))
+                self.assertEqual(expected, _local_infile_refused(error))
+        self.assertFalse(_local_infile_refused(DBAPIError("LOAD DATA LOCAL INFILE ...", None, Exception())))
+
+
+if __name__ == "__main__":
+    unittest.main()
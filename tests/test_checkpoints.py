@@ -0,0 +1,62 @@
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from src.transform_toolbox.checkpoints import CheckpointStore, file_fingerprint, stage_key
+
+
+class TestCheckpoints(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.store = CheckpointStore(self.root / "checkpoints")
+        self.tables = {
+            "student_information": pd.DataFrame({
+                "index": [0, 1, 2],
+                "student_name": ["John Wick", None, "Ann McCracken"],
+                "dob": [[1, 2, 1990], [], [31, 12, 1985]],
+                "email": pd.Series(["jw@continental.com", None, "am@x.com"], dtype="string[pyarrow]"),
+                "gender": pd.Series(["Male", "Female", "Female"], dtype="category"),
+                "invitation_id": pd.Series([0, None, 1], dtype="Int8")
+            }),
+            "invitation": pd.DataFrame({
+                "index": [0, 1],
+                "invited_date": [datetime.date(2019, 8, 5), None],
+                "scores": [{"Python": 5}, {"SQL": 3, "Java": None}]
+            }, index=[10, 11])
+        }
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_save_and_load_round_trip(self) -> None:
+        self.store.save("cleaned", "k1", self.tables, {"name_prefixes": ["Mac"]})
+        tables, extras = self.store.load("cleaned", "k1")
+        self.assertEqual({"name_prefixes": ["Mac"]}, extras)
+        for table_name, df in self.tables.items():
+            with self.subTest(table=table_name):
+                pd.testing.assert_frame_equal(df, tables[table_name])
+
+    def test_load_other_fingerprint(self) -> None:
+        self.store.save("cleaned", "k1", self.tables)
+        self.assertIsNone(self.store.load("cleaned", "k2"))
+        self.assertIsNone(self.store.load("related", "k1"))
+
+    def test_save_keeps_last_checkpoint_of_stage_only(self) -> None:
+        self.store.save("cleaned", "k1", self.tables)
+        self.store.save("related", "k1", self.tables)
+        self.store.save("cleaned", "k2", self.tables)
+        self.assertEqual(["k2"], [path.name for path in (self.root / "checkpoints" / "cleaned").iterdir()])
+        self.assertIsNotNone(self.store.load("related", "k1"))
+
+    def test_fingerprints_change_with_inputs(self) -> None:
+        path = self.root / "source.pkl"
+        path.write_bytes(b"rows")
+        before = file_fingerprint([path])
+        self.assertEqual(before, file_fingerprint([path]))
+        path.write_bytes(b"other rows")
+        self.assertNotEqual(before, file_fingerprint([path]))
+        self.assertEqual(stage_key(before, {"shard": True, "compact_dtypes": False}),
+                         stage_key(before, {"compact_dtypes": False, "shard": True}))
+        self.assertNotEqual(stage_key(before, {"shard": True}), stage_key(before, {"shard": False}))
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.schema import relationship_plan
+from src.transform_toolbox.compact_dtypes import compact_column, compact_frame, compact_tables, compared_columns
+
+
+class TestCompactDtypes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df = pd.DataFrame({
+            "index": np.arange(6),
+            "student_name": ["John Wick", "Ann Bo", "Bob Ross", "Ann Bo", "Eve", "Tom"],
+            "date": [[1, 8, 2019]] * 6,
+            "week": ["W1", "W2", "W1", "W2", "W1", "W2"],
+            "email": ["a@b.com", "c@d.com", None, "e@f.com", "g@h.com", "i@j.com"],
+            "analytic": [1, 8, 5, 3, 2, 7],
+            "psychometrics_score": pd.array([51, None, 300, 1, 2, 3], dtype="Int64"),
+            "result": [True, False, True, True, False, True],
+            "student_information_id": [0.0, np.nan, 2.0, 3.0, 4.0, 5.0]
+        })
+
+    def test_compact_column(self) -> None:
+        cases = [("week", "category"), ("email", "string"), ("analytic", "int8"), ("psychometrics_score", "Int16"),
+                 ("result", "bool"), ("date", "object")]
+        for col, expected in cases:
+            with self.subTest(col=col):
+                self.assertEqual(expected, str(compact_column(self.df[col]).dtype))
+
+    def test_keys_and_compared_columns_are_kept(self) -> None:
+        actual = compact_frame(self.df, compared_columns(relationship_plan))
+        for col in ["index", "student_name", "date", "student_information_id"]:
+            self.assertEqual(self.df[col].dtype, actual[col].dtype)
+
+    def test_values_are_kept(self) -> None:
+        actual = compact_frame(self.df).astype(object)
+        expected = self.df.astype(object)
+        self.assertTrue(actual.where(actual.notna(), None).equals(expected.where(expected.notna(), None)))
+
+    def test_memory_report(self) -> None:
+        tables = {"academy_performance": pd.concat([self.df] * 100, ignore_index=True)}
+        _, memory = compact_tables(tables, compared_columns(relationship_plan))
+        before, after = memory["academy_performance"]
+        self.assertEqual(before, tables["academy_performance"].memory_usage(deep=True).sum())
+        self.assertLess(after, before)
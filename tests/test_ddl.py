@@ -0,0 +1,54 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+from src.schema import tables_list, connection_list, get_value
+from src.load_toolbox.ddl import build_metadata, orphan_counts
+
+
+class TestDDL(unittest.TestCase):
+    def setUp(self) -> None:
+        self.table_dtypes = {table_name: get_value(table_name + "_dtypes") for table_name in tables_list}
+        self.metadata = build_metadata(self.table_dtypes, connection_list)
+
+    def test_build_metadata_all_tables(self) -> None:
+        self.assertEqual(set(tables_list), set(self.metadata.tables))
+
+    def test_build_metadata_primary_keys(self) -> None:
+        for table_name, table in self.metadata.tables.items():
+            expected = [] if "junction" in table_name else ["index"]
+            actual = [col.name for col in table.primary_key.columns]
+            self.assertEqual(expected, actual, table_name)
+
+    def test_build_metadata_foreign_key_columns_indexed(self) -> None:
+        for origin_table, target_table in connection_list:
+            indexed = [col.name for ix in self.metadata.tables[origin_table].indexes for col in ix.columns]
+            self.assertIn(f"{target_table}_id", indexed)
+
+    def test_build_metadata_foreign_keys_only_when_asked(self) -> None:
+        self.assertFalse(any(table.foreign_keys for table in self.metadata.tables.values()))
+        metadata = build_metadata(self.table_dtypes, connection_list, foreign_keys=True)
+        expected = len(connection_list)
+        actual = sum(len(table.foreign_keys) for table in metadata.tables.values())
+        self.assertEqual(expected, actual)
+
+    def test_build_metadata_mysql_ddl(self) -> None:
+        actual = str(CreateTable(self.metadata.tables["course"]).compile(dialect=mysql.dialect()))
+        self.assertIn("PRIMARY KEY (`index`)", actual)
+        self.assertNotIn("AUTO_INCREMENT", actual)
+
+    def test_orphan_counts(self) -> None:
+        engine = create_engine("sqlite://")
+        with engine.begin() as con:
+            self.metadata.create_all(con)
+            pd.DataFrame({"index": [0], "trainer_name": ["Ann Bell"]}).to_sql("trainer", con, index=False,
+                                                                              if_exists="append")
+            pd.DataFrame({"index": [0, 1, 2], "course_name": ["a", "b", "c"], "trainer_id": [0, 5, None]}).to_sql(
+                "course", con, index=False, if_exists="append")
+            actual = orphan_counts(con, [("course", "trainer")])
+        self.assertEqual({("course", "trainer"): 1}, actual)
+
+
+if __name__ == "__main__":
+    unittest.main()
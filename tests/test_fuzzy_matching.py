@@ -0,0 +1,60 @@
+import unittest
+import pandas as pd
+from src.transform_toolbox.fuzzy_matching import soundex, normalise_name, fuzzy_match
+
+
+class TestFuzzyMatching(unittest.TestCase):
+    def setUp(self) -> None:
+        self.parent_df = pd.DataFrame({
+            "student_name": ["Keen Bentham", "Lurette Daveley", "Conny Robson", "Conn Dobson"],
+            "date": [[1, 6, 2019], [1, 3, 2019], [1, 6, 2019], [1, 6, 2019]]
+        })
+
+    def test_soundex(self) -> None:
+        expected = ["R163", "R163", "A261", "T522", "P236"]
+        actual = [soundex(w) for w in ["Robert", "Rupert", "Ashcraft", "Tymczak", "Pfister"]]
+        self.assertEqual(expected, actual)
+
+    def test_normalise_name(self) -> None:
+        expected = "lurette daveley"
+        actual = normalise_name("L;Urette   DAVELEY.")
+        self.assertEqual(expected, actual)
+
+    def test_normalise_name_keeps_digits(self) -> None:
+        self.assertEqual(["data 28", "data 29"], [normalise_name("Data 28"), normalise_name("DATA  29!")])
+
+    def test_fuzzy_match_same_month(self) -> None:
+        child_df = pd.DataFrame({
+            "student_name": ["Keen Bentham3", "L;Urette Daveley", "Conn Dobson"],
+            "date": [[19, 6, 2019], [12, 3, 2019], [20, 7, 2019]]
+        })
+        expected = [0, 1, None]
+        actual = fuzzy_match(self.parent_df, child_df, ["student_name", "date"], threshold=0.9)
+        self.assertEqual(expected, [None if pd.isna(x) else int(x) for x in actual])
+
+    def test_fuzzy_match_month_window(self) -> None:
+        child_df = pd.DataFrame({"student_name": ["Conn Dobson"], "date": [[20, 7, 2019]]})
+        expected = [3]
+        actual = fuzzy_match(self.parent_df, child_df, ["student_name", "date"], threshold=0.9, month_window=1)
+        self.assertEqual(expected, actual.tolist())
+
+    def test_fuzzy_match_below_threshold(self) -> None:
+        child_df = pd.DataFrame({"student_name": ["Keith Bonham"], "date": [[19, 6, 2019]]})
+        actual = fuzzy_match(self.parent_df, child_df, ["student_name", "date"], threshold=0.9)
+        self.assertTrue(actual.isna().all())
+
+    def test_fuzzy_match_one_to_one(self) -> None:
+        child_df = pd.DataFrame({
+            "student_name": ["Conny Robsen", "Conny Robson", "Keen Bentham"],
+            "date": [[19, 6, 2019], [19, 6, 2019], [19, 6, 2019]]
+        })
+        many = fuzzy_match(self.parent_df, child_df, ["student_name", "date"], threshold=0.9)
+        self.assertEqual([2, 2, 0], many.tolist())
+        # the exact spelling wins the parent row, the row taken already is not matched again
+        actual = fuzzy_match(self.parent_df, child_df, ["student_name", "date"], threshold=0.9, one_to_one=True,
+                             taken={0})
+        self.assertEqual([None, 2, None], [None if pd.isna(x) else int(x) for x in actual])
+
+
+if __name__ == "__main__":
+    unittest.main()
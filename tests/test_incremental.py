@@ -0,0 +1,78 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.types import TEXT, INTEGER
+from src.schema import Relationship
+from src.load_toolbox.ddl import build_metadata
+from src.load_toolbox.incremental import (
+    state_metadata, record_objects, ingested_objects, tables_for_batch, load_order, incremental_load
+)
+
+
+class TestIncremental(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection_list = [("test_score", "student_information")]
+        self.natural_keys = {
+            "student_information": ["student_name", "date"],
+            "test_score": ["student_name", "date"]
+        }
+        self.metadata = build_metadata(
+            {
+                "student_information": {"index": INTEGER, "student_name": TEXT},
+                "test_score": {"index": INTEGER, "presentation": TEXT, "student_information_id": INTEGER}
+            },
+            self.connection_list
+        )
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as con:
+            self.metadata.create_all(con)
+            state_metadata().create_all(con)
+
+    @staticmethod
+    def students(names: list[str]) -> pd.DataFrame:
+        return pd.DataFrame({
+            "index": range(len(names)),
+            "student_name": names,
+            "date": [[1, 8, 2019]] * len(names)
+        })
+
+    def load(self, tables: dict[str, pd.DataFrame]) -> dict[str, tuple[int, int, int]]:
+        with self.engine.begin() as con:
+            return incremental_load(con, tables, self.metadata, self.natural_keys, self.connection_list)
+
+    def test_record_objects(self) -> None:
+        expected = ["Talent/Sparta Day 1 August 2019.txt"]
+        with self.engine.begin() as con:
+            record_objects(con, expected)
+            actual = ingested_objects(con)
+        self.assertEqual(expected, actual)
+
+    def test_tables_for_batch(self) -> None:
+        plan = [
+            Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1"),
+            Relationship("weakness_junction", "student_information", ["student_name", "date"], "many-to-many"),
+        ]
+        tables = tables_for_batch({"test_score": self.students(["John Wick"])}, plan)
+        self.assertTrue(tables["student_information"].empty)
+        self.assertEqual(["student_name", "date", "weakness"], list(tables["weakness_junction"].columns))
+        self.assertEqual(1, len(tables["test_score"]))
+
+    def test_load_order(self) -> None:
+        expected = ["trainer", "course", "academy_performance"]
+        actual = load_order(["academy_performance", "course", "trainer"],
+                            [("academy_performance", "course"), ("course", "trainer")])
+        self.assertEqual(expected, actual)
+
+    def test_incremental_load_skips_unchanged_rows(self) -> None:
+        students = self.students(["John Wick", "Ann Bo"])
+        self.assertEqual({"student_information": (2, 0, 0)}, self.load({"student_information": students}))
+        self.assertEqual({"student_information": (0, 0, 2)}, self.load({"student_information": students}))
+
+    def test_incremental_load_updates_changed_rows(self) -> None:
+        scores = self.students(["John Wick"]).assign(presentation="19/32", student_information_id=None)
+        self.load({"test_score": scores})
+        counts = self.load({"test_score": scores.assign(presentation="20/32")})
+        with self.engine.connect() as con:
+            actual = con.execute("SELECT `index`, presentation FROM test_score;").fetchall()
+        self.assertEqual({"test_score": (0, 1, 0)}, counts)
+        self.assertEqual([(0, "20/32")], [tuple(row) for row in actual])
@@ -0,0 +1,104 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from src.schema import Relationship
+from src.load_toolbox.key_registry import KeyRegistry, natural_key, match_key
+from src.transform_toolbox.relationship_executor import assign_stable_ids
+
+
+class TestKeyRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.key_registry = KeyRegistry(create_engine("sqlite://"), batch_size=2)
+        self.plan = [
+            Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1"),
+        ]
+        self.natural_keys = {
+            "student_information": ["student_name", "date"],
+            "test_score": ["student_name", "date"]
+        }
+
+    @staticmethod
+    def students(names: list[str]) -> pd.DataFrame:
+        return pd.DataFrame({
+            "index": range(len(names)),
+            "student_name": names,
+            "date": [[1, 8, 2019]] * len(names)
+        })
+
+    def test_natural_key(self) -> None:
+        expected = ["john wick|[1, 8, 2019]", "ann bo|[1, 8, 2019]"]
+        actual = natural_key(self.students(["John Wick", "Ann Bo"]), ["student_name", "date"]).tolist()
+        self.assertEqual(expected, actual)
+
+    def test_natural_key_ignores_case_and_spacing(self) -> None:
+        actual = natural_key(self.students(["Derby McGlashan", "derby  MCGLASHAN "]), ["student_name"]).tolist()
+        self.assertEqual(["derby mcglashan", "derby mcglashan"], actual)
+        first = self.key_registry.assign_ids("student_information", self.students(["Nealy MacGillespie"]),
+                                             ["student_name", "date"])
+        second = self.key_registry.assign_ids("student_information", self.students(["Nealy Macgillespie"]),
+                                              ["student_name", "date"])
+        self.assertEqual(first.tolist(), second.tolist())
+
+    def test_assign_ids_copies_share_an_id(self) -> None:
+        """ the ids do not depend on the order of the rows """
+        df = self.students(["John Wick", "Ann Bo", "John Wick"]).assign(email="jw@mail.com")
+        self.assertEqual([0, 1, 0], self.key_registry.assign_ids("student_information", df, ["student_name"]).tolist())
+        df = self.students(["Ann Bo", "John Wick", "John Wick"]).assign(email="jw@mail.com")
+        self.assertEqual([1, 0, 0], self.key_registry.assign_ids("student_information", df, ["student_name"]).tolist())
+
+    def test_assign_ids_rejects_different_rows(self) -> None:
+        df = self.students(["John Wick", "John Wick"]).assign(email=["jw@mail.com", "john@mail.com"])
+        with self.assertRaises(ValueError):
+            self.key_registry.assign_ids("student_information", df, ["student_name"])
+        self.assertEqual([0, 1], self.key_registry.assign_ids("student_information", df,
+                                                              ["student_name", "email"]).tolist())
+
+    def test_match_key(self) -> None:
+        expected = ["john wick 82019"]
+        actual = match_key(self.students(["John Wick"]), ["student_name", "date"]).tolist()
+        self.assertEqual(expected, actual)
+
+    def test_get_or_allocate_keeps_ids(self) -> None:
+        self.assertEqual([0, 1, 0], self.key_registry.get_or_allocate("weakness", ["Chatty", "Impatient", "Chatty"]))
+        expected = [2, 1, 3, 0]
+        actual = self.key_registry.get_or_allocate("weakness", ["Slow", "Impatient", "Rude", "Chatty"])
+        self.assertEqual(expected, actual)
+
+    def test_namespaces_are_separate(self) -> None:
+        self.key_registry.get_or_allocate("weakness", ["Chatty"])
+        self.assertEqual([0], self.key_registry.get_or_allocate("strength", ["Chatty"]))
+
+    def test_register_first_id_wins(self) -> None:
+        self.key_registry.register("student_information(student_name)", ["john wick", "john wick"], [4, 7])
+        self.key_registry.register("student_information(student_name)", ["john wick"], [9])
+        self.assertEqual({"john wick": 4}, self.key_registry.lookup("student_information(student_name)", ["john wick"]))
+
+    def test_assign_stable_ids_across_runs(self) -> None:
+        """ the second run lists the same students in a different order, plus a new one """
+        tables = {"student_information": self.students(["John Wick", "Ann Bo"])}
+        assign_stable_ids(tables, [], self.key_registry, self.natural_keys)
+        tables = {"student_information": self.students(["Ann Bo", "Bob Ross", "John Wick"])}
+        assign_stable_ids(tables, [], self.key_registry, self.natural_keys)
+        self.assertEqual([1, 2, 0], tables["student_information"]["index"].tolist())
+
+    def test_assign_stable_ids_keeps_one_copy(self) -> None:
+        tables = {
+            "student_information": self.students(["John Wick", "Ann Bo", "John Wick"]),
+            "test_score": self.students(["Ann Bo", "John Wick"]).assign(student_information_id=[1, 2])
+        }
+        assign_stable_ids(tables, self.plan, self.key_registry, self.natural_keys)
+        self.assertEqual([0, 1], tables["student_information"]["index"].tolist())
+        self.assertEqual([1, 0], tables["test_score"]["student_information_id"].tolist())
+
+    def test_assign_stable_ids_resolves_parents_of_earlier_runs(self) -> None:
+        tables = {
+            "student_information": self.students(["Ann Bo", "John Wick"]),
+            "test_score": self.students([]).assign(student_information_id=None)
+        }
+        assign_stable_ids(tables, self.plan, self.key_registry, self.natural_keys)
+        tables = {
+            "student_information": self.students([]),
+            "test_score": self.students(["John Wick"]).assign(student_information_id=None)
+        }
+        assign_stable_ids(tables, self.plan, self.key_registry, self.natural_keys)
+        self.assertEqual([1], tables["test_score"]["student_information_id"].tolist())
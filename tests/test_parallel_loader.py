@@ -0,0 +1,39 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from src.load_toolbox.parallel_loader import load_tables
+
+
+class TestParallelLoader(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'virtual_sparta.db')}",
+                                    connect_args={"timeout": 30})
+        self.tables = {
+            "trainer": pd.DataFrame({"index": [0, 1], "trainer_name": ["Ely Kely", "Gregor Gomez"]}),
+            "course": pd.DataFrame({"index": range(5), "course_name": [f"Data {i}" for i in range(5)]}),
+            "weakness": pd.DataFrame({"index": [0], "weakness": ["Impatient"]})
+        }
+        with self.engine.begin() as con:
+            for table_name, df in self.tables.items():
+                df.head(0).to_sql(table_name, con=con, index=False)
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_load_tables(self) -> None:
+        expected = {table_name: len(df) for table_name, df in self.tables.items()}
+        load_tables(self.engine, self.tables, max_writers=3)
+        with self.engine.connect() as con:
+            actual = {
+                table_name: con.execute(f"SELECT COUNT(*) FROM {table_name};").scalar() for table_name in self.tables
+            }
+        self.assertEqual(expected, actual)
+
+    def test_load_tables_results_in_input_order(self) -> None:
+        results = load_tables(self.engine, self.tables, max_writers=2)
+        self.assertEqual(list(self.tables), list(results))
+        self.assertEqual([2, 5, 1], [rows for rows, _, _ in results.values()])
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from src.load_toolbox.parquet_export import intake_month, export_table, export_tables
+
+
+class TestParquetExport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.scores = pd.DataFrame({
+            "index": [0, 1, 2],
+            "student_name": ["John Wick", "Ann Bo", "Bob Ross"],
+            "date": [[1, 8, 2019], [1, 8, 2019], [5, 10, 2022]],
+            "presentation": ["19/32", "20/32", "21/32"],
+            "student_information_id": [4.0, np.nan, 7.0]
+        })
+        self.columns = ["index", "presentation", "student_information_id"]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_intake_month(self) -> None:
+        expected = ["2019-08", "2019-08", "2022-10"]
+        self.assertEqual(expected, intake_month(self.scores).tolist())
+
+    def test_export_table_partitioned_by_intake_month(self) -> None:
+        rows, files, _ = export_table("test_score", self.scores[self.columns], self.root, intake_month(self.scores))
+        expected = ["intake_month=2019-08", "intake_month=2022-10"]
+        self.assertEqual(expected, sorted(os.listdir(os.path.join(self.root, "test_score"))))
+        self.assertEqual((3, 2), (rows, files))
+
+    def test_export_table_writes_statistics_and_dictionaries(self) -> None:
+        export_table("test_score", self.scores[self.columns], self.root, intake_month(self.scores))
+        path = os.path.join(self.root, "test_score", "intake_month=2019-08", "part-0.parquet")
+        column = pq.ParquetFile(path).metadata.row_group(0).column(1)
+        self.assertEqual(("19/32", "20/32"), (column.statistics.min, column.statistics.max))
+        self.assertTrue(column.has_dictionary_page)
+
+    def test_keys_with_missing_values_are_integers(self) -> None:
+        export_table("test_score", self.scores[self.columns], self.root)
+        actual = pq.read_table(os.path.join(self.root, "test_score")).column("student_information_id")
+        self.assertEqual("int64", str(actual.type))
+        self.assertEqual([4, None, 7], actual.to_pylist())
+
+    def test_export_replaces_previous_export(self) -> None:
+        tables = {"test_score": self.scores[self.columns]}
+        export_tables(tables, self.root, {"test_score": intake_month(self.scores)})
+        export_tables(tables, self.root, {"test_score": intake_month(self.scores)})
+        self.assertEqual(3, pq.read_table(os.path.join(self.root, "test_score")).num_rows)
+
+    def test_export_removes_months_of_previous_export(self) -> None:
+        export_table("test_score", self.scores[self.columns], self.root, intake_month(self.scores))
+        later = self.scores.iloc[:2]
+        export_table("test_score", later[self.columns], self.root, intake_month(later))
+        self.assertEqual(["intake_month=2019-08"], os.listdir(os.path.join(self.root, "test_score")))
+        self.assertEqual(["test_score"], os.listdir(self.root))
+        self.assertEqual(2, pq.read_table(os.path.join(self.root, "test_score")).num_rows)
@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from src.transform_toolbox.partitions import PartitionSpool, plan_partitions, month_key
+
+
+class TestPartitions(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.raw_talent_txt_df = pd.DataFrame({
+            "Name": ["John Wick", "Ann McCracken", "Gismo Tilling"],
+            "Psychometrics": ["51/100", "60/100", "1/100"],
+            "Presentation": ["19/32", "20/32", None],
+            "filename": ["Talent/Sparta Day 1 August 2019.txt", "Talent/Sparta Day 2 July 2019.txt",
+                         "Talent/Sparta Day 7 August 2019.txt"]
+        })
+        self.raw_talent_json_df = pd.DataFrame({
+            "name": ["John Wick", "Ann McCracken"],
+            "date": ["13//08/2019", "2/09/2019"],
+            "strengths": [["Patient", "Curious"], ["Charismatic"]]
+        })
+        self.raw_talent_txt_df.to_pickle(self.root / "talent_txt.pkl")
+        self.raw_talent_json_df.to_pickle(self.root / "talent_json.pkl")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_month_key(self) -> None:
+        self.assertEqual(["2019-02", "0000-00"], [month_key((2019, 2)), month_key((0, 0))])
+
+    def test_plan_partitions(self) -> None:
+        month_bytes = {"2019-03": 40, "2019-01": 30, "2019-02": 50, "2019-04": 200}
+        expected = [["2019-01", "2019-02"], ["2019-03"], ["2019-04"]]
+        self.assertEqual(expected, plan_partitions(month_bytes, 100, factor=1))
+        self.assertEqual([sorted(month_bytes)], plan_partitions(month_bytes, 1000, factor=1))
+
+    def test_spool_read_months(self) -> None:
+        spool = PartitionSpool(self.root / "spool")
+        spool.add("talent_txt", self.root / "talent_txt.pkl")
+        spool.add("talent_json", self.root / "talent_json.pkl")
+        self.assertEqual(["2019-07", "2019-08", "2019-09"], sorted(spool.month_bytes()))
+
+        raw_dfs = spool.read(["2019-08"])
+        self.assertEqual(["John Wick", "Gismo Tilling"], raw_dfs["talent_txt"]["Name"].tolist())
+        self.assertEqual([["Patient", "Curious"]], raw_dfs["talent_json"]["strengths"].tolist())
+        self.assertEqual({"talent_txt"}, set(spool.read(["2019-07"])))
+
+    def test_spool_add_changed_pickle(self) -> None:
+        PartitionSpool(self.root / "spool").add("talent_txt", self.root / "talent_txt.pkl")
+        self.raw_talent_txt_df.assign(filename="Talent/Sparta Day 3 October 2019.txt").to_pickle(
+            self.root / "talent_txt.pkl")
+        spool = PartitionSpool(self.root / "spool")
+        spool.add("talent_txt", self.root / "talent_txt.pkl")
+        self.assertEqual(["2019-10"], list(spool.month_bytes()))
+        self.assertEqual(1, len(list((self.root / "spool" / "talent_txt").iterdir())))
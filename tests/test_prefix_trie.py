@@ -0,0 +1,63 @@
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from src.transform_toolbox.prefix_trie import (
+    PrefixTrie, load_prefixes, discover_prefixes, new_entries, append_entries, names_path
+)
+
+
+class TestPrefixTrie(unittest.TestCase):
+    def setUp(self) -> None:
+        self.trie = PrefixTrie(["Mac", "Mc", "macd"])
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "camel_case_names.txt"
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        load_prefixes.cache_clear()
+
+    def test_longest_prefix(self) -> None:
+        cases = [("Macdonald", 4), ("Maccenzie", 3), ("McNair", 2), ("Mack", 0), ("Storm", 0), ("", 0)]
+        for word, expected in cases:
+            with self.subTest(word=word):
+                self.assertEqual(expected, self.trie.longest_prefix(word))
+
+    def test_restore(self) -> None:
+        actual = [self.trie.restore(word) for word in ["Maccenzie", "Mcnair", "Macey"]]
+        self.assertEqual(["MacCenzie", "McNair", "Macey"], actual)
+
+    def test_restore_listed_words(self) -> None:
+        trie = PrefixTrie(["Mc"], words=["MacGillespie"])
+        actual = [trie.restore(word) for word in ["Macgillespie", "Mackinder", "Mccrackan"]]
+        self.assertEqual(["MacGillespie", "Mackinder", "McCrackan"], actual)
+
+    def test_discover_prefixes(self) -> None:
+        names = pd.Series(["Ann McCracken", "Bob McNair", "MARTY MACLEOD", "Eve MacLeod", "Tom DeVito", None])
+        self.assertEqual(["Mc"], discover_prefixes(names))
+
+    def test_new_entries(self) -> None:
+        names = pd.Series(["Ann McCracken", "Bob McNair", "Eve MacLeod", "Al MacKay", "Jo Mackinder", "Sue MacGray"])
+        # 'Mackinder' keeps 'Mac' from being a prefix, listed words are not added again
+        self.assertEqual(["MacKay", "MacLeod", "Mc*"], new_entries(names, PrefixTrie(words=["MacGray"])))
+        self.assertEqual([], new_entries(names, PrefixTrie(["Mc"], words=["MacGray", "MacKay", "MacLeod"])))
+
+    def test_append_entries(self) -> None:
+        self.path.write_text("Mc*\n")
+        self.assertEqual(0, len(load_prefixes(self.path).words))
+        append_entries(["MacKay", "MacLeod"], self.path)
+        self.assertEqual("Mc*\nMacKay\nMacLeod\n", self.path.read_text())
+        self.assertEqual({"mackay", "macleod"}, set(load_prefixes(self.path).words))
+
+    def test_load_prefixes(self) -> None:
+        self.path.write_text("# camel case names\nMc*\n\nMacGillespie\n")
+        trie = load_prefixes(self.path)
+        self.assertEqual({"mc"}, trie.prefixes)
+        self.assertEqual({"macgillespie": "MacGillespie"}, trie.words)
+        self.assertEqual(0, len(load_prefixes(Path(self.directory.name) / "missing.txt")))
+
+    def test_checked_in_names(self) -> None:
+        # the list is an input of the pipeline, 'Mac' also starts ordinary names
+        trie = load_prefixes(names_path)
+        actual = [trie.restore(word) for word in ["Macgillespie", "Mackinder", "Macrae", "Mccrackan", "Mcalpine"]]
+        self.assertEqual(["MacGillespie", "Mackinder", "Macrae", "McCrackan", "McAlpine"], actual)
@@ -0,0 +1,85 @@
+import pstats
+import statistics
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from src.transform_toolbox.profiling import Profiler, allocation_report, collapsed_stacks
+
+
+def inner() -> list:
+    time.sleep(0.02)
+    return [0] * 100000
+
+
+def outer() -> int:
+    return len(inner())
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_disabled(self) -> None:
+        profiler = Profiler()
+        self.assertIs(statistics.median, profiler.wrap(statistics.median))
+        self.assertIsNone(profiler.start("stage.transform"))
+        profiler.stop(None)
+        with profiler.stage("stage.load"):
+            pass
+        self.assertEqual({}, profiler.write())
+
+    def test_stage(self) -> None:
+        profiler = Profiler(self.directory)
+        for _ in range(2):
+            profile = profiler.start("stage.transform")
+            outer()
+            profiler.stop(profile)
+        summaries = profiler.write()
+        self.assertEqual(["stage.transform"], list(summaries))
+        self.assertEqual(2, summaries["stage.transform"].calls)
+        self.assertGreaterEqual(summaries["stage.transform"].seconds, 0.04)
+        self.assertGreater(summaries["stage.transform"].peak_bytes, 100000 * 8)
+        for suffix in [".prof", ".txt", ".collapsed", ".allocations.txt"]:
+            self.assertTrue((self.directory / f"stage.transform{suffix}").is_file())
+        self.assertFalse((self.directory / "parts").exists())
+        self.assertIn("(outer)", (self.directory / "stage.transform.txt").read_text())
+        stats = pstats.Stats(str(self.directory / "stage.transform.prof"))
+        outer_calls = [calls for (_, _, function), (_, calls, *_) in stats.stats.items() if function == "outer"]
+        self.assertEqual([2], outer_calls)
+
+    def test_wrap_in_worker_processes(self) -> None:
+        profiler = Profiler(self.directory)
+        median = profiler.wrap(statistics.median, "median")
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            results = list(pool.map(median, [[1, 2, 3], [4, 5, 6]]))
+        self.assertEqual([2, 5], results)
+        self.assertEqual(2, profiler.write()["median"].calls)
+        self.assertIn("median", (self.directory / "median.txt").read_text())
+
+    def test_collapsed_stacks(self) -> None:
+        profiler = Profiler(self.directory)
+        with profiler.stage("stage.relationships"):
+            outer()
+        profiler.write()
+        stacks = collapsed_stacks(pstats.Stats(str(self.directory / "stage.relationships.prof")))
+        sleeps = [(stack, micros) for stack, micros in stacks.items() if stack.endswith("time.sleep>")]
+        self.assertEqual(1, len(sleeps))
+        stack, micros = sleeps[0]
+        self.assertRegex(stack, r"outer \(test_profiling\.py:\d+\);inner \(test_profiling\.py:\d+\);<built-in")
+        self.assertGreaterEqual(micros, 20000)
+
+    def test_allocation_report(self) -> None:
+        report = allocation_report([
+            {"seconds": 1.0, "peak_bytes": 2 ** 20, "lines": [["talent_json.py:64", 2048, 10]]},
+            {"seconds": 1.0, "peak_bytes": 3 * 2 ** 20, "lines": [["talent_json.py:64", 1024, 5],
+                                                                   ["talent_json.py:112", 512, 1]]},
+        ]).splitlines()
+        self.assertEqual("Calls: 2, peak traced memory of a call: 3.0 MiB", report[0])
+        self.assertEqual(["3.0", "15", "talent_json.py:64"], report[2].split())
+        self.assertEqual(["0.5", "1", "talent_json.py:112"], report[3].split())
@@ -0,0 +1,75 @@
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.types import TEXT, INTEGER
+from src.schema import Relationship
+from src.load_toolbox.ddl import build_metadata
+from src.load_toolbox.pushdown import pushdown_load
+from src.transform_toolbox.relationship_executor import run_relationship_plan
+
+
+class TestPushdown(unittest.TestCase):
+    def setUp(self) -> None:
+        self.plan = [
+            Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1"),
+            Relationship("weakness_junction", "student_information", ["student_name", "date"], "many-to-many"),
+        ]
+        self.connection_list = [
+            ("test_score", "student_information"),
+            ("weakness_junction", "student_information"),
+            ("weakness_junction", "weakness")
+        ]
+        self.metadata = build_metadata(
+            {
+                "student_information": {"index": INTEGER, "student_name": TEXT},
+                "test_score": {"index": INTEGER, "presentation": TEXT, "student_information_id": INTEGER},
+                "weakness": {"index": INTEGER, "weakness": TEXT},
+                "weakness_junction": {"student_information_id": INTEGER, "weakness_id": INTEGER}
+            },
+            self.connection_list
+        )
+        self.frames = {
+            "student_information": pd.DataFrame({
+                "student_name": ["John Wick", "Ann Bo", "John Wick"],
+                "date": [[1, 8, 2019], [1, 8, 2019], [1, 9, 2019]]
+            }),
+            "test_score": pd.DataFrame({
+                "student_name": ["ann bo", "John Wick", "Bob Ross"],
+                "date": [[1, 8, 2019], [3, 9, 2019], [1, 8, 2019]],
+                "presentation": ["19/32", "20/32", "21/32"]
+            }),
+            "weakness_junction": pd.DataFrame({
+                "student_name": ["Ann Bo", "John Wick", "Ann Bo", "John Wick"],
+                "date": [[1, 8, 2019], [1, 8, 2019], [1, 8, 2019], [1, 8, 2019]],
+                "weakness": ["Chatty", "Slow", None, "Chatty"]
+            })
+        }
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as con:
+            self.metadata.create_all(con)
+
+    def load(self) -> dict[str, tuple[int, float]]:
+        with self.engine.begin() as con:
+            return pushdown_load(con, self.frames, self.metadata, self.plan, self.connection_list)
+
+    def fetch(self, table_name: str) -> list[tuple]:
+        with self.engine.connect() as con:
+            return [tuple(row) for row in con.execute(self.metadata.tables[table_name].select()).fetchall()]
+
+    def test_same_tables_as_relationship_plan(self) -> None:
+        self.load()
+        tables, _, _ = run_relationship_plan({name: df.copy() for name, df in self.frames.items()}, self.plan,
+                                             max_workers=1)
+        for table_name, table in self.metadata.tables.items():
+            expected = tables[table_name][[col.name for col in table.columns]].astype(object)
+            expected = [tuple(None if pd.isna(value) else value for value in row) for row in expected.values]
+            self.assertEqual(expected, self.fetch(table_name), table_name)
+
+    def test_staging_tables_are_dropped(self) -> None:
+        self.load()
+        self.assertEqual(sorted(self.metadata.tables), sorted(inspect(self.engine).get_table_names()))
+
+    def test_row_counts(self) -> None:
+        results = self.load()
+        self.assertEqual((3, 4), (results["test_score"][0], results["weakness_junction"][0]))
+        self.assertEqual(3, results["weakness"][0])
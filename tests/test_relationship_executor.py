@@ -0,0 +1,91 @@
+import unittest
+import pandas as pd
+from src.schema import Relationship, relationship_plan
+from src.transform_toolbox.relationship_executor import build_dependency_graph, critical_path, run_relationship_plan
+
+
+class TestRelationshipExecutor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.plan = [
+            Relationship("course", "trainer", ["trainer_name"], "1-to-many"),
+            Relationship("weakness_junction", "student_information", ["student_name", "date"], "many-to-many"),
+        ]
+        self.tables = {
+            "trainer": pd.DataFrame({"trainer_name": ["Ann Bell", "Tom Reed"]}),
+            "course": pd.DataFrame({
+                "course_name": ["Data 1", "Data 2", "Engineering 3"],
+                "trainer_name": ["Tom Reed", "Ann Bell", "Tom Reed"]
+            }),
+            "student_information": pd.DataFrame({
+                "student_name": ["John Wick", "Jane Doe"],
+                "date": [[1, 8, 2019], [1, 9, 2019]]
+            }),
+            "weakness_junction": pd.DataFrame({
+                "student_name": ["John Wick", "John Wick", "Jane Doe"],
+                "date": [[22, 8, 2019], [22, 8, 2019], [3, 9, 2019]],
+                "weakness": ["Chatty", "Impulsive", "Chatty"]
+            }),
+        }
+
+    def test_build_dependency_graph_schema_plan_independent_steps(self) -> None:
+        """ None of the steps in the schema plan reads a key column written by another step """
+        graph = build_dependency_graph(relationship_plan)
+        self.assertTrue(all(not deps for deps in graph.values()))
+
+    def test_build_dependency_graph_reads_written_column(self) -> None:
+        plan = [
+            Relationship("course", "trainer", ["trainer_name"], "1-to-many"),
+            Relationship("academy_performance", "course", ["course_name", "trainer_id"], "1-to-many"),
+        ]
+        expected = {0: set(), 1: {0}}
+        actual = build_dependency_graph(plan)
+        self.assertEqual(expected, actual)
+
+    def test_critical_path(self) -> None:
+        graph = {0: set(), 1: {0}, 2: set(), 3: {1, 2}}
+        durations = {0: 1.0, 1: 1.0, 2: 3.0, 3: 1.0}
+        expected = [2, 3]
+        actual = critical_path(graph, durations)
+        self.assertEqual(expected, actual)
+
+    def test_run_relationship_plan_one_to_many(self) -> None:
+        tables, _, _ = run_relationship_plan(self.tables, self.plan, max_workers=2)
+        expected = [1, 0, 1]
+        actual = tables["course"]["trainer_id"].tolist()
+        self.assertEqual(expected, actual)
+
+    def test_run_relationship_plan_many_to_many(self) -> None:
+        tables, durations, _ = run_relationship_plan(self.tables, self.plan, max_workers=2)
+        self.assertEqual({0, 1}, set(durations))
+        self.assertEqual(["Chatty", "Impulsive"], tables["weakness"]["weakness"].tolist())
+        expected = [[0, 0], [0, 1], [1, 0]]
+        actual = tables["weakness_junction"][["student_information_id", "weakness_id"]].values.tolist()
+        self.assertEqual(expected, actual)
+
+    def test_run_relationship_plan_fuzzy_fallback(self) -> None:
+        plan = [Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1")]
+        self.tables["test_score"] = pd.DataFrame({
+            "student_name": ["Jane Doe", "Jon Wick3", "Bob Stone"],
+            "date": [[5, 9, 2019], [2, 8, 2019], [2, 8, 2019]]
+        })
+        tables, _, match_counts = run_relationship_plan(self.tables, plan, max_workers=1, fuzzy_threshold=0.85)
+        self.assertEqual((3, 1, 1), match_counts[0][:3])
+        self.assertEqual([1, 0], tables["test_score"]["student_information_id"].tolist()[:2])
+        self.assertTrue(pd.isna(tables["test_score"]["student_information_id"][2]))
+
+    def test_run_relationship_plan_fuzzy_one_to_one(self) -> None:
+        """ A student already matched exactly is not given to a second test score row """
+        plan = [Relationship("test_score", "student_information", ["student_name", "date"], "0-or-1-to-1")]
+        self.tables["test_score"] = pd.DataFrame({
+            "student_name": ["John Wick", "Jon Wick", "Jane Do", "Jane Doh"],
+            "date": [[5, 8, 2019], [5, 8, 2019], [5, 9, 2019], [5, 9, 2019]]
+        })
+        tables, _, match_counts = run_relationship_plan(self.tables, plan, max_workers=1, fuzzy_threshold=0.85)
+        self.assertEqual((4, 1, 1), match_counts[0][:3])
+        actual = tables["test_score"]["student_information_id"].tolist()
+        self.assertEqual([0, 1], [actual[0], actual[2]])
+        self.assertTrue(pd.isna(actual[1]) and pd.isna(actual[3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from src.run_metrics import RunMetrics, compare_history, print_history_comparison, prometheus_text, read_history
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_start_and_stop(self) -> None:
+        metrics = RunMetrics(release="abc")
+        stage = metrics.start("transform")
+        data = [list(range(1000)) for _ in range(100)]
+        transform = metrics.stop(stage, rows_in=100, rows_out=len(data))
+        self.assertEqual(("transform", {}, 100, 100), (transform.stage, transform.labels, transform.rows_in,
+                                                       transform.rows_out))
+        self.assertGreaterEqual(transform.wall_seconds, 0)
+        self.assertGreaterEqual(transform.cpu_seconds, 0)
+        self.assertGreater(transform.peak_rss_bytes, 0)
+        self.assertIsNone(transform.bytes_read)
+        self.assertEqual([transform], metrics.stages)
+
+    def test_write(self) -> None:
+        metrics = RunMetrics(release="abc")
+        metrics.add("load", {"table": "course"}, wall_seconds=0.5, rows_out=36)
+        metrics.write(self.directory)
+        report = metrics.write(self.directory)
+        with open(self.directory / "last_run.json", 'r') as file:
+            self.assertEqual(report, json.load(file))
+        history = read_history(self.directory / "history.jsonl")
+        self.assertEqual(2, len(history))
+        self.assertEqual(report, history[-1])
+        self.assertFalse((self.directory / "virtual_sparta.prom.partial").exists())
+        self.assertIn('virtual_sparta_stage_rows_out{stage="load",table="course"} 36',
+                      (self.directory / "virtual_sparta.prom").read_text())
+
+    def test_prometheus_text(self) -> None:
+        report = {
+            "started_at": "2022-11-01T09:00:00+00:00", "release": "abc", "wall_seconds": 2.0,
+            "stages": [{"stage": "extract", "labels": {"source": 'talent "csv"'}, "wall_seconds": 1.25,
+                        "cpu_seconds": None, "rows_in": None, "rows_out": 12, "bytes_read": None,
+                        "peak_rss_bytes": None, "children_peak_rss_bytes": None}]
+        }
+        lines = prometheus_text(report).splitlines()
+        self.assertIn('virtual_sparta_run_wall_seconds{release="abc"} 2.000000', lines)
+        self.assertIn('virtual_sparta_stage_wall_seconds{stage="extract",source="talent \\"csv\\""} 1.25', lines)
+        self.assertIn("# TYPE virtual_sparta_stage_rows_out gauge", lines)
+        # measures not taken have no gauge
+        self.assertFalse(any(line.startswith("virtual_sparta_stage_cpu_seconds") for line in lines))
+
+    def test_compare_history(self) -> None:
+        def report(started_at, wall_seconds):
+            return {"started_at": started_at, "stages": [
+                {"stage": "transform", "labels": {"source": "talent_csv"}, "wall_seconds": wall_seconds},
+                {"stage": "load", "labels": {}, "wall_seconds": None}
+            ]}
+        history = [report("1", 1.0), report("2", 3.0), report("3", 2.0), report("4", 10.0)]
+        self.assertEqual({"transform[source=talent_csv]": (10.0, 2.0)}, compare_history(history, history[-1]))
+        self.assertEqual({"transform[source=talent_csv]": (10.0, 2.5)},
+                         compare_history(history, history[-1], last=2))
+        # the report need not be in the history yet
+        self.assertEqual({"transform[source=talent_csv]": (10.0, 2.5)},
+                         compare_history(history[:-1], history[-1], last=2))
+        self.assertEqual({}, compare_history(history[-1:], history[-1]))
+
+    def test_print_history_comparison(self) -> None:
+        for wall_seconds in [1.0, 1.0, 3.0]:
+            metrics = RunMetrics()
+            metrics.add("relationships", wall_seconds=wall_seconds)
+            report = metrics.write(self.directory)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            print_history_comparison(self.directory / "history.jsonl", report)
+        self.assertIn("! relationships... 3.00s (1.00s, +200%)", output.getvalue())
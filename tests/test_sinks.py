@@ -0,0 +1,69 @@
+import datetime
+import os
+import tempfile
+import unittest
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.types import TEXT, INTEGER, DATE
+from src.load_toolbox.sinks import Sink, SQLiteSink
+
+
+class TestSQLiteSink(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "virtual_sparta.db")
+        self.connection_list = [("course", "trainer")]
+        self.table_dtypes = {
+            "trainer": {"index": INTEGER, "trainer_name": TEXT, "start_date": DATE},
+            "course": {"index": INTEGER, "course_name": TEXT, "trainer_id": INTEGER}
+        }
+        self.tables = {
+            "trainer": pd.DataFrame({
+                "index": [0, 1],
+                "trainer_name": ["Ely Kely", None],
+                "start_date": [datetime.date(2019, 8, 1), None]
+            }),
+            "course": pd.DataFrame({"index": range(5), "course_name": [f"Data {i}" for i in range(5)],
+                                    "trainer_id": [0, 1, 0, None, 1]})
+        }
+        self.sink = SQLiteSink(self.path)
+        self.sink.prepare()
+
+    def tearDown(self) -> None:
+        self.sink.engine.dispose()
+        self.directory.cleanup()
+
+    def test_create_tables_with_keys_and_indexes(self) -> None:
+        self.sink.create_tables(self.table_dtypes, self.connection_list)
+        inspector = inspect(self.sink.engine)
+        self.assertEqual(["index"], inspector.get_pk_constraint("course")["constrained_columns"])
+        self.assertEqual([["trainer_id"]], [index["column_names"] for index in inspector.get_indexes("course")])
+        self.assertEqual("trainer", inspector.get_foreign_keys("course")[0]["referred_table"])
+
+    def test_load_in_batches(self) -> None:
+        self.sink.create_tables(self.table_dtypes, self.connection_list)
+        results = self.sink.load(self.tables, chunksize=2)
+        with self.sink.engine.connect() as con:
+            actual = con.execute("SELECT trainer_id FROM course ORDER BY `index`;").fetchall()
+        self.assertEqual([0, 1, 0, None, 1], [trainer_id for (trainer_id,) in actual])
+        self.assertEqual([2, 5], [rows for rows, _, _ in results.values()])
+
+    def test_finish_raises_on_orphans(self) -> None:
+        self.sink.create_tables(self.table_dtypes, self.connection_list)
+        self.sink.load({"trainer": self.tables["trainer"].head(1), "course": self.tables["course"]})
+        with self.assertRaises(ValueError):
+            self.sink.finish([], self.connection_list)
+
+    def test_prepare_starts_from_empty_database(self) -> None:
+        self.sink.create_tables(self.table_dtypes, self.connection_list)
+        self.sink.prepare()
+        self.assertEqual([], inspect(self.sink.engine).get_table_names())
+
+    def test_sink_requires_load_methods(self) -> None:
+        class PrepareOnlySink(Sink):
+            def prepare(self, *, keep: bool = False) -> None:
+                pass
+
+        for sink_class in [Sink, PrepareOnlySink]:
+            with self.subTest(sink=sink_class.__name__), self.assertRaises(TypeError):
+                sink_class()
@@ -0,0 +1,64 @@
+import datetime
+import json
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from src.load_toolbox.student_profile import build_profiles, load_profiles
+
+
+class TestStudentProfile(unittest.TestCase):
+    def setUp(self) -> None:
+        student = {col: [None, None] for col in ["gender", "email", "city", "address", "postcode", "phone_number",
+                                                 "uni", "degree"]}
+        self.tables = {
+            "student_information": pd.DataFrame({
+                "index": [0, 1], "student_name": ["John Wick", "Ann Bo"], **student,
+                "dob": [datetime.date(1994, 8, 4), None], "invitation_id": [0, None]
+            }),
+            "invitation": pd.DataFrame({"index": [0], "invited_date": [datetime.date(2019, 8, 5)],
+                                        "invited_by": ["Bruno Bellbrook"]}),
+            "test_score": pd.DataFrame({"index": [0], "psychometrics_score": [51], "psychometrics_max": [100],
+                                        "presentation_score": [19], "presentation_max": [32],
+                                        "student_information_id": [0.0]}),
+            "trainee_performance": pd.DataFrame({
+                "index": [0], "self_development": [True], "geo_flex": [False], "financial_support": [True],
+                "result": [True], "course_interest": ["Data"], "student_information_id": [0]
+            }),
+            "strength": pd.DataFrame({"index": [0, 1], "strength": ["Curious", None]}),
+            "strength_junction": pd.DataFrame({"student_information_id": [0, 0], "strength_id": [0, 1]}),
+            "weakness": pd.DataFrame({"index": [0], "weakness": ["Chatty"]}),
+            "weakness_junction": pd.DataFrame({"student_information_id": [1], "weakness_id": [0]}),
+            "tech_self_score": pd.DataFrame({"index": [0], "tech_self_score": ["C#"]}),
+            "tech_self_score_junction": pd.DataFrame({"student_information_id": [0], "tech_self_score_id": [0],
+                                                      "tech_self_score": ["C#"], "value": [6]}),
+            "course": pd.DataFrame({"index": [0], "course_name": ["Data 31"], "trainer_id": [0]}),
+            "academy_performance": pd.DataFrame({
+                "index": [0, 1], "week": ["W1", "W2"], "analytic": [5, 6], "independent": [4, 4], "determined": [3, 3],
+                "professional": [3, 3], "studious": [3, 3], "imaginative": [2, 2],
+                "student_information_id": [0, 0], "course_id": [0, 0]
+            })
+        }
+
+    def test_profile_document(self) -> None:
+        profile = json.loads(build_profiles(self.tables)["profile"][0])
+        self.assertEqual("1994-08-04", profile["dob"])
+        self.assertEqual({"invited_date": "2019-08-05", "invited_by": "Bruno Bellbrook"}, profile["invitation"])
+        self.assertEqual([51, 100, 19, 32], list(profile["test_score"].values()))
+        self.assertEqual(["Curious"], profile["strengths"])
+        self.assertEqual([{"tech_self_score": "C#", "value": 6}], profile["tech_self_scores"])
+        self.assertEqual(["W1", "W2"], [week["week"] for week in profile["academy_performance"]])
+        self.assertEqual("Data 31", profile["academy_performance"][0]["course_name"])
+
+    def test_profile_of_student_without_related_rows(self) -> None:
+        profile = json.loads(build_profiles(self.tables)["profile"][1])
+        self.assertEqual(["Chatty"], profile["weaknesses"])
+        self.assertEqual(([], None, None), (profile["strengths"], profile["test_score"], profile["dob"]))
+
+    def test_load_profiles_replaces_rows(self) -> None:
+        engine = create_engine("sqlite://")
+        profiles = build_profiles(self.tables)
+        with engine.begin() as con:
+            load_profiles(con, profiles)
+            load_profiles(con, profiles)
+            actual = con.execute("SELECT student_name FROM student_profile WHERE student_id = 1;").fetchall()
+        self.assertEqual([("Ann Bo",)], [tuple(row) for row in actual])
@@ -2,6 +2,7 @@ import unittest
 from pathlib import Path
 import pandas as pd
 from src.transform_toolbox.talent_csv import TalentCSV
+from src.transform_toolbox.prefix_trie import PrefixTrie
 
 
 class TestTalentCSV(unittest.TestCase):
@@ -46,5 +47,27 @@ class TestTalentCSV(unittest.TestCase):
         self.assertEqual(expected, actual)
 
 
+    def test__normalise_string_restores_camel_case_prefix(self) -> None:
+        expected = "Marty MacCenzie"
+        actual = self.talent_csv_transform._normalise_string("MARTY MACCENZIE", prefixes=PrefixTrie(["Mac", "Mc"]))
+        self.assertEqual(expected, actual)
+
+    def test__normalise_string_mixed_case_input(self) -> None:
+        expected = "Ann McCracken Mackinder"
+        actual = self.talent_csv_transform._normalise_string("ann McCracken Mackinder",
+                                                             prefixes=PrefixTrie(["Mac", "Mc"]))
+        self.assertEqual(expected, actual)
+
+    def test__normalise_string_mixed_case_not_camel_case(self) -> None:
+        expected = "John Smith Heriot-watt Mccracken"
+        actual = self.talent_csv_transform._normalise_string("jOHN sMITH heriot-WATT McCracken", prefixes=PrefixTrie())
+        self.assertEqual(expected, actual)
+
+    def test__normalise_string_checked_in_names(self) -> None:
+        expected = "Derby McGlashan Nealy MacGillespie Mackinder"
+        actual = self.talent_csv_transform._normalise_string("DERBY MCGLASHAN NEALY MACGILLESPIE MACKINDER")
+        self.assertEqual(expected, actual)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -23,6 +23,20 @@ class TestTalentTXT(unittest.TestCase):
         actual = self.TalentTXT.transform_date(df, 'date')
         self.assertEqual(expected_df['date'][0], actual['date'][0])
 
+    def test_transform_date_parses_each_file_once(self):
+        df = pd.DataFrame({'date': [' 1 August 2019', ' 1 August 2019', None]})
+        actual = self.TalentTXT.transform_date(df, 'date')['date']
+        self.assertEqual([[1, 8, 2019], [1, 8, 2019], []], actual.tolist())
+        actual[0].append(2020)
+        self.assertEqual([1, 8, 2019], actual[1])
+
+    def test_split_score(self):
+        df = pd.DataFrame({'presentation': ['19/32', None]})
+        actual = self.TalentTXT.split_score(df, 'presentation')
+        self.assertEqual(['presentation_score', 'presentation_max'], actual.columns.tolist())
+        self.assertEqual([19, pd.NA], actual['presentation_score'].tolist())
+        self.assertEqual('Int64', str(actual['presentation_max'].dtype))
+
     def test_rename_column(self):
         df = pd.DataFrame({'words': ['Sparta Day Hi', 'Sparta Day Hello'], 'year' : [2015,2016]})
         expected = pd.DataFrame({'stuff': ['Sparta Day Hi', 'Sparta Day Hello'], 'year' : [2015,2016]})
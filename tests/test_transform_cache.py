@@ -0,0 +1,47 @@
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from src.transform_toolbox.transform_cache import TransformCache, object_tag, transform_version
+
+
+class TestTransformCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = TransformCache(Path(self.tmp.name))
+        self.outputs = {
+            "Academy/Data_28_2019-02-18.csv": ("a1", [
+                pd.DataFrame({"trainer_name": ["Gregor Gomez"]}),
+                pd.DataFrame({"course_name": ["Data 28"], "date": [[18, 2, 2019]]})
+            ]),
+            "Academy/Engineering_17_2019-02-18.csv": ("b1", [
+                pd.DataFrame({"trainer_name": ["Martina Meadows"]}),
+                pd.DataFrame({"course_name": pd.Series([], dtype=object), "date": pd.Series([], dtype=object)})
+            ])
+        }
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_save_and_load_round_trip(self) -> None:
+        self.cache.save("academy_csv", ["trainer", "course"], self.outputs)
+        loaded = self.cache.load("academy_csv", ["trainer", "course"])
+        self.assertEqual(list(self.outputs), list(loaded))
+        for key, (tag, output) in self.outputs.items():
+            self.assertEqual(tag, loaded[key][0])
+            for expected, actual in zip(output, loaded[key][1]):
+                self.assertEqual(expected.values.tolist(), actual.values.tolist())
+                self.assertEqual(list(expected.columns), list(actual.columns))
+
+    def test_load_empty_cache(self) -> None:
+        self.assertEqual({}, self.cache.load("academy_csv", ["trainer", "course"]))
+
+    def test_object_tag(self) -> None:
+        raw_df = pd.DataFrame({"Name": ["John Wick"], "Psychometrics": ["51/100"]})
+        self.assertEqual(object_tag(raw_df), object_tag(raw_df.copy()))
+        self.assertNotEqual(object_tag(raw_df), object_tag(raw_df.assign(Psychometrics="1/100")))
+        self.assertNotEqual(object_tag(raw_df), object_tag(raw_df.rename(columns={"Name": "name"})))
+
+    def test_transform_version_per_source(self) -> None:
+        self.assertEqual(transform_version("talent_txt"), transform_version("talent_txt"))
+        self.assertNotEqual(transform_version("talent_txt"), transform_version("academy_csv"))
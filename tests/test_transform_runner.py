@@ -0,0 +1,97 @@
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from src.transform_toolbox.academy_csv import AcademyCSV
+from src.transform_toolbox.talent_txt import TalentTXT
+from src.transform_toolbox.transform_runner import run_transforms, intake_month, shard_by_month, object_units
+from src.transform_toolbox.transform_cache import TransformCache
+
+
+class TestTransformRunner(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pickle_jar_path = Path(__file__).resolve().parent.parent / "pickle_jar"
+        self.raw_academy_csv_df = pd.read_pickle(self.pickle_jar_path / "academy_csv_v2.pkl")
+        self.raw_talent_txt_df = pd.read_pickle(self.pickle_jar_path / "talent_txt_v2.pkl")
+        self.outputs, self.durations = run_transforms(
+            {"academy_csv": self.raw_academy_csv_df.copy(), "talent_txt": self.raw_talent_txt_df.copy()},
+            max_workers=2
+        )
+
+    def test_run_transforms_sources(self) -> None:
+        expected = {"academy_csv", "talent_txt"}
+        self.assertEqual(expected, set(self.outputs))
+        self.assertEqual(expected, set(self.durations))
+
+    def test_run_transforms_academy_csv_same_as_class(self) -> None:
+        expected = AcademyCSV(self.raw_academy_csv_df).transform_academy_csv()
+        actual = self.outputs["academy_csv"]
+        for expected_df, actual_df in zip(expected, actual):
+            pd.testing.assert_frame_equal(expected_df, actual_df)
+
+    def test_run_transforms_talent_txt_same_as_class(self) -> None:
+        expected = TalentTXT().transform_talent_txt(self.raw_talent_txt_df)
+        actual = self.outputs["talent_txt"]
+        pd.testing.assert_frame_equal(expected, actual)
+
+    def test_intake_month(self) -> None:
+        expected = [(2019, 2), (2019, 8), (2019, 7), (2019, 8), (2019, 4), (0, 0)]
+        actual = [intake_month(v) for v in [
+            "Academy/Data_28_2019-02-18.csv",
+            "Talent/Sparta Day 1 August 2019.txt",
+            "2/07/2019",
+            "13//08/2019",
+            "Talent/April2019Applicants.csv",
+            "Talent/unknown.csv"
+        ]]
+        self.assertEqual(expected, actual)
+
+    def test_shard_by_month(self) -> None:
+        shards = shard_by_month(self.raw_talent_txt_df, "filename")
+        self.assertEqual(len(self.raw_talent_txt_df), sum(len(shard) for shard in shards))
+        months = [intake_month(shard["filename"][0]) for shard in shards]
+        self.assertEqual(sorted(set(months)), months)
+
+    def test_run_transforms_sharded_same_rows(self) -> None:
+        outputs, _ = run_transforms({"talent_txt": self.raw_talent_txt_df.copy()}, max_workers=2, shard=True)
+        expected = self.outputs["talent_txt"].astype(str).sort_values(["student_name", "date"])
+        actual = outputs["talent_txt"].astype(str).sort_values(["student_name", "date"])
+        self.assertEqual(expected.values.tolist(), actual.values.tolist())
+
+    def test_object_units(self) -> None:
+        units = object_units(self.raw_talent_txt_df, "filename")
+        self.assertEqual(self.raw_talent_txt_df["filename"].unique().tolist(), [key for key, _ in units])
+        self.assertTrue(all(unit["filename"].eq(key).all() for key, unit in units))
+        self.assertEqual(["2019-02", "2019-07"], [key for key, _ in object_units(
+            pd.DataFrame({"date": ["2/07/2019", "18/02/2019", "3/07/2019"]}), "date")])
+
+    def test_run_transforms_cached_objects(self) -> None:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = TransformCache(Path(cache_dir))
+            raw_dfs = {"talent_txt": self.raw_talent_txt_df}
+            cold, _ = run_transforms({"talent_txt": self.raw_talent_txt_df.copy()}, max_workers=2, cache=cache)
+            pd.testing.assert_frame_equal(self.outputs["talent_txt"], cold["talent_txt"])
+            objects = self.raw_talent_txt_df["filename"].nunique()
+            self.assertEqual((0, objects), cache.hits["talent_txt"])
+
+            warm, durations = run_transforms(raw_dfs, max_workers=2, cache=cache)
+            pd.testing.assert_frame_equal(cold["talent_txt"], warm["talent_txt"])
+            self.assertEqual((objects, objects), cache.hits["talent_txt"])
+            self.assertEqual(0, durations["talent_txt"])
+
+            # one changed object is transformed again, one removed object is dropped
+            changed_df = self.raw_talent_txt_df.copy()
+            first, last = changed_df["filename"].iloc[0], changed_df["filename"].iloc[-1]
+            changed_df.loc[changed_df.index[0], "Psychometrics"] = "1/100"
+            changed_df = changed_df[changed_df["filename"] != last]
+            changed, _ = run_transforms({"talent_txt": changed_df}, max_workers=2, cache=cache)
+            self.assertEqual((objects - 2, objects - 1), cache.hits["talent_txt"])
+            self.assertEqual(1, changed["talent_txt"]["psychometrics_score"].iloc[0])
+            expected = TalentTXT().transform_talent_txt(changed_df.copy())
+            pd.testing.assert_frame_equal(expected.reset_index(drop=True), changed["talent_txt"])
+            self.assertIn(first, cache.load("talent_txt", ["test_score"]))
+            self.assertNotIn(last, cache.load("talent_txt", ["test_score"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,7 +18,8 @@ class TestTransformAcademyCSV(unittest.TestCase):
     ############################
 
     def test_transform_talent_txt_test_score_df_col_names(self) -> None:
-        expected = {"student_name", "date", "psychometrics", "presentation"}
+        expected = {"student_name", "date", "psychometrics_score", "psychometrics_max", "presentation_score",
+                    "presentation_max"}
         actual = set(self.test_score_df.columns.tolist())
         self.assertEqual(expected, actual)
 
@@ -27,7 +28,7 @@ class TestTransformAcademyCSV(unittest.TestCase):
     ################################
 
     def test_transform_talent_txt_test_score_df_datatype(self) -> None:
-        expected = {self.dt['other'].dtype}
+        expected = {self.dt['other'].dtype, pd.Int64Dtype()}
         actual = set(self.test_score_df.dtypes.tolist())
         self.assertEqual(expected, actual)
 
@@ -63,11 +64,11 @@ class TestTransformAcademyCSV(unittest.TestCase):
         date_format_test(actual)
 
     def test_transform_talent_txt_format_test_results(self) -> None:
-        actual_list = [self.test_score_df[key] for key in ["psychometrics", "presentation"]]
-        for actual in actual_list:
-            self.assertTrue(all(['/' in a for a in actual if not pd.isnull(a)]))
-            self.assertTrue(all([a.split('/')[0].isdigit() and a.split('/')[1].isdigit() for a in actual if not pd.isnull(a)]))
-            self.assertTrue(all([' ' not in a for a in actual if not pd.isnull(a)]))
+        for key in ["psychometrics", "presentation"]:
+            score = self.test_score_df[f"{key}_score"]
+            max_score = self.test_score_df[f"{key}_max"]
+            self.assertTrue(score.notna().all() and max_score.notna().all())
+            self.assertTrue(((0 <= score) & (score <= max_score)).all())
 
 
 if __name__ == "__main__":
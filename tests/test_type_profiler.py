@@ -0,0 +1,75 @@
+import unittest
+import pandas as pd
+from sqlalchemy.dialects import mysql
+from sqlalchemy.types import TEXT, INTEGER, DATE
+from src.load_toolbox.type_profiler import profile_column, profile_tables, varchar_length
+from src.schema import Check
+
+
+def mysql_type(dtype) -> str:
+    return str(dtype.compile(dialect=mysql.dialect()))
+
+
+class TestTypeProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df = pd.DataFrame({
+            "index": [0, 1, 2, 3],
+            "student_name": ["Hilary Willmore", "Orly Lorens", "Ann Bo", None],
+            "gender": ["Male", "Female", "Female", "Male"],
+            "week": ["W1", "W2", "W10", "W3"],
+            "analytic": [1, 8, 3, 2],
+            "dob": [None, None, None, None],
+            "trainer_id": [0.0, 1.0, None, 2.0]
+        })
+        self.dtypes = {
+            "index": INTEGER, "student_name": TEXT, "gender": TEXT, "week": TEXT,
+            "analytic": INTEGER, "dob": DATE, "trainer_id": INTEGER
+        }
+
+    def test_varchar_length(self) -> None:
+        self.assertEqual([8, 16, 64, 256], [varchar_length(n) for n in [0, 8, 29, 69]])
+        self.assertEqual(32, varchar_length(29, headroom=1))
+
+    def test_profile_column_varchar(self) -> None:
+        self.assertEqual("VARCHAR(32)", mysql_type(profile_column(self.df["student_name"])))
+
+    def test_profile_column_enum_of_allowed_values(self) -> None:
+        dtype = profile_column(self.df["gender"], Check(values=["Male", "Female", "Non-binary"]))
+        self.assertEqual("ENUM('Female','Male','Non-binary')", mysql_type(dtype))
+        # a value breaking the check still fits the column
+        dtype = profile_column(self.df["gender"], Check(values=["Male"]))
+        self.assertEqual("ENUM('Female','Male')", mysql_type(dtype))
+
+    def test_profile_column_open_set_varchar(self) -> None:
+        """ A value first seen by a later run would not fit an ENUM of the values found """
+        self.assertEqual("VARCHAR(16)", mysql_type(profile_column(self.df["gender"])))
+
+    def test_profile_column_keeps_prefixed_codes(self) -> None:
+        """ Codes such as "W1" stay strings, so later runs load them as they are """
+        self.assertEqual("VARCHAR(8)", mysql_type(profile_column(self.df["week"])))
+
+    def test_profile_column_smallint(self) -> None:
+        self.assertEqual("SMALLINT", mysql_type(profile_column(pd.Series([0, 1000], name="score"))))
+
+    def test_profile_column_declared_range(self) -> None:
+        """ The declared range is kept, even past the values found """
+        self.assertEqual("TINYINT", mysql_type(profile_column(self.df["analytic"], Check(low=1, high=8))))
+        self.assertEqual("SMALLINT", mysql_type(profile_column(self.df["analytic"], Check(low=0, high=1000))))
+        self.assertEqual("SMALLINT", mysql_type(profile_column(pd.Series([None], name="score", dtype=float),
+                                                               Check(low=0, high=1000))))
+
+    def test_profile_tables_keeps_keys_and_dates(self) -> None:
+        profiled = profile_tables({"t": self.df}, {"t": self.dtypes})
+        for col in ["index", "dob", "trainer_id"]:
+            self.assertIs(self.dtypes[col], profiled["t"][col])
+
+    def test_profile_tables_column_order(self) -> None:
+        expected = ["index", "student_name", "gender", "week", "analytic", "dob", "trainer_id"]
+        profiled = profile_tables({"t": self.df}, {"t": self.dtypes})
+        self.assertEqual(expected, list(profiled["t"]))
+
+    def test_profile_tables_checks(self) -> None:
+        checks = {"t": {"gender": Check(values=["Male", "Female"]), "student_name": Check(nullable=False)}}
+        profiled = profile_tables({"t": self.df}, {"t": self.dtypes}, checks)
+        self.assertEqual("ENUM('Female','Male')", mysql_type(profiled["t"]["gender"]))
+        self.assertEqual("VARCHAR(32)", mysql_type(profiled["t"]["student_name"]))
@@ -0,0 +1,71 @@
+import datetime
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy.types import TEXT, INTEGER, DATE, BOOLEAN
+from src.schema import Check, tables_list, connection_list, get_value
+from src.load_toolbox.validation import type_mask, range_mask, pattern_mask, column_masks, validate_tables
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tables = {
+            "invitation": pd.DataFrame({
+                "index": [0, 1, 1],
+                "invited_date": [datetime.date(2019, 8, 5), None, datetime.date(1850, 1, 1)],
+                "invited_by": ["Bruno Bellbrook", "Doris Bellasis", "Gismo Tilling"]
+            }),
+            "student_information": pd.DataFrame({
+                "index": [0, 1], "student_name": ["John Wick", None], "gender": ["Male", "Cat"],
+                "email": ["jw@continental.com", "not an email"], "invitation_id": [0, 7]
+            })
+        }
+        self.table_dtypes = {table_name: get_value(table_name + "_dtypes") for table_name in tables_list}
+        self.table_checks = {table_name: get_value(table_name + "_checks") for table_name in tables_list}
+
+    def test_type_mask(self) -> None:
+        cases = [
+            (pd.Series([1.0, np.nan, 2.5]), INTEGER, [False, False, True]),
+            (pd.Series(["1", "x", None], dtype=object), INTEGER, [False, True, False]),
+            (pd.Series([True, None, "yes"], dtype=object), BOOLEAN, [False, False, True]),
+            (pd.Series([datetime.date(2019, 1, 2), "2019-01-02"]), DATE, [False, True]),
+            (pd.Series(["W1", [1, 2, 2019], True], dtype=object), TEXT(), [False, True, False])
+        ]
+        for column, dtype, expected in cases:
+            with self.subTest(dtype=dtype):
+                self.assertEqual(expected, type_mask(column, dtype).tolist())
+
+    def test_range_mask(self) -> None:
+        self.assertEqual([True, False, False, True], range_mask(pd.Series([0, 1, np.nan, 9]), 1, 8).tolist())
+        dates = pd.Series([datetime.date(1899, 12, 31), None, datetime.date(2000, 1, 1)])
+        self.assertEqual([True, False, False], range_mask(dates, low=datetime.date(1900, 1, 1)).tolist())
+
+    def test_pattern_mask(self) -> None:
+        actual = pattern_mask(pd.Series(["W1", "W1a", None, "1"]), r"W\d+")
+        self.assertEqual([False, True, False, True], actual.tolist())
+
+    def test_column_masks_skip_values_of_wrong_type(self) -> None:
+        masks = column_masks(pd.Series([1, "x", 12, None], dtype=object), INTEGER, Check(nullable=False, high=8))
+        expected = {"type": [False, True, False, False], "nullable": [False, False, False, True],
+                    "range": [False, False, True, False]}
+        self.assertEqual(expected, {rule: mask.tolist() for rule, mask in masks.items()})
+
+    def test_validate_tables_counts_and_samples(self) -> None:
+        results = validate_tables(self.tables, self.table_dtypes, self.table_checks, connection_list)
+        counts = {key: count for key, (count, _) in results.items() if count}
+        expected = {
+            ("invitation", "index", "unique"): 2,
+            ("invitation", "invited_date", "range"): 1,
+            ("student_information", "student_name", "nullable"): 1,
+            ("student_information", "gender", "values"): 1,
+            ("student_information", "email", "pattern"): 1,
+            ("student_information", "invitation_id", "foreign_key"): 1
+        }
+        self.assertEqual(expected, counts)
+        _, sample = results[("invitation", "index", "unique")]
+        self.assertEqual(["Doris Bellasis", "Gismo Tilling"], sample["invited_by"].tolist())
+
+    def test_validate_tables_without_foreign_keys(self) -> None:
+        results = validate_tables(self.tables, self.table_dtypes, self.table_checks, connection_list,
+                                  foreign_keys=False)
+        self.assertNotIn(("student_information", "invitation_id", "foreign_key"), results)